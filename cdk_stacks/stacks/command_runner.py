@@ -98,6 +98,13 @@ class EEOncePerTagCommandRunner(Stack):
                 f"output-on-error manage-py-command export_ballots_as_wkt_csv --bucket 'ee.data-cache.{dc_environment}' --prefix 'ballots-with-wkt'",
             )
 
+            # Trim the election change log
+            self.add_job(
+                "prune_election_changes",
+                "cron(45 3 * * ? *)",
+                "output-on-error manage-py-command prune_election_changes",
+            )
+
     def add_job(
         self,
         command_name,
@@ -0,0 +1,60 @@
+import itertools
+import json
+import zlib
+from urllib.parse import urljoin
+
+from django.http import QueryDict
+from rest_framework.utils.encoders import JSONEncoder
+
+from .serializers import ElectionSerializer
+
+
+class BaseURLRequest:
+    """
+    Stands in for a request when serializing outside of a view, so that
+    hyperlinked fields are built against `base_url`.
+    """
+
+    versioning_scheme = None
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.query_params = QueryDict()
+
+    def build_absolute_uri(self, location):
+        return urljoin(self.base_url, location)
+
+
+def iter_elections_ndjson(
+    queryset, context, chunk_size=2000, serializer_class=ElectionSerializer
+):
+    """
+    Yield the elections in `queryset` as newline delimited JSON, in the
+    same shape as the elections API, encoded as UTF-8.
+
+    The queryset is read with a server-side cursor and serialized a chunk
+    at a time, so memory use doesn't depend on the size of the queryset.
+    Pass `serializer_class=FastElectionSerializer` with a queryset from
+    `FastElectionSerializer.setup_values` to serialize `.values()` rows.
+    """
+    elections = queryset.iterator(chunk_size=chunk_size)
+    for chunk in itertools.batched(elections, chunk_size):
+        data = serializer_class(chunk, many=True, context=context).data
+        yield "".join(
+            json.dumps(
+                row, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+            )
+            + "\n"
+            for row in data
+        ).encode("utf-8")
+
+
+def gzip_stream(chunks):
+    """
+    Gzip an iterable of bytes as it's consumed
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if compressed := compressor.compress(chunk):
+            yield compressed
+    yield compressor.flush()
@@ -6,6 +6,10 @@ from elections.models import Election
 from organisations.models import OrganisationGeography
 
 
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
+
+
 class ElectionFilter(django_filters.FilterSet):
     def election_intersects_local_authority_filter(self, queryset, name, value):
         og_qs = OrganisationGeography.objects.filter(
@@ -55,7 +59,7 @@ class ElectionFilter(django_filters.FilterSet):
             | Q(
                 organisation_geography__geography__bboverlaps=og_qs.get().geography
             )
-        ).prefetch_related("_children_qs")
+        )
 
     organisation_identifier = django_filters.CharFilter(
         field_name="organisation__official_identifier",
@@ -91,6 +95,11 @@ class ElectionFilter(django_filters.FilterSet):
         lookup_expr="gt",
         help_text="An ISO datetime",
     )
+    election_id = CharInFilter(
+        label="Filter elections by a comma separated list of election ids",
+        field_name="election_id",
+        lookup_expr="in",
+    )
 
     class Meta:
         model = Election
@@ -0,0 +1,84 @@
+import json
+import timeit
+
+from api.exports import BaseURLRequest
+from api.serializers import ElectionSerializer, FastElectionSerializer
+from django.core.management.base import BaseCommand
+from elections.models import Election
+from rest_framework.renderers import JSONRenderer
+
+
+class Command(BaseCommand):
+    help = """
+    Time ElectionSerializer against FastElectionSerializer on public
+    elections from the current database, and check they give the same
+    output.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            dest="limit",
+            help="Number of elections to serialize",
+            type=int,
+            default=1000,
+        )
+        parser.add_argument(
+            "--repeat",
+            dest="repeat",
+            help="Number of times to run each serializer",
+            type=int,
+            default=5,
+        )
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        context = {
+            "request": BaseURLRequest("https://elections.democracyclub.org.uk/")
+        }
+        elections = ElectionSerializer.setup_eager_loading(
+            Election.public_objects.all()
+        ).order_by("pk")
+
+        def serialize():
+            return ElectionSerializer(
+                list(elections[:limit]), many=True, context=context
+            ).data
+
+        def serialize_fast():
+            return FastElectionSerializer(
+                list(FastElectionSerializer.setup_values(elections)[:limit]),
+                context=context,
+            ).data
+
+        renderer = JSONRenderer()
+        expected = json.loads(renderer.render(serialize()))
+        actual = json.loads(renderer.render(serialize_fast()))
+        mismatches = sum(1 for e, a in zip(expected, actual) if e != a)
+        if len(expected) != len(actual):
+            mismatches += abs(len(expected) - len(actual))
+
+        timings = {}
+        for name, func in (
+            ("ElectionSerializer", serialize),
+            ("FastElectionSerializer", serialize_fast),
+        ):
+            timings[name] = min(
+                timeit.repeat(func, number=1, repeat=options["repeat"])
+            )
+            self.stdout.write(
+                "{}: {:.3f}s for {} elections".format(
+                    name, timings[name], len(expected)
+                )
+            )
+
+        self.stdout.write(
+            "Speedup: {:.1f}x".format(
+                timings["ElectionSerializer"]
+                / timings["FastElectionSerializer"]
+            )
+        )
+        if mismatches:
+            self.stderr.write(
+                "{} elections serialized differently".format(mismatches)
+            )
@@ -1,25 +1,23 @@
 import contextlib
+import json
 import os
 import os.path
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-import geojson
 from django.conf import settings
+from django.contrib.gis.db.models.functions import AsGeoJSON
 from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Case, Q, When
 from elections.models import Election
 
 TOPOJSON_BIN = os.path.join(settings.BASE_DIR, "..", "node_modules", ".bin")
 
-
-def set_precision(coords, precision):
-    result = []
-    try:
-        return round(coords, int(precision))
-    except TypeError:
-        for coord in coords:
-            result.append(set_precision(coord, precision))
-    return result
+# Round coordinates to 6 decimal places (~10cm) precision to reduce
+# output size. This is probably as good as the source data accuracy.
+COORDINATE_PRECISION = 6
 
 
 def parse_date(date_string):
@@ -49,6 +47,12 @@ class Command(BaseCommand):
             help="Output directory (default every_election/static/exports)",
             default=output_dir,
         )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=4,
+            help="Number of election groups to export at once (default 4)",
+        )
 
     def handle(self, *args, **options):
         with contextlib.suppress(FileExistsError):
@@ -71,25 +75,47 @@ class Command(BaseCommand):
             if options["to"]:
                 elections = elections.filter(poll_open_date__lte=options["to"])
 
-        for election in elections:
-            self.stdout.write("Exporting elections for group %s" % election)
-            data = self.export_election(election)
+        with ThreadPoolExecutor(max_workers=options["jobs"]) as executor:
+            futures = {
+                executor.submit(
+                    self.export_group, election, options["output"]
+                ): election
+                for election in elections
+            }
+            # Report from this thread, as each group is done. result()
+            # raises any exception from the worker here.
+            for future in as_completed(futures):
+                for election_id in future.result():
+                    self.stderr.write(
+                        "Election %s has no geography" % election_id
+                    )
+                self.stdout.write(
+                    "Exported elections for group %s" % futures[future]
+                )
 
-            gj_path = os.path.join(
-                options["output"], "%s.json" % election.election_id
-            )
+    def export_group(self, election, output):
+        """
+        Write the GeoJSON and TopoJSON files for one election group.
+        Returns the IDs of any ballots without a geography.
+        """
+        try:
+            gj_path = os.path.join(output, "%s.json" % election.election_id)
             with open(gj_path, "w") as output_file:
-                geojson.dump(data, output_file)
+                missing = self.export_election(election, output_file)
 
             tj_path = os.path.join(
-                options["output"], "%s-topo.json" % election.election_id
+                output, "%s-topo.json" % election.election_id
             )
             self.topojson_convert(gj_path, tj_path)
             tj_simple_path = os.path.join(
-                options["output"],
+                output,
                 "%s-topo-simplified.json" % election.election_id,
             )
             self.topojson_simplify(tj_path, tj_simple_path)
+            return missing
+        finally:
+            # Each worker thread has its own database connection
+            connection.close()
 
     def topojson_convert(self, source, dest):
         "Convert GeoJSON to TopoJSON by calling out to the topojson package"
@@ -113,48 +139,67 @@ class Command(BaseCommand):
             ]
         )
 
-    def export_election(self, parent):
-        "Return GeoJSON containing all leaf elections below this parent"
-        features = []
-        elections = self.get_ballots(parent)
-        for election in elections:
-            if election.geography:
-                gj = geojson.loads(election.geography.geography.json)
-
-                # Round coordinates to 6 decimal places (~10cm) precision to reduce
-                # output size. This is probably as good as the source data accuracy.
-                gj["coordinates"] = set_precision(gj["coordinates"], 6)
-
-            else:
-                self.stderr.write("Election %s has no geography" % election)
-                gj = None
-
-            feat = geojson.Feature(
-                geometry=gj,
-                id=election.election_id,
-                properties={
-                    "name": election.election_title,
-                    "division": election.division.name
-                    if election.division
-                    else None,
-                    "organisation": election.organisation.official_name,
-                },
+    def export_election(self, parent, output_file):
+        """
+        Write GeoJSON containing all leaf elections below this parent to
+        output_file, a feature at a time. Returns the IDs of any ballots
+        without a geography.
+        """
+        missing = []
+        output_file.write('{"type": "FeatureCollection", "features": [')
+        for i, ballot in enumerate(self.get_ballots(parent)):
+            geometry = ballot["geojson"]
+            if geometry is None:
+                missing.append(ballot["election_id"])
+                geometry = "null"
+            properties = {
+                "name": ballot["election_title"],
+                "division": ballot["division__name"],
+                "organisation": ballot["organisation__official_name"],
+            }
+            output_file.write(
+                ("" if i == 0 else ", ")
+                + '{"type": "Feature", '
+                + f'"id": {json.dumps(ballot["election_id"])}, '
+                + f'"geometry": {geometry}, '
+                + f'"properties": {json.dumps(properties)}}}'
             )
-            features.append(feat)
-        return geojson.FeatureCollection(
-            features, election_group=parent.election_id
+        output_file.write(
+            f'], "election_group": {json.dumps(parent.election_id)}}}'
         )
+        return missing
 
     def get_ballots(self, group):
-        "Return the ballots for a group of elections."
-        to_visit = [group]
-        leaf_nodes = []
-        while len(to_visit) > 0:
-            e = to_visit.pop()
-            children = e.get_children("public_objects").all()
-            if e.identifier_type == "ballot":
-                leaf_nodes.append(e)
-            else:
-                to_visit += children
-
-        return leaf_nodes
+        """
+        Return the ballots for a group of elections, with their geography
+        as GeoJSON
+        """
+        return (
+            Election.public_objects.descendents_of(group, inclusive=True)
+            # Some older ballots have a blank group_type
+            .filter(Q(group_type=None) | Q(group_type=""))
+            .annotate(
+                # The same geography as Election.geography
+                geojson=Case(
+                    When(
+                        division__isnull=False,
+                        then=AsGeoJSON(
+                            "division_geography__geography",
+                            precision=COORDINATE_PRECISION,
+                        ),
+                    ),
+                    default=AsGeoJSON(
+                        "organisation_geography__geography",
+                        precision=COORDINATE_PRECISION,
+                    ),
+                )
+            )
+            .values(
+                "election_id",
+                "election_title",
+                "division__name",
+                "organisation__official_name",
+                "geojson",
+            )
+            .iterator()
+        )
@@ -0,0 +1,82 @@
+import sys
+
+from api.exports import BaseURLRequest, gzip_stream, iter_elections_ndjson
+from api.serializers import ElectionSerializer, FastElectionSerializer
+from django.core.management.base import BaseCommand
+from elections.models import Election
+
+
+class Command(BaseCommand):
+    help = """
+    Export every public election as newline delimited JSON, in the same
+    shape as /api/elections/
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            dest="output",
+            help="File to write to (default stdout)",
+            default="-",
+        )
+        parser.add_argument(
+            "--gzip",
+            action="store_true",
+            help="Gzip the output",
+        )
+        parser.add_argument(
+            "--deleted",
+            action="store_true",
+            help="Export deleted elections instead of public ones",
+        )
+        parser.add_argument(
+            "--fast",
+            action="store_true",
+            help="Serialize with FastElectionSerializer",
+        )
+        parser.add_argument(
+            "--base-url",
+            dest="base_url",
+            help="Base URL used for links to other API objects",
+            default="https://elections.democracyclub.org.uk/",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            dest="chunk_size",
+            help="Number of elections to fetch from the DB at a time",
+            type=int,
+            default=2000,
+        )
+
+    def handle(self, *args, **options):
+        if options["deleted"]:
+            elections = Election.private_objects.filter_by_status("Deleted")
+        else:
+            elections = Election.public_objects.all()
+        elections = ElectionSerializer.setup_eager_loading(
+            elections, deleted=options["deleted"]
+        ).order_by("pk")
+        serializer_class = ElectionSerializer
+        if options["fast"]:
+            elections = FastElectionSerializer.setup_values(elections)
+            serializer_class = FastElectionSerializer
+
+        content = iter_elections_ndjson(
+            elections,
+            {"request": BaseURLRequest(options["base_url"])},
+            chunk_size=options["chunk_size"],
+            serializer_class=serializer_class,
+        )
+        if options["gzip"]:
+            content = gzip_stream(content)
+
+        if options["output"] == "-":
+            self.write(sys.stdout.buffer, content)
+        else:
+            with open(options["output"], "wb") as output_file:
+                self.write(output_file, content)
+
+    def write(self, output_file, content):
+        for chunk in content:
+            output_file.write(chunk)
+        output_file.flush()
@@ -1,3 +1,11 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import OuterRef
+from django.utils import timezone
+from elections.datapackage import VOTING_SYSTEM_PAYLOADS
 from elections.models import (
     Election,
     ElectionSubType,
@@ -10,11 +18,13 @@ from organisations.models import (
     OrganisationDivisionSet,
 )
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from rest_framework_gis.serializers import (
     GeoFeatureModelSerializer,
     GeometrySerializerMethodField,
 )
-from uk_election_ids.datapackage import VOTING_SYSTEMS
+
+logger = logging.getLogger(__name__)
 
 
 class OrganisationHyperlinkedIdentityField(
@@ -71,7 +81,11 @@ class OrganisationGeoSerializer(GeoFeatureModelSerializer):
     )
 
     def get_geography_model(self, obj):
-        return obj.geographies.latest().geography
+        geography = obj.geographies.latest()
+        tolerance = self.context.get("simplify_tolerance")
+        if tolerance is not None:
+            return geography.get_simplified_geography(tolerance)
+        return geography.geography
 
     class Meta:
         model = Organisation
@@ -197,6 +211,48 @@ class BaseElectionSerializer(serializers.ModelSerializer):
     timetable = serializers.SerializerMethodField()
     tags = serializers.JSONField()
 
+    SELECT_RELATED = (
+        "election_type",
+        "election_subtype",
+        "organisation",
+        "elected_role",
+        "division",
+        "division__divisionset",
+        "group",
+        "replaces",
+        "explanation",
+        "metadata",
+    )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, deleted=False):
+        """
+        Add everything the serializer needs to an Election QuerySet so that
+        serializing any number of elections takes a fixed number of queries.
+
+        Children are annotated as an array of election IDs, and
+        replacements are fetched in a single prefetch. `deleted` selects
+        which children are visible, matching the `deleted` API parameter.
+        """
+        if deleted:
+            children = Election.private_objects.filter_by_status(
+                [
+                    ModerationStatuses.approved.value,
+                    ModerationStatuses.deleted.value,
+                ]
+            )
+        else:
+            children = Election.public_objects.all()
+        return (
+            queryset.select_related(*cls.SELECT_RELATED)
+            .prefetch_related("_replaced_by")
+            .annotate(
+                child_election_ids=ArraySubquery(
+                    children.filter(group=OuterRef("pk")).values("election_id")
+                )
+            )
+        )
+
     def get_timetable(self, obj: Election):
         return {
             field: getattr(obj, field) for field in Election.TIMETABLE_FIELDS
@@ -214,17 +270,15 @@ class BaseElectionSerializer(serializers.ModelSerializer):
             or obj.group_type == "subtype"
             or not obj.group_type
         ):
-            system = VOTING_SYSTEMS.get(obj.voting_system, None)
-            if system:
-                system["slug"] = obj.voting_system
-            return system
+            return VOTING_SYSTEM_PAYLOADS.get(obj.voting_system, None)
         return None
 
     def get_children(self, obj: Election) -> list[str]:
         if not obj.group_type:
             return []
-        if children := getattr(obj, "children", None):
-            return [c.election_id for c in children]
+        child_election_ids = getattr(obj, "child_election_ids", None)
+        if child_election_ids is not None:
+            return child_election_ids
         if self.context["request"].query_params.get("deleted", None):
             children = (
                 obj.get_children("private_objects")
@@ -256,6 +310,9 @@ class ElectionGeoSerializer(GeoFeatureModelSerializer, BaseElectionSerializer):
     def get_geography_model(self, obj):
         if obj.geography is None:
             return None
+        tolerance = self.context.get("simplify_tolerance")
+        if tolerance is not None:
+            return obj.geography.get_simplified_geography(tolerance)
         return obj.geography.geography
 
     class Meta:
@@ -268,3 +325,263 @@ class ElectionGeoSerializer(GeoFeatureModelSerializer, BaseElectionSerializer):
 
         fields = election_fields
         depth = 1
+
+
+class FastElectionSerializer:
+    """
+    Builds the same representation as ElectionSerializer from `.values()`
+    rows, without going through a serializer field for every value.
+
+    Pass it the rows from `setup_values`. Organisations, divisions and
+    election types are built once per primary key and shared between rows.
+    """
+
+    ORGANISATION_FIELDS = tuple(
+        "organisation__{}".format(field) for field in org_fields[1:]
+    )
+    DIVISIONSET_FIELDS = tuple(
+        "division__divisionset__{}".format(field)
+        for field in OrganisationDivisionSetSerializer.Meta.fields
+    )
+    DIVISION_FIELDS = tuple(
+        "division__{}".format(field)
+        for field in OrganisationDivisionSerializer.Meta.fields[1:]
+    )
+    VALUES = (
+        (
+            "pk",
+            "election_id",
+            "tmp_election_id",
+            "election_title",
+            "poll_open_date",
+        )
+        + Election.TIMETABLE_FIELDS
+        + (
+            "election_type_id",
+            "election_type__name",
+            "election_type__election_type",
+            "election_subtype_id",
+            "election_subtype__name",
+            "election_subtype__election_subtype",
+            "organisation_id",
+        )
+        + ORGANISATION_FIELDS
+        + ("group__election_id", "group_type", "child_election_ids")
+        + ("elected_role__elected_title", "seats_contested", "division_id")
+        + DIVISIONSET_FIELDS
+        + DIVISION_FIELDS
+        + (
+            "voting_system",
+            "requires_voter_id",
+            "current",
+            "explanation__explanation",
+            "metadata__data",
+            "current_status",
+            "cancelled",
+            "cancellation_reason",
+            "replaces__election_id",
+            "replaced_by_election_ids",
+            "by_election_reason",
+            "tags",
+            "created",
+            "modified",
+        )
+    )
+
+    def __init__(self, instance=None, many=True, context=None):
+        self.instance = instance
+        self.context = context or {}
+        self.timezone = timezone.get_current_timezone()
+        self.recent_past = date.today() - timedelta(
+            days=settings.CURRENT_PAST_DAYS
+        )
+        self._election_types = {}
+        self._election_subtypes = {}
+        self._organisations = {}
+        self._divisions = {}
+
+    @classmethod
+    def setup_values(cls, queryset):
+        """
+        Turn a QuerySet that has been through
+        `ElectionSerializer.setup_eager_loading` into the rows this
+        serializer expects.
+        """
+        return (
+            queryset.prefetch_related(None)
+            .annotate(
+                replaced_by_election_ids=ArraySubquery(
+                    Election.private_objects.filter(
+                        replaces=OuterRef("pk")
+                    ).values("election_id")
+                )
+            )
+            .values(*cls.VALUES)
+        )
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.instance]
+
+    def datetime(self, value):
+        if value is None:
+            return None
+        value = value.astimezone(self.timezone).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    def date(self, value):
+        if value is None:
+            return None
+        return value.isoformat()
+
+    def get_election_type(self, row):
+        pk = row["election_type_id"]
+        if pk not in self._election_types:
+            self._election_types[pk] = {
+                "name": row["election_type__name"],
+                "election_type": row["election_type__election_type"],
+            }
+        return self._election_types[pk]
+
+    def get_election_subtype(self, row):
+        pk = row["election_subtype_id"]
+        if pk is None:
+            return None
+        if pk not in self._election_subtypes:
+            self._election_subtypes[pk] = {
+                "name": row["election_subtype__name"],
+                "election_subtype": row["election_subtype__election_subtype"],
+            }
+        return self._election_subtypes[pk]
+
+    def get_organisation(self, row):
+        pk = row["organisation_id"]
+        if pk is None:
+            return None
+        if pk not in self._organisations:
+            url = reverse(
+                "api:organisation-detail",
+                kwargs={
+                    "organisation_type": row["organisation__organisation_type"],
+                    "official_identifier": row[
+                        "organisation__official_identifier"
+                    ],
+                    "date": row["organisation__start_date"],
+                },
+                request=self.context["request"],
+                format=self.context.get("format"),
+            )
+            self._organisations[pk] = {
+                "url": url,
+                "official_identifier": row["organisation__official_identifier"],
+                "organisation_type": row["organisation__organisation_type"],
+                "organisation_subtype": row[
+                    "organisation__organisation_subtype"
+                ],
+                "official_name": row["organisation__official_name"],
+                "common_name": row["organisation__common_name"],
+                "slug": row["organisation__slug"],
+                "territory_code": row["organisation__territory_code"],
+                "election_name": row["organisation__election_name"],
+                "start_date": self.date(row["organisation__start_date"]),
+                "end_date": self.date(row["organisation__end_date"]),
+                "created": self.datetime(row["organisation__created"]),
+                "modified": self.datetime(row["organisation__modified"]),
+            }
+        return self._organisations[pk]
+
+    def get_division(self, row):
+        pk = row["division_id"]
+        if pk is None:
+            return None
+        if pk not in self._divisions:
+            self._divisions[pk] = {
+                "divisionset": {
+                    "start_date": self.date(
+                        row["division__divisionset__start_date"]
+                    ),
+                    "end_date": self.date(
+                        row["division__divisionset__end_date"]
+                    ),
+                    "legislation_url": row[
+                        "division__divisionset__legislation_url"
+                    ],
+                    "consultation_url": row[
+                        "division__divisionset__consultation_url"
+                    ],
+                    "short_title": row["division__divisionset__short_title"],
+                    "notes": row["division__divisionset__notes"],
+                },
+                "name": row["division__name"],
+                "official_identifier": row["division__official_identifier"],
+                "slug": row["division__slug"],
+                "division_type": row["division__division_type"],
+                "division_subtype": row["division__division_subtype"],
+                "division_election_sub_type": row[
+                    "division__division_election_sub_type"
+                ],
+                "seats_total": row["division__seats_total"],
+                "territory_code": row["division__territory_code"],
+                "created": self.datetime(row["division__created"]),
+                "modified": self.datetime(row["division__modified"]),
+            }
+        return self._divisions[pk]
+
+    def get_voting_system(self, row):
+        if row["group_type"] in ("organisation", "subtype", None, ""):
+            return VOTING_SYSTEM_PAYLOADS.get(row["voting_system"])
+        return None
+
+    def get_current(self, row):
+        if row["current"] is not None:
+            return row["current"]
+        return row["poll_open_date"] >= self.recent_past
+
+    def to_representation(self, row):
+        group_type = row["group_type"]
+        replaced_by = row["replaced_by_election_ids"]
+        data = {
+            "election_id": row["election_id"],
+            "tmp_election_id": row["tmp_election_id"],
+            "election_title": row["election_title"],
+            "poll_open_date": self.date(row["poll_open_date"]),
+            "timetable": {
+                field: row[field] for field in Election.TIMETABLE_FIELDS
+            },
+            "election_type": self.get_election_type(row),
+            "election_subtype": self.get_election_subtype(row),
+            "organisation": self.get_organisation(row),
+            "group": row["group__election_id"],
+            "group_type": group_type,
+            "identifier_type": group_type or "ballot",
+            "children": row["child_election_ids"] if group_type else [],
+            "elected_role": row["elected_role__elected_title"],
+            "seats_contested": row["seats_contested"],
+            "division": self.get_division(row),
+            "voting_system": self.get_voting_system(row),
+            "requires_voter_id": row["requires_voter_id"],
+            "current": self.get_current(row),
+            "explanation": row["explanation__explanation"],
+            "metadata": row["metadata__data"],
+            "deleted": row["current_status"]
+            == ModerationStatuses.deleted.value,
+            "cancelled": row["cancelled"],
+            "cancellation_reason": row["cancellation_reason"],
+            "replaces": row["replaces__election_id"],
+            "replaced_by": replaced_by[0] if replaced_by else None,
+            "by_election_reason": row["by_election_reason"],
+            "tags": row["tags"],
+            "created": self.datetime(row["created"]),
+            "modified": self.datetime(row["modified"]),
+        }
+        if len(replaced_by) > 1:
+            # Election.replaced_by raises for this, so ElectionSerializer
+            # leaves the field out
+            logger.warning(
+                f"{row['election_id']} has more than one replacement: "
+                f"{replaced_by}"
+            )
+            del data["replaced_by"]
+        return data
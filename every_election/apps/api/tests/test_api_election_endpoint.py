@@ -1,10 +1,26 @@
+import gzip
+import itertools
 import json
+import tempfile
 from datetime import datetime, timedelta
 from urllib.parse import urlencode
 
 import pytest
 import vcr
-from elections.models import ElectionType, MetaData
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from elections.models import (
+    Election,
+    ElectionChange,
+    ElectionType,
+    Explanation,
+    MetaData,
+    ModerationHistory,
+    ModerationStatuses,
+)
 from elections.tests.factories import (
     ElectionFactory,
     ElectionWithStatusFactory,
@@ -19,7 +35,7 @@ from organisations.tests.factories import (
     OrganisationFactory,
     OrganisationGeographyFactory,
 )
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 
 
 class TestElectionAPIQueries(APITestCase):
@@ -76,7 +92,7 @@ class TestElectionAPIQueries(APITestCase):
         ElectionWithStatusFactory(group=None, division_geography=None)
 
         # we should monitor this and be aware if this number increases
-        with self.assertNumQueries(5):
+        with self.assertNumQueries(6):
             resp = self.client.get("/api/elections/?postcode=SW1A1AA")
 
         data = resp.json()
@@ -139,6 +155,169 @@ class TestElectionAPIQueries(APITestCase):
         assert data["results"][0]["election_id"] == election_id
         assert len(data["results"]) == 1
 
+    def test_batch_lookup(self):
+        election_id = "local.place-name.2017-03-23"
+        ElectionWithStatusFactory(group=None, election_id=election_id)
+        ElectionWithStatusFactory(group=None, division_geography=None)
+
+        resp = self.client.post(
+            "/api/elections/lookup/",
+            {
+                "postcodes": ["SW1A1AA", "not-a-postcode"],
+                "coords": ["51.5010089365,-0.141587600123", "0,0", "foo"],
+            },
+            format="json",
+        )
+        self.assertEqual(200, resp.status_code)
+        data = resp.json()
+
+        self.assertEqual(
+            [election_id],
+            [e["election_id"] for e in data["results"]["SW1A1AA"]],
+        )
+        self.assertEqual(
+            [election_id],
+            [
+                e["election_id"]
+                for e in data["results"]["51.5010089365,-0.141587600123"]
+            ],
+        )
+        self.assertEqual([], data["results"]["0,0"])
+        self.assertEqual(
+            {
+                "not-a-postcode": "Invalid postcode",
+                "foo": "Invalid co-ordinates",
+            },
+            data["errors"],
+        )
+        # Same output shape as the list endpoint
+        resp = self.client.get("/api/elections/?postcode=SW1A1AA")
+        self.assertEqual(resp.json()["results"], data["results"]["SW1A1AA"])
+
+    def test_batch_lookup_num_queries_is_constant(self):
+        ElectionWithStatusFactory(group=None)
+
+        with CaptureQueriesContext(connection) as one_point:
+            self.client.post(
+                "/api/elections/lookup/",
+                {"postcodes": ["SW1A1AA"]},
+                format="json",
+            )
+        with CaptureQueriesContext(connection) as many_points:
+            self.client.post(
+                "/api/elections/lookup/",
+                {
+                    "postcodes": ["SW1A1AA", "SW1A 1AA"],
+                    "coords": [f"{self.lat},{self.lon}", "0,0", "1,1"],
+                },
+                format="json",
+            )
+        self.assertEqual(len(one_point), len(many_points))
+
+    def test_batch_lookup_invalid_body(self):
+        for body in [
+            [],
+            {"postcodes": "SW1A1AA"},
+            {"coords": [[51.5, -0.14]]},
+            {"postcodes": ["SW1A1AA"] * (settings.API_MAX_BATCH_LOOKUP + 1)},
+        ]:
+            with self.subTest(body=body):
+                resp = self.client.post(
+                    "/api/elections/lookup/", body, format="json"
+                )
+                self.assertEqual(400, resp.status_code)
+
+    def test_batch_lookup_cors(self):
+        resp = self.client.options(
+            "/api/elections/lookup/",
+            HTTP_ORIGIN="foo.bar/baz",
+            HTTP_ACCESS_CONTROL_REQUEST_METHOD="POST",
+            HTTP_ACCESS_CONTROL_REQUEST_HEADERS="content-type",
+        )
+        self.assertEqual(resp.get("Access-Control-Allow-Origin"), "*")
+        self.assertIn("POST", resp.get("Access-Control-Allow-Methods"))
+
+    def test_change_feed(self):
+        elections = ElectionWithStatusFactory.create_batch(5, group=None)
+        # Two elections with the same modified to check we page on id too
+        Election.private_objects.filter(
+            pk__in=[elections[1].pk, elections[2].pk]
+        ).update(modified=elections[1].modified)
+        expected = list(
+            Election.public_objects.order_by("modified", "pk").values_list(
+                "election_id", flat=True
+            )
+        )
+
+        seen = []
+        url = "/api/elections/?cursor=&limit=2"
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(url)
+            self.assertEqual(200, resp.status_code)
+            self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+            data = resp.json()
+            self.assertNotIn("count", data)
+            seen += [e["election_id"] for e in data["results"]]
+            if len(seen) == 2:
+                # Modify an election we've already seen, mid crawl
+                elections_seen = Election.private_objects.filter(
+                    election_id=seen[0]
+                )
+                elections_seen.update(modified=timezone.now())
+                expected.append(seen[0])
+            url = data["next"]
+        self.assertEqual(expected, seen)
+
+    def test_change_feed_invalid_cursor(self):
+        resp = self.client.get("/api/elections/?cursor=foo")
+        self.assertEqual(404, resp.status_code)
+
+    def test_export(self):
+        ElectionWithStatusFactory.create_batch(3, group=None)
+        expected = self.client.get("/api/elections/").json()["results"]
+
+        resp = self.client.get("/api/elections/export/")
+        self.assertEqual(200, resp.status_code)
+        self.assertTrue(resp.streaming)
+        self.assertEqual("application/x-ndjson", resp["Content-Type"])
+        lines = b"".join(resp.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(expected, [json.loads(line) for line in lines])
+
+    def test_export_gzip(self):
+        ElectionWithStatusFactory.create_batch(3, group=None)
+        expected = self.client.get("/api/elections/").json()["results"]
+
+        resp = self.client.get(
+            "/api/elections/export/", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual("gzip", resp["Content-Encoding"])
+        self.assertIn("Accept-Encoding", resp["Vary"])
+        content = gzip.decompress(b"".join(resp.streaming_content))
+        lines = content.decode("utf-8").splitlines()
+        self.assertEqual(expected, [json.loads(line) for line in lines])
+
+    def test_export_elections_command(self):
+        ElectionWithStatusFactory.create_batch(3, group=None)
+        expected = sorted(
+            self.client.get("/api/elections/").json()["results"],
+            key=lambda e: e["election_id"],
+        )
+
+        with tempfile.NamedTemporaryFile(suffix=".ndjson.gz") as output:
+            call_command(
+                "export_elections",
+                output=output.name,
+                gzip=True,
+                base_url="http://testserver/",
+                chunk_size=2,
+            )
+            with gzip.open(output.name, "rt") as f:
+                exported = [json.loads(line) for line in f]
+        self.assertEqual(
+            expected, sorted(exported, key=lambda e: e["election_id"])
+        )
+
     def test_metadata_filter(self):
         election = ElectionWithStatusFactory(
             group=None, poll_open_date=datetime.today()
@@ -217,6 +396,140 @@ class TestElectionAPIQueries(APITestCase):
         with self.assertNumQueries(2):
             self.client.get(f"/api/elections/{id_}/")
 
+    def test_detail_conditional_get(self):
+        group = ElectionWithStatusFactory(group=None, group_type="election")
+        url = f"/api/elections/{group.election_id}/"
+        resp = self.client.get(url)
+        etag = resp["ETag"]
+        self.assertIn("Last-Modified", resp)
+
+        with self.assertNumQueries(2):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, resp.status_code)
+        self.assertEqual(etag, resp["ETag"])
+
+        # A new child changes the group's representation
+        ElectionWithStatusFactory(group=group)
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, resp.status_code)
+        self.assertNotEqual(etag, resp["ETag"])
+        self.assertEqual(1, len(resp.json()["children"]))
+
+        resp = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]
+        )
+        self.assertEqual(304, resp.status_code)
+
+    def test_list_conditional_get(self):
+        ElectionWithStatusFactory(group=None)
+        for url in ("/api/elections/", "/api/elections/?fast"):
+            etag = self.client.get(url)["ETag"]
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(304, resp.status_code)
+
+        etag = self.client.get("/api/elections/")["ETag"]
+        ElectionWithStatusFactory(group=None)
+        resp = self.client.get("/api/elections/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(2, resp.json()["count"])
+
+    def test_list_not_modified_before_fetching_page(self):
+        ElectionWithStatusFactory(group=None)
+        resp = self.client.get("/api/elections/")
+        self.assertIn("Last-Modified", resp)
+
+        # Just the COUNT and the validators for the page
+        with self.assertNumQueries(2):
+            resp = self.client.get(
+                "/api/elections/", HTTP_IF_NONE_MATCH=resp["ETag"]
+            )
+        self.assertEqual(304, resp.status_code)
+
+        resp = self.client.get(
+            "/api/elections/", HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]
+        )
+        self.assertEqual(304, resp.status_code)
+
+    def test_list_modified_by_related_objects(self):
+        election = ElectionWithStatusFactory(group=None)
+        election.explanation = Explanation.objects.create(
+            description="test", explanation="Before"
+        )
+        election.save()
+        etag = self.client.get("/api/elections/")["ETag"]
+
+        election.explanation.explanation = "After"
+        election.explanation.save()
+        resp = self.client.get("/api/elections/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual("After", resp.json()["results"][0]["explanation"])
+
+    def _create_election_tree(self, status):
+        metadata = MetaData.objects.create(
+            description="just a test", data={"foo": {"title": "bar"}}
+        )
+        group = ElectionWithStatusFactory(
+            group=None,
+            group_type="election",
+            metadata=metadata,
+            moderation_status=related_status(status),
+        )
+        org_group = ElectionWithStatusFactory(
+            group=group,
+            group_type="organisation",
+            metadata=metadata,
+            moderation_status=related_status(status),
+        )
+        cancelled = ElectionWithStatusFactory(
+            group=org_group,
+            metadata=metadata,
+            cancelled=True,
+            moderation_status=related_status(status),
+        )
+        ElectionWithStatusFactory(
+            group=org_group,
+            metadata=metadata,
+            replaces=cancelled,
+            moderation_status=related_status(status),
+        )
+
+    def test_list_num_queries_is_constant(self):
+        combinations = list(
+            itertools.product(
+                [None, "ballot", "election", "organisation"],
+                [None, "1"],
+                [None, "1"],
+            )
+        )
+
+        def count_queries():
+            counts = {}
+            for identifier_type, deleted, metadata in combinations:
+                params = {
+                    key: value
+                    for key, value in (
+                        ("identifier_type", identifier_type),
+                        ("deleted", deleted),
+                        ("metadata", metadata),
+                    )
+                    if value
+                }
+                with CaptureQueriesContext(connection) as queries:
+                    resp = self.client.get("/api/elections/", params)
+                self.assertEqual(200, resp.status_code)
+                self.assertTrue(resp.json()["results"])
+                counts[(identifier_type, deleted, metadata)] = len(queries)
+            return counts
+
+        self._create_election_tree("Approved")
+        self._create_election_tree("Deleted")
+        small_page_counts = count_queries()
+
+        for _ in range(5):
+            self._create_election_tree("Approved")
+            self._create_election_tree("Deleted")
+        self.assertEqual(small_page_counts, count_queries())
+
     def test_identifier_type_filter(self):
         group = ElectionWithStatusFactory(
             group_type="election", moderation_status=related_status("Approved")
@@ -293,6 +606,16 @@ class TestElectionAPIQueries(APITestCase):
                 self.assertEqual(data["count"], 1)
                 self.assertIn(election_type, election_types_returned)
 
+    def test_election_id_filter(self):
+        elections = ElectionWithStatusFactory.create_batch(3, group=None)
+        election_ids = [elections[0].election_id, elections[2].election_id]
+        params = urlencode({"election_id": ",".join(election_ids)})
+        data = self.client.get(f"/api/elections/?{params}").json()
+        self.assertEqual(
+            sorted(election_ids),
+            sorted(result["election_id"] for result in data["results"]),
+        )
+
     def test_organisation_filters(self):
         adu_election = ElectionWithStatusFactory(
             group_type="election",
@@ -609,3 +932,133 @@ class TestElectionAPIQueries(APITestCase):
         resp_json = resp.json()
         self.assertEqual(len(resp_json["results"]), 100)
         self.assertEqual(resp_json["count"], 102)
+
+
+class TestElectionChanges(APITransactionTestCase):
+    """
+    Committing for real, because the change log only serves changes once
+    the transactions that made them (and any older ones) have finished
+    """
+
+    def setUp(self):
+        for status in ModerationStatuses:
+            ModerationStatusFactory(short_label=status.value)
+
+    def test_changes(self):
+        elections = ElectionWithStatusFactory.create_batch(3, group=None)
+        suggested = ElectionWithStatusFactory(
+            group=None, moderation_status=related_status("Suggested")
+        )
+
+        data = self.client.get("/api/elections/changes/").json()
+        self.assertIsNone(data["next"])
+        self.assertEqual(
+            {election.election_id for election in [*elections, suggested]},
+            {change["election_id"] for change in data["results"]},
+        )
+        self.assertEqual(
+            "Suggested",
+            [
+                change["current_status"]
+                for change in data["results"]
+                if change["election_id"] == suggested.election_id
+            ][-1],
+        )
+        since = data["last_sequence"]
+
+        # Updates made outside Election.save are recorded too
+        Election.private_objects.filter(pk=elections[0].pk).update(
+            modified=timezone.now()
+        )
+        data = self.client.get(f"/api/elections/changes/?since={since}").json()
+        self.assertEqual(
+            [(elections[0].election_id, "Approved", False)],
+            [
+                (
+                    change["election_id"],
+                    change["current_status"],
+                    change["deleted"],
+                )
+                for change in data["results"]
+            ],
+        )
+        self.assertNotEqual(since, data["last_sequence"])
+        since = data["last_sequence"]
+
+        # As are elections leaving the approved set, one way or another
+        ModerationHistory.bulk_moderate(
+            [elections[1]], ModerationStatuses.rejected.value
+        )
+        Election.private_objects.filter(pk=elections[2].pk).delete()
+        data = self.client.get(f"/api/elections/changes/?since={since}").json()
+        self.assertEqual(
+            [
+                (elections[1].election_id, "Rejected", False),
+                (elections[2].election_id, "Approved", True),
+            ],
+            [
+                (
+                    change["election_id"],
+                    change["current_status"],
+                    change["deleted"],
+                )
+                for change in data["results"]
+            ],
+        )
+
+        data = self.client.get(
+            f"/api/elections/changes/?since={data['last_sequence']}"
+        ).json()
+        self.assertEqual([], data["results"])
+
+    def test_changes_paging(self):
+        ElectionWithStatusFactory.create_batch(3, group=None)
+        expected = [
+            change.get_position() for change in ElectionChange.objects.all()
+        ]
+
+        seen = []
+        url = "/api/elections/changes/?limit=2"
+        while url:
+            data = self.client.get(url).json()
+            seen += [change["sequence"] for change in data["results"]]
+            url = data["next"]
+        self.assertEqual(expected, seen)
+
+    def test_changes_latest(self):
+        ElectionWithStatusFactory.create_batch(2, group=None)
+        data = self.client.get("/api/elections/changes/?since=latest").json()
+        self.assertEqual([], data["results"])
+        self.assertEqual(
+            ElectionChange.objects.last().get_position(),
+            data["last_sequence"],
+        )
+
+        election = ElectionWithStatusFactory(group=None)
+        data = self.client.get(
+            f"/api/elections/changes/?since={data['last_sequence']}"
+        ).json()
+        self.assertEqual(
+            {election.election_id},
+            {change["election_id"] for change in data["results"]},
+        )
+
+    def test_changes_wait_for_transactions_in_progress(self):
+        with transaction.atomic():
+            ElectionWithStatusFactory(group=None)
+            self.assertTrue(ElectionChange.objects.exists())
+            self.assertFalse(ElectionChange.objects.committed().exists())
+        self.assertTrue(ElectionChange.objects.committed().exists())
+
+    def test_changes_invalid(self):
+        for query in [
+            "since=foo",
+            "since=-1",
+            "since=1.-2",
+            "since=1.2.3",
+            "limit=0",
+            "limit=10001",
+        ]:
+            with self.subTest(query=query):
+                resp = self.client.get(f"/api/elections/changes/?{query}")
+                self.assertEqual(400, resp.status_code)
@@ -59,6 +59,22 @@ class TestOrganisationAPIEndpoint(APITestCase):
             "Foo & Bar District Council", data["properties"]["official_name"]
         )
 
+    def test_get_org_geo_simplified(self):
+        url = "/api/organisations/local-authority/TEST1/2016-10-01/geo.json"
+        full = self.client.get(url).json()
+        resp = self.client.get(url + "?simplify=high")
+        self.assertEqual(200, resp.status_code)
+        data = resp.json()
+        self.assertEqual(full["properties"], data["properties"])
+        self.assertEqual("MultiPolygon", data["geometry"]["type"])
+
+    def test_get_org_geo_invalid_simplify(self):
+        resp = self.client.get(
+            "/api/organisations/local-authority/TEST1/2016-10-01/geo.json"
+            "?simplify=foo"
+        )
+        self.assertEqual(400, resp.status_code)
+
     def test_get_org_geo_not_found(self):
         resp = self.client.get(
             "/api/organisations/local-authority/TEST1/2001-10-01/geo.json"
@@ -88,3 +104,29 @@ class TestOrganisationAPIEndpoint(APITestCase):
         data = resp.json()
         self.assertEqual(200, resp.status_code)
         self.assertEqual([], data["results"])
+
+    def test_get_org_conditional(self):
+        url = "/api/organisations/local-authority/TEST1/2016-10-01.json"
+        resp = self.client.get(url)
+        self.assertIn("ETag", resp)
+        self.assertIn("Last-Modified", resp)
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"])
+        self.assertEqual(304, resp.status_code)
+        self.assertEqual(b"", resp.content)
+
+        resp = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"]
+        )
+        self.assertEqual(304, resp.status_code)
+
+    def test_filter_orgs_conditional(self):
+        url = "/api/organisations/local-authority.json"
+        etag = self.client.get(url)["ETag"]
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, resp.status_code)
+
+        OrganisationFactory(official_identifier="TEST3")
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(4, resp.json()["count"])
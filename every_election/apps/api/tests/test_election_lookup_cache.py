@@ -0,0 +1,120 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from elections.lookup_cache import ElectionLookupCache, election_lookup_cache
+from elections.tests.factories import ElectionWithStatusFactory
+from organisations.tests.factories import DivisionGeographyFactory
+from rest_framework.test import APITestCase
+
+
+@override_settings(ELECTION_LOOKUP_CACHE={"ENABLED": True})
+class TestElectionLookupCache(APITestCase):
+    fixtures = ["onspd.json"]
+
+    def setUp(self):
+        election_lookup_cache.clear()
+
+    def assertNoLookupQueries(self, queries):
+        for query in queries:
+            self.assertNotIn("onspd", query["sql"])
+            self.assertNotIn("subdivided", query["sql"])
+
+    def test_postcode_lookup_is_cached(self):
+        election_id = "local.place-name.2017-03-23"
+        ElectionWithStatusFactory(group=None, election_id=election_id)
+        ElectionWithStatusFactory(group=None, division_geography=None)
+
+        resp = self.client.get("/api/elections/?postcode=SW1A1AA")
+        self.assertEqual(
+            [election_id],
+            [e["election_id"] for e in resp.json()["results"]],
+        )
+
+        # Second time round we skip the ONSPD and spatial lookups
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get("/api/elections/?postcode=sw1a%201aa")
+        self.assertNoLookupQueries(queries)
+        self.assertEqual(
+            [election_id],
+            [e["election_id"] for e in resp.json()["results"]],
+        )
+
+    def test_coords_lookup_is_cached(self):
+        election_id = "local.place-name.2017-03-23"
+        ElectionWithStatusFactory(group=None, election_id=election_id)
+
+        self.client.get("/api/elections/?coords=51.5010089365,-0.141587600123")
+        # rounds to the same key
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(
+                "/api/elections/?coords=51.501008937,-0.141587601"
+            )
+        self.assertNoLookupQueries(queries)
+        self.assertEqual(
+            [election_id],
+            [e["election_id"] for e in resp.json()["results"]],
+        )
+
+    def test_cache_invalidated_on_election_save(self):
+        self.client.get("/api/elections/?postcode=SW1A1AA")
+        # the factory mutes post_save, so save again to fire the signal
+        election = ElectionWithStatusFactory(group=None)
+        election.save()
+
+        resp = self.client.get("/api/elections/?postcode=SW1A1AA")
+        self.assertEqual(
+            [election.election_id],
+            [e["election_id"] for e in resp.json()["results"]],
+        )
+
+    def test_cache_invalidated_on_geography_save(self):
+        election = ElectionWithStatusFactory(
+            group=None, division_geography=None
+        )
+        resp = self.client.get("/api/elections/?postcode=SW1A1AA")
+        self.assertEqual(0, resp.json()["count"])
+
+        # Saving the geography doesn't re-save the election
+        geography = DivisionGeographyFactory()
+        election.__class__.private_objects.filter(pk=election.pk).update(
+            division_geography=geography
+        )
+        geography.save()
+
+        resp = self.client.get("/api/elections/?postcode=SW1A1AA")
+        self.assertEqual(1, resp.json()["count"])
+
+
+@override_settings(
+    ELECTION_LOOKUP_CACHE={"ENABLED": True, "MAX_SIZE": 2, "TIMEOUT": 60}
+)
+def test_lru_eviction():
+    cache = ElectionLookupCache()
+    calls = []
+
+    def lookup(value):
+        def _lookup():
+            calls.append(value)
+            return [value]
+
+        return _lookup
+
+    assert cache.get_or_set("a", lookup(1)) == (1,)
+    assert cache.get_or_set("b", lookup(2)) == (2,)
+    # touch "a" so "b" is least recently used
+    assert cache.get_or_set("a", lookup(1)) == (1,)
+    assert cache.get_or_set("c", lookup(3)) == (3,)
+    assert calls == [1, 2, 3]
+
+    assert cache.get_or_set("a", lookup(1)) == (1,)
+    assert cache.get_or_set("b", lookup(2)) == (2,)
+    assert calls == [1, 2, 3, 2]
+
+
+@override_settings(ELECTION_LOOKUP_CACHE={"ENABLED": True, "TIMEOUT": -1})
+def test_expired_entries_are_refetched():
+    cache = ElectionLookupCache()
+    calls = []
+    cache.get_or_set("a", lambda: calls.append(1) or [1])
+    cache.get_or_set("a", lambda: calls.append(1) or [1])
+    assert calls == [1, 1]
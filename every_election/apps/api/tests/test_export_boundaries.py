@@ -0,0 +1,107 @@
+import io
+import json
+import tempfile
+from unittest import mock
+
+from api.management.commands.export_boundaries import Command
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from elections.tests.factories import ElectionWithStatusFactory
+
+
+# The groups are exported from worker threads with their own database
+# connections, so the test data has to be committed
+class TestExportBoundaries(TransactionTestCase):
+    def setUp(self):
+        self.group = ElectionWithStatusFactory(
+            election_id="local.2017-03-23",
+            group=None,
+            group_type="election",
+            division=None,
+            division_geography=None,
+        )
+        self.ballot = ElectionWithStatusFactory(
+            election_id="local.place-name.ward-1.2017-03-23",
+            group=self.group,
+        )
+        self.no_geography = ElectionWithStatusFactory(
+            election_id="local.place-name.ward-2.2017-03-23",
+            group=self.group,
+            division=None,
+            division_geography=None,
+        )
+
+    def export(self, stdout=None, stderr=None):
+        with (
+            tempfile.TemporaryDirectory() as output,
+            # These shell out to the topojson node package
+            mock.patch.object(Command, "topojson_convert"),
+            mock.patch.object(Command, "topojson_simplify"),
+        ):
+            call_command(
+                "export_boundaries",
+                "--from=2017-01-01",
+                f"--output={output}",
+                stdout=stdout or io.StringIO(),
+                stderr=stderr or io.StringIO(),
+            )
+            with open(f"{output}/local.2017-03-23.json") as f:
+                return json.load(f)
+
+    def test_export(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        exported = self.export(stdout, stderr)
+
+        self.assertEqual("FeatureCollection", exported["type"])
+        self.assertEqual("local.2017-03-23", exported["election_group"])
+        features = {feature["id"]: feature for feature in exported["features"]}
+        self.assertEqual(
+            {
+                "local.place-name.ward-1.2017-03-23",
+                "local.place-name.ward-2.2017-03-23",
+            },
+            set(features),
+        )
+
+        feature = features["local.place-name.ward-1.2017-03-23"]
+        self.assertEqual("Feature", feature["type"])
+        self.assertEqual("MultiPolygon", feature["geometry"]["type"])
+        self.assertEqual(
+            {
+                "name": self.ballot.election_title,
+                "division": self.ballot.division.name,
+                "organisation": self.ballot.organisation.official_name,
+            },
+            feature["properties"],
+        )
+
+        feature = features["local.place-name.ward-2.2017-03-23"]
+        self.assertIsNone(feature["geometry"])
+        self.assertEqual(
+            {
+                "name": self.no_geography.election_title,
+                "division": None,
+                "organisation": self.no_geography.organisation.official_name,
+            },
+            feature["properties"],
+        )
+
+        self.assertIn(
+            "Exported elections for group %s" % self.group, stdout.getvalue()
+        )
+        self.assertEqual(
+            "Election local.place-name.ward-2.2017-03-23 has no geography\n",
+            stderr.getvalue(),
+        )
+
+    def test_blank_group_type(self):
+        ElectionWithStatusFactory(
+            election_id="local.place-name.ward-3.2017-03-23",
+            group=self.group,
+            group_type="",
+        )
+        exported = self.export()
+        self.assertIn(
+            "local.place-name.ward-3.2017-03-23",
+            {feature["id"] for feature in exported["features"]},
+        )
@@ -0,0 +1,171 @@
+import json
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlparse
+
+from api.serializers import ElectionSerializer, FastElectionSerializer
+from django.test import override_settings
+from elections.models import Election, ElectionSubType, Explanation, MetaData
+from elections.tests.factories import (
+    ElectionTypeFactory,
+    ElectionWithStatusFactory,
+    related_status,
+)
+from organisations.tests.factories import (
+    OrganisationDivisionFactory,
+    OrganisationDivisionSetFactory,
+    OrganisationFactory,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+
+class TestFastElectionSerializer(APITestCase):
+    def setUp(self):
+        election_type = ElectionTypeFactory()
+        subtype = ElectionSubType.objects.create(
+            name="Constituencies",
+            election_type=election_type,
+            election_subtype="c",
+        )
+        org = OrganisationFactory(end_date=date(2030, 1, 1))
+        divisionset = OrganisationDivisionSetFactory(
+            organisation=org, legislation_url="https://example.com/"
+        )
+        division = OrganisationDivisionFactory(
+            divisionset=divisionset, territory_code="ENG", seats_total=3
+        )
+
+        group = ElectionWithStatusFactory(
+            election_id="local.2017-03-23",
+            group=None,
+            group_type="election",
+            organisation=None,
+            division=None,
+            elected_role=None,
+        )
+        org_group = ElectionWithStatusFactory(
+            election_id="local.place-name.2017-03-23",
+            group=group,
+            group_type="organisation",
+            organisation=org,
+            division=None,
+            voting_system="FPTP",
+        )
+        self.cancelled = ElectionWithStatusFactory(
+            election_id="local.place-name.ward-1.2017-03-23",
+            group=org_group,
+            organisation=org,
+            division=division,
+            election_subtype=subtype,
+            voting_system="FPTP",
+            cancelled=True,
+            cancellation_reason="NO_CANDIDATES",
+            close_of_nominations=date(2017, 2, 20),
+            explanation=Explanation.objects.create(
+                description="test", explanation="An explanation"
+            ),
+            metadata=MetaData.objects.create(
+                description="test", data={"voter_id": True}
+            ),
+            tags={"NUTS1": {"key": "UKF"}},
+        )
+        ElectionWithStatusFactory(
+            election_id="local.place-name.ward-1.2017-05-04",
+            group=None,
+            organisation=org,
+            division=division,
+            replaces=self.cancelled,
+            current=True,
+            poll_open_date=date.today() + timedelta(days=1),
+        )
+        ElectionWithStatusFactory(
+            election_id="local.place-name.ward-2.2017-03-23",
+            group=org_group,
+            organisation=org,
+            moderation_status=related_status("Deleted"),
+        )
+
+    def assertSameOutput(self, url):
+        expected = self.client.get(url).json()
+        separator = "&" if "?" in url else "?"
+        actual = self.client.get(url + separator + "fast").json()
+        if "results" in expected:
+            expected = expected["results"]
+            actual = actual["results"]
+        self.assertGreater(len(expected), 0)
+        self.assertEqual(
+            sorted(expected, key=lambda e: e["election_id"]),
+            sorted(actual, key=lambda e: e["election_id"]),
+        )
+
+    def test_serializer_parity(self):
+        request = Request(APIRequestFactory().get("/api/elections/"))
+        context = {"request": request, "format": None}
+        elections = ElectionSerializer.setup_eager_loading(
+            Election.public_objects.all()
+        ).order_by("pk")
+
+        renderer = JSONRenderer()
+        expected = renderer.render(
+            ElectionSerializer(elections, many=True, context=context).data
+        )
+        actual = renderer.render(
+            FastElectionSerializer(
+                FastElectionSerializer.setup_values(elections), context=context
+            ).data
+        )
+        self.assertEqual(json.loads(expected), json.loads(actual))
+
+    def test_list_parity_multiple_replacements(self):
+        ElectionWithStatusFactory(
+            election_id="local.place-name.ward-1.2017-06-01",
+            group=None,
+            replaces=self.cancelled,
+        )
+        with self.assertLogs("api.serializers", "WARNING"):
+            self.assertSameOutput("/api/elections/?identifier_type=ballot")
+        data = self.client.get("/api/elections/?fast").json()["results"]
+        cancelled = next(
+            e for e in data if e["election_id"] == self.cancelled.election_id
+        )
+        self.assertNotIn("replaced_by", cancelled)
+
+    def test_list_parity(self):
+        self.assertSameOutput("/api/elections/")
+
+    def test_list_parity_deleted(self):
+        self.assertSameOutput("/api/elections/?deleted=1")
+
+    def test_list_parity_format_suffix(self):
+        self.assertSameOutput("/api/elections.json")
+
+    def test_list_parity_filters(self):
+        self.assertSameOutput("/api/elections/?identifier_type=ballot&future")
+        self.assertSameOutput("/api/elections/?metadata=1")
+
+    def test_change_feed_parity(self):
+        self.assertSameOutput("/api/elections/?cursor=&limit=2")
+        expected = self.client.get("/api/elections/?cursor=&limit=2").json()
+        actual = self.client.get("/api/elections/?cursor=&limit=2&fast").json()
+        self.assertEqual(
+            parse_qs(urlparse(expected["next"]).query)["cursor"],
+            parse_qs(urlparse(actual["next"]).query)["cursor"],
+        )
+
+    def test_export_parity(self):
+        expected = b"".join(
+            self.client.get("/api/elections/export/").streaming_content
+        )
+        actual = b"".join(
+            self.client.get("/api/elections/export/?fast").streaming_content
+        )
+        self.assertEqual(
+            sorted(expected.splitlines()), sorted(actual.splitlines())
+        )
+
+    @override_settings(API_FAST_ELECTION_SERIALIZER=True)
+    def test_setting(self):
+        resp = self.client.get("/api/elections/")
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(4, resp.json()["count"])
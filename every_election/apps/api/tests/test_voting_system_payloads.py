@@ -0,0 +1,52 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from api.serializers import ElectionSerializer
+from django.test import SimpleTestCase
+from elections.datapackage import (
+    ELECTION_TYPE_PAYLOADS,
+    VOTING_SYSTEM_PAYLOADS,
+)
+from elections.models import Election
+from rest_framework.renderers import JSONRenderer
+from uk_election_ids.datapackage import ELECTION_TYPES, VOTING_SYSTEMS
+
+
+class TestVotingSystemPayloads(SimpleTestCase):
+    def test_payloads_are_read_only(self):
+        payload = VOTING_SYSTEM_PAYLOADS["FPTP"]
+        self.assertEqual("FPTP", payload["slug"])
+        with self.assertRaises(TypeError):
+            payload["slug"] = "STV"
+        with self.assertRaises(TypeError):
+            ELECTION_TYPE_PAYLOADS["local"]["name"] = "foo"
+
+    def test_payloads_render_as_json(self):
+        self.assertEqual(
+            dict(VOTING_SYSTEMS["FPTP"], slug="FPTP"),
+            json.loads(JSONRenderer().render(VOTING_SYSTEM_PAYLOADS["FPTP"])),
+        )
+
+    def test_get_voting_system_is_thread_safe(self):
+        serializer = ElectionSerializer()
+        elections = [
+            Election(voting_system=slug, group_type=None)
+            for slug in VOTING_SYSTEMS
+        ] * 200
+
+        def get_voting_system(election):
+            return election.voting_system, serializer.get_voting_system(
+                election
+            )
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(get_voting_system, elections))
+
+        for slug, payload in results:
+            self.assertIs(VOTING_SYSTEM_PAYLOADS[slug], payload)
+            self.assertEqual(slug, payload["slug"])
+        # The shared datapackage dicts are left alone
+        for system in VOTING_SYSTEMS.values():
+            self.assertNotIn("slug", system)
+        for election_type in ELECTION_TYPES.values():
+            self.assertNotIn("slug", election_type)
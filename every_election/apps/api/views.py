@@ -1,29 +1,40 @@
+import hashlib
 from collections import OrderedDict
-from datetime import datetime
+from datetime import date, datetime, time
 
 from api import filters
+from core.helpers import ModifiedCursorPagination
 from django.conf import settings
-from django.db.models import Prefetch
-from django.http import Http404
+from django.contrib.gis.geos import Point
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from elections.lookup_cache import election_lookup_cache
 from elections.models import (
     Election,
+    ElectionChange,
     ElectionSubType,
     ElectionType,
     ModerationStatuses,
 )
-from elections.query_helpers import PostcodeError
+from elections.query_helpers import PostcodeError, get_points_from_postcodes
+from organisations.constants import SIMPLIFIED_GEOGRAPHY_TOLERANCES
 from organisations.models import Organisation, OrganisationDivision
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import APIException
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from uk_election_ids.election_ids import validate
 
+from .exports import gzip_stream, iter_elections_ndjson
 from .serializers import (
     ElectionGeoSerializer,
     ElectionSerializer,
     ElectionSubTypeSerializer,
     ElectionTypeSerializer,
+    FastElectionSerializer,
     OrganisationDivisionSerializer,
     OrganisationGeoSerializer,
     OrganisationSerializer,
@@ -48,7 +59,234 @@ class APIInvalidElectionIdException(APIException):
     default_code = "invalid_election_id"
 
 
-class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
+class APIBatchLookupException(APIException):
+    status_code = 400
+    default_detail = (
+        "Expected a JSON object with a list of `postcodes` and/or a list of "
+        "`coords`, with at most {} items in total"
+    ).format(settings.API_MAX_BATCH_LOOKUP)
+    default_code = "invalid_batch_lookup"
+
+
+class APISimplifyException(APIException):
+    status_code = 400
+    default_detail = "Invalid simplify level. Expected one of: {}".format(
+        ", ".join(SIMPLIFIED_GEOGRAPHY_TOLERANCES)
+    )
+    default_code = "invalid_simplify"
+
+
+class APIChangesException(APIException):
+    status_code = 400
+    default_detail = (
+        "`since` must be `latest` or a sequence from a previous response and "
+        "`limit` a number up to {}"
+    ).format(settings.API_MAX_CHANGES)
+    default_code = "invalid_changes"
+
+
+def get_geo_serializer_context(request):
+    """
+    Serializer context for the /geo endpoints. `?simplify=` picks one of
+    the precomputed simplified geographies instead of the full one.
+    """
+    context = {"request": request}
+    level = request.query_params.get("simplify", None)
+    if level is not None:
+        try:
+            context["simplify_tolerance"] = SIMPLIFIED_GEOGRAPHY_TOLERANCES[
+                level
+            ]
+        except KeyError:
+            raise APISimplifyException()
+    return context
+
+
+def get_value(obj, name):
+    if isinstance(obj, dict):
+        # A row from `.values()`
+        return obj[name]
+    return getattr(obj, name)
+
+
+def start_of_today():
+    return datetime.combine(
+        date.today(), time.min, tzinfo=timezone.get_current_timezone()
+    )
+
+
+ELECTION_VALIDATOR_FIELDS = (
+    "pk",
+    "modified",
+    "last_modified",
+    "child_election_ids",
+    "replaced_by_election_ids",
+)
+
+
+def get_election_validator_rows(queryset):
+    """
+    Just what `get_election_validators` and `get_elections_last_modified`
+    need from a QuerySet that has been through
+    `ElectionSerializer.setup_eager_loading`, without the joins.
+    """
+    return FastElectionSerializer.setup_values(
+        queryset.annotate_last_modified()
+    ).values(*ELECTION_VALIDATOR_FIELDS)
+
+
+def get_elections_last_modified(rows):
+    # `current` can change at midnight without anything being saved
+    return max([row["last_modified"] for row in rows] + [start_of_today()])
+
+
+def get_election_validators(elections):
+    """
+    Everything about each election's representation that isn't covered by
+    its own `modified`, for use in ETags. Takes model instances or
+    `get_election_validator_rows` / FastElectionSerializer rows.
+    """
+    validators = [date.today()]
+    for election in elections:
+        if isinstance(election, dict):
+            validators.append(
+                (
+                    election["pk"],
+                    election["modified"],
+                    election["child_election_ids"],
+                    election["replaced_by_election_ids"],
+                )
+            )
+        else:
+            validators.append(
+                (
+                    election.pk,
+                    election.modified,
+                    getattr(election, "child_election_ids", None),
+                    [e.pk for e in election._replaced_by.all()],
+                )
+            )
+    return validators
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs with a 304 before serializing anything.
+
+    Views pass what their representation depends on to `not_modified` and
+    return its response if there is one. The ETag also covers the URL and
+    Accept header, so each format and page gets its own.
+
+    Lists are paginated over the cheap `get_validator_rows` query, and
+    the full objects are only fetched for a page that has changed.
+    """
+
+    def get_validator_rows(self, queryset):
+        return queryset.values("pk", "modified")
+
+    def get_validators(self, objects):
+        return [
+            (get_value(obj, "pk"), get_value(obj, "modified"))
+            for obj in objects
+        ]
+
+    def get_last_modified(self, obj):
+        return obj.modified
+
+    def get_list_last_modified(self, rows):
+        return max((row["modified"] for row in rows), default=None)
+
+    def get_objects(self, queryset, rows=None):
+        """
+        The objects to serialize for a page of validator `rows`, in the
+        same order, or all of `queryset` if the list isn't paginated
+        """
+        if rows is None:
+            return list(queryset)
+        pks = [row["pk"] for row in rows]
+        objects = {
+            get_value(obj, "pk"): obj for obj in queryset.filter(pk__in=pks)
+        }
+        # Anything deleted since the rows were read is left out
+        return [objects[pk] for pk in pks if pk in objects]
+
+    def not_modified(self, validators, last_modified=None):
+        key = repr(
+            (
+                self.request.get_full_path(),
+                self.request.headers.get("Accept"),
+                validators,
+            )
+        )
+        self.conditional_etag = 'W/"{}"'.format(
+            hashlib.sha1(key.encode("utf-8")).hexdigest()
+        )
+        self.conditional_last_modified = last_modified
+        return get_conditional_response(
+            self.request,
+            etag=self.conditional_etag,
+            last_modified=(
+                int(last_modified.timestamp()) if last_modified else None
+            ),
+        )
+
+    def page_not_modified(self, page):
+        return self.not_modified(
+            (
+                getattr(self.paginator, "count", None),
+                getattr(self.paginator, "has_next", None),
+                self.get_validators(page),
+            ),
+            self.get_list_last_modified(page),
+        )
+
+    def list_not_modified(self, rows):
+        return self.not_modified(
+            self.get_validators(rows), self.get_list_last_modified(rows)
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, "conditional_etag", None)
+        if etag and response.status_code in (200, 304):
+            response.headers.setdefault("ETag", etag)
+            if self.conditional_last_modified:
+                response.headers.setdefault(
+                    "Last-Modified",
+                    http_date(self.conditional_last_modified.timestamp()),
+                )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = self.paginate_queryset(self.get_validator_rows(queryset))
+        if page is not None:
+            if response := self.page_not_modified(page):
+                return response
+            serializer = self.get_serializer(
+                self.get_objects(queryset, page), many=True
+            )
+            return self.get_paginated_response(serializer.data)
+
+        if response := self.list_not_modified(
+            list(self.get_validator_rows(queryset))
+        ):
+            return response
+        serializer = self.get_serializer(self.get_objects(queryset), many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if response := self.not_modified(
+            self.get_validators([instance]), self.get_last_modified(instance)
+        ):
+            return response
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+
+class ElectionViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Election.public_objects.all()
     serializer_class = ElectionSerializer
     lookup_field = "election_id"
@@ -59,47 +297,207 @@ class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
     def geo(self, request, election_id=None, format=None):
         election = self.get_queryset().get(election_id=election_id)
         return Response(
-            ElectionGeoSerializer(election, context={"request": request}).data
+            ElectionGeoSerializer(
+                election, context=get_geo_serializer_context(request)
+            ).data
         )
 
-    def get_queryset(self):
-        select_related = [
-            "election_type",
-            "election_subtype",
-            "organisation",
-            "elected_role",
-            "division",
-            "division__divisionset",
-            "group",
-            "replaces",
-            "metadata",
-        ]
+    @action(detail=False, methods=["post"], url_path="lookup")
+    def lookup(self, request, format=None):
+        """
+        Look up the elections for many postcodes and/or points at once.
+
+        Expects a JSON body like:
+
+            {"postcodes": ["SW1A 1AA", ...], "coords": ["51.5,-0.14", ...]}
+
+        and returns the elections for each input, keyed on the input as it
+        was given. Inputs we can't look up are listed under `errors`.
+        The other filters supported by the list view can be passed in the
+        query string.
+        """
+        if not isinstance(request.data, dict):
+            raise APIBatchLookupException()
+        postcodes = request.data.get("postcodes", [])
+        coords = request.data.get("coords", [])
+        if (
+            not isinstance(postcodes, list)
+            or not isinstance(coords, list)
+            or len(postcodes) + len(coords) > settings.API_MAX_BATCH_LOOKUP
+            or not all(isinstance(value, str) for value in postcodes + coords)
+        ):
+            raise APIBatchLookupException()
+
+        points = get_points_from_postcodes(postcodes)
+        errors = {
+            postcode: APIPostcodeException.default_detail
+            for postcode in postcodes
+            if postcode not in points
+        }
+        for coord in coords:
+            try:
+                lat, lng = map(float, coord.split(","))
+            except ValueError:
+                errors[coord] = APICoordsException.default_detail
+                continue
+            points[coord] = Point(lng, lat)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        elections_by_point = queryset.group_by_point(points)
+
+        # Serialize each election once, however many inputs it matches
+        elections = {
+            election.pk: election
+            for point_elections in elections_by_point.values()
+            for election in point_elections
+        }
+        serializer = self.get_serializer(list(elections.values()), many=True)
+        data_by_pk = dict(zip(elections, serializer.data))
+
+        return Response(
+            OrderedDict(
+                [
+                    (
+                        "results",
+                        {
+                            key: [data_by_pk[e.pk] for e in point_elections]
+                            for key, point_elections in elections_by_point.items()
+                        },
+                    ),
+                    ("errors", errors),
+                ]
+            )
+        )
+
+    @action(detail=False, url_path="export")
+    def export(self, request, format=None):
+        """
+        Stream every election matching the filters as newline delimited
+        JSON, unpaginated. Gzipped if the client accepts it.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer_class = ElectionSerializer
+        if self.use_fast_serializer():
+            queryset = FastElectionSerializer.setup_values(queryset)
+            serializer_class = FastElectionSerializer
+        content = iter_elections_ndjson(
+            queryset,
+            self.get_serializer_context(),
+            serializer_class=serializer_class,
+        )
+        gzipped = "gzip" in request.headers.get("Accept-Encoding", "")
+        if gzipped:
+            content = gzip_stream(content)
 
-        queryset = Election.public_objects.all()
-        queryset = queryset.select_related(*select_related).prefetch_related(
-            "_replaced_by"
+        response = StreamingHttpResponse(
+            content, content_type="application/x-ndjson"
         )
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
 
-        if self.request.query_params.get("deleted", None) is not None:
-            queryset = (
-                Election.private_objects.all()
-                .select_related(*select_related)
-                .filter_by_status("Deleted")
+    @action(detail=False, url_path="changes")
+    def changes(self, request, format=None):
+        """
+        The election change log: every change to an election after the
+        position `since`, in the order their transactions committed.
+        Mirrors keep the `last_sequence` of each response and pass it as
+        `since` next time; an `election_changes_recorded` event is sent
+        when there's more. `?since=latest` returns no changes, just the
+        position to start following the log from.
+
+        Each change has the election's status at the time, and `deleted`
+        if the election was deleted outright, so that mirrors can drop
+        elections that are no longer approved. An election that changes
+        more than once will appear more than once.
+        """
+        since = request.query_params.get("since", "0")
+        try:
+            limit = int(
+                request.query_params.get("limit", settings.API_MAX_CHANGES)
             )
+            if since != "latest":
+                since = ElectionChange.parse_position(since)
+        except ValueError:
+            raise APIChangesException()
+        if not 0 < limit <= settings.API_MAX_CHANGES:
+            raise APIChangesException()
+
+        committed = ElectionChange.objects.committed()
+        if since == "latest":
+            latest = committed.in_order().reverse().first()
+            since = (latest.xact_id, latest.pk) if latest else (0, 0)
+            changes = []
         else:
-            identifier_type = self.request.query_params.get(
-                "identifier_type", None
+            changes = list(
+                committed.after(since)
+                .in_order()
+                .values_list(
+                    "xact_id",
+                    "id",
+                    "election_identifier",
+                    "current_status",
+                    "deleted",
+                    "created",
+                )[:limit]
             )
-            if identifier_type and identifier_type != "ballot":
-                queryset = queryset.prefetch_related(
-                    Prefetch("_children_qs", Election.public_objects.all())
-                )
+        last_sequence = ElectionChange.format_position(
+            *(changes[-1][:2] if changes else since)
+        )
+        next_url = None
+        if len(changes) == limit:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "since", last_sequence
+            )
+        return Response(
+            OrderedDict(
+                [
+                    ("last_sequence", last_sequence),
+                    ("next", next_url),
+                    (
+                        "results",
+                        [
+                            {
+                                "sequence": ElectionChange.format_position(
+                                    xact_id, change_id
+                                ),
+                                "election_id": election_id,
+                                "current_status": current_status,
+                                "deleted": deleted,
+                                "created": created,
+                            }
+                            for (
+                                xact_id,
+                                change_id,
+                                election_id,
+                                current_status,
+                                deleted,
+                                created,
+                            ) in changes
+                        ],
+                    ),
+                ]
+            )
+        )
+
+    def get_queryset(self):
+        deleted = self.request.query_params.get("deleted", None) is not None
+        if deleted:
+            queryset = Election.private_objects.filter_by_status("Deleted")
+        else:
+            queryset = Election.public_objects.all()
+        queryset = self.get_serializer_class().setup_eager_loading(
+            queryset, deleted=deleted
+        )
 
         postcode = self.request.query_params.get("postcode", None)
         if postcode is not None:
             postcode = postcode.replace(" ", "")
             try:
-                queryset = queryset.for_postcode(postcode)
+                queryset = election_lookup_cache.for_postcode(
+                    queryset, postcode
+                )
             except PostcodeError:
                 raise APIPostcodeException()
 
@@ -109,7 +507,9 @@ class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
                 lat, lng = map(float, coords.split(","))
             except ValueError:
                 raise APICoordsException()
-            queryset = queryset.for_lat_lng(lat=lat, lng=lng)
+            queryset = election_lookup_cache.for_lat_lng(
+                queryset, lat=lat, lng=lng
+            )
 
         if self.request.query_params.get("current", None) is not None:
             queryset = queryset.current()
@@ -126,8 +526,46 @@ class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
                 queryset = queryset.filter(group_type=None)
             else:
                 queryset = queryset.filter(group_type=identifier_type)
+
+        if self.action == "retrieve":
+            queryset = queryset.annotate_last_modified()
         return queryset.order_by_group_type()
 
+    def get_validator_rows(self, queryset):
+        return get_election_validator_rows(queryset)
+
+    def get_validators(self, elections):
+        return get_election_validators(elections)
+
+    def get_last_modified(self, election):
+        # `current` can change at midnight without anything being saved
+        return max(election.last_modified, start_of_today())
+
+    def get_list_last_modified(self, rows):
+        return get_elections_last_modified(rows)
+
+    def get_objects(self, queryset, rows=None):
+        if self.use_fast_serializer():
+            queryset = FastElectionSerializer.setup_values(queryset)
+        return super().get_objects(queryset, rows)
+
+    @property
+    def paginator(self):
+        """
+        Passing `cursor` (empty for the first page) switches the list to a
+        change feed ordered by (modified, id) using keyset pagination.
+        Combine it with `modified` to follow changes since a point in time.
+        """
+        if not hasattr(self, "_paginator"):
+            if (
+                ModifiedCursorPagination.cursor_query_param
+                in self.request.query_params
+            ):
+                self._paginator = ModifiedCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def retrieve(self, request, *args, **kwargs):
         if not validate(kwargs["election_id"]):
             raise APIInvalidElectionIdException()
@@ -157,7 +595,11 @@ class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
         coords = self.request.query_params.get("coords", None)
         current = self.request.query_params.get("current", None)
         if (postcode or coords) and current:
-            serializer = self.get_serializer(queryset, many=True)
+            if response := self.list_not_modified(
+                list(self.get_validator_rows(queryset))
+            ):
+                return response
+            serializer = self.get_list_serializer(self.get_objects(queryset))
             return Response(
                 OrderedDict(
                     [
@@ -169,14 +611,40 @@ class ElectionViewSet(viewsets.ReadOnlyModelViewSet):
                 )
             )
 
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(self.get_validator_rows(queryset))
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            if response := self.page_not_modified(page):
+                return response
+            serializer = self.get_list_serializer(
+                self.get_objects(queryset, page)
+            )
             return self.get_paginated_response(serializer.data)
 
-        serializer = self.get_serializer(queryset, many=True)
+        if response := self.list_not_modified(
+            list(self.get_validator_rows(queryset))
+        ):
+            return response
+        serializer = self.get_list_serializer(self.get_objects(queryset))
         return Response(serializer.data)
 
+    def use_fast_serializer(self):
+        """
+        Passing `fast` (or setting API_FAST_ELECTION_SERIALIZER) builds
+        lists from `.values()` rows with FastElectionSerializer, which
+        gives the same output as ElectionSerializer in less time.
+        """
+        return (
+            settings.API_FAST_ELECTION_SERIALIZER
+            or self.request.query_params.get("fast", None) is not None
+        )
+
+    def get_list_serializer(self, elections):
+        if self.use_fast_serializer():
+            return FastElectionSerializer(
+                elections, many=True, context=self.get_serializer_context()
+            )
+        return self.get_serializer(elections, many=True)
+
 
 class ElectionTypeViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ElectionType.objects.all()
@@ -189,7 +657,7 @@ class ElectionSubTypeViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ElectionSubTypeSerializer
 
 
-class OrganisationViewSet(viewsets.ReadOnlyModelViewSet):
+class OrganisationViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Organisation.objects.all()
     serializer_class = OrganisationSerializer
     filterset_fields = ["modified"]
@@ -206,7 +674,7 @@ class OrganisationViewSet(viewsets.ReadOnlyModelViewSet):
         kwargs.pop("format", None)
         org = self.get_object(**kwargs)
         serializer = OrganisationGeoSerializer(
-            org, read_only=True, context={"request": request}
+            org, read_only=True, context=get_geo_serializer_context(request)
         )
         return Response(serializer.data)
 
@@ -214,30 +682,18 @@ class OrganisationViewSet(viewsets.ReadOnlyModelViewSet):
     def elections(self, request, **kwargs):
         kwargs.pop("format", None)
         org: Organisation = self.get_object(**kwargs)
-        serializer = ElectionSerializer(
+        elections = ElectionSerializer.setup_eager_loading(
             org.election_set.filter(
                 current_status=ModerationStatuses.approved.value
             )
-            .select_related(
-                "election_type",
-                "election_subtype",
-                "organisation",
-                "division",
-                "division__divisionset",
-                "elected_role",
-                "explanation",
-                "metadata",
-                "replaces",
-                "group",
-            )
-            .prefetch_related(
-                "_replaced_by",
-                Prefetch(
-                    "_children_qs",
-                    Election.public_objects.all(),
-                    to_attr="children",
-                ),
-            ),
+        )
+        rows = list(get_election_validator_rows(elections))
+        if response := self.not_modified(
+            get_election_validators(rows), get_elections_last_modified(rows)
+        ):
+            return response
+        serializer = ElectionSerializer(
+            elections,
             many=True,
             read_only=True,
             context={"request": request},
@@ -247,6 +703,10 @@ class OrganisationViewSet(viewsets.ReadOnlyModelViewSet):
     def retrieve(self, request, **kwargs):
         kwargs.pop("format", None)
         org = self.get_object(**kwargs)
+        if response := self.not_modified(
+            self.get_validators([org]), org.modified
+        ):
+            return response
         serializer = OrganisationSerializer(
             org, read_only=True, context={"request": request}
         )
@@ -256,25 +716,36 @@ class OrganisationViewSet(viewsets.ReadOnlyModelViewSet):
         kwargs.pop("format", None)
         orgs = Organisation.objects.all().filter(**kwargs)
 
-        page = self.paginate_queryset(orgs)
+        page = self.paginate_queryset(self.get_validator_rows(orgs))
         if page is not None:
+            if response := self.page_not_modified(page):
+                return response
             return self.get_paginated_response(
                 OrganisationSerializer(
-                    page,
+                    self.get_objects(orgs, page),
                     many=True,
                     read_only=True,
                     context={"request": request},
                 ).data
             )
 
+        if response := self.list_not_modified(
+            list(self.get_validator_rows(orgs))
+        ):
+            return response
         return Response(
             OrganisationSerializer(
-                orgs, many=True, read_only=True, context={"request": request}
+                self.get_objects(orgs),
+                many=True,
+                read_only=True,
+                context={"request": request},
             ).data
         )
 
 
-class OrganisationDivisionViewSet(viewsets.ReadOnlyModelViewSet):
+class OrganisationDivisionViewSet(
+    ConditionalGetMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = OrganisationDivision.objects.all()
     serializer_class = OrganisationDivisionSerializer
     filterset_fields = ["modified"]
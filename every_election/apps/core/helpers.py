@@ -1,6 +1,15 @@
+import base64
+from collections import OrderedDict
+
 from django.conf import settings
 from django.contrib.auth.models import Group, User
-from rest_framework.pagination import LimitOffsetPagination
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 def user_is_moderator(user: User):
@@ -12,3 +21,92 @@ def user_is_moderator(user: User):
 
 class MaxSizeLimitOffsetPagination(LimitOffsetPagination):
     max_limit = getattr(settings, "API_MAX_LIMIT", 100)
+
+
+class ModifiedCursorPagination(BasePagination):
+    """
+    Keyset pagination over (modified, pk), for mirrors following changes.
+
+    Unlike MaxSizeLimitOffsetPagination this doesn't COUNT the queryset
+    and each page costs the same however deep into the results it is.
+    Because the cursor is the (modified, pk) of the last object seen,
+    objects that are modified mid-crawl move to the end of the feed
+    rather than being skipped or repeated.
+    """
+
+    cursor_query_param = "cursor"
+    limit_query_param = "limit"
+    max_limit = getattr(settings, "API_CHANGE_FEED_MAX_LIMIT", 1000)
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return max(1, min(limit, self.max_limit))
+
+    def encode_cursor(self, obj):
+        if isinstance(obj, dict):
+            # A row from `.values()`
+            modified, pk = obj["modified"], obj["pk"]
+        else:
+            modified, pk = obj.modified, obj.pk
+        position = "{}|{}".format(modified.isoformat(), pk)
+        return base64.urlsafe_b64encode(position.encode("ascii")).decode(
+            "ascii"
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = base64.urlsafe_b64decode(encoded.encode("ascii"))
+            modified, pk = position.decode("ascii").split("|")
+            modified = parse_datetime(modified)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if modified is None:
+            raise NotFound(self.invalid_cursor_message)
+        return modified, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by("modified", "pk")
+        if position:
+            modified, pk = position
+            # The redundant modified__gte lets Postgres use the
+            # (modified, id) index for a range scan
+            queryset = queryset.filter(modified__gte=modified).filter(
+                Q(modified__gt=modified) | Q(pk__gt=pk)
+            )
+
+        results = list(queryset[: self.limit + 1])
+        self.has_next = len(results) > self.limit
+        self.page = results[: self.limit]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1]),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", None),
+                    ("results", data),
+                ]
+            )
+        )
@@ -5,6 +5,7 @@ import urllib
 
 import requests
 from django_extensions.db.models import TimeStampedModel
+from elections.propagation import modified_propagation
 from storage.s3wrapper import S3Wrapper
 
 """
@@ -92,13 +93,20 @@ class UpdateElectionsTimestampedModel(TimeStampedModel):
         get_latest_by = "modified"
         abstract = True
 
-    def save(self, **kwargs):
+    def save(self, *, push_event=True, **kwargs):
         """
         Whenever the object is saved, we update all related elections
         modified date to have the same date. This is to make sure that
         changes made on the parent Organisation or
         OrganisationDivision are picked up by importers looking for
-        changes to the Election made in EE
+        changes to the Election made in EE.
+
+        The update is made when the transaction commits, see
+        elections.propagation
         """
         super().save(**kwargs)
-        self.election_set.update(modified=self.modified)
+        modified_propagation.propagate(
+            self.modified,
+            announce=push_event,
+            **{self.election_set.field.attname: self.pk},
+        )
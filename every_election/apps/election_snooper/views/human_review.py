@@ -7,15 +7,8 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
 from django.views.generic import TemplateView
 from election_snooper.forms import ModerationHistoryForm
-from elections.constraints import check_constraints, has_approved_parents
-from elections.models import Election, ModerationHistory, ModerationStatuses
-
-
-def set_election_status(election, status, user):
-    event = ModerationHistory(
-        election=election, status_id=status, user=user, notes="moderation queue"
-    )
-    event.save()
+from elections.constraints import check_constraints
+from elections.models import Election, ModerationHistory
 
 
 class ModerationQueueView(UserPassesTestMixin, TemplateView):
@@ -50,20 +43,13 @@ class ModerationQueueView(UserPassesTestMixin, TemplateView):
         ballot_pk = request.POST.get("election", None)
         ballot = Election.private_objects.get(pk=ballot_pk)
         status = request.POST.get("{}-status".format(ballot_pk), None)
-        set_election_status(ballot, status, request.user)
-
-        if status == ModerationStatuses.approved.value:
-            # it doesn't make sense for an approved ballot to have parents
-            # which aren't approved, so if this happens we need to approve
-            # any parent (and grandparent) election objects
-            if ballot.group and not has_approved_parents(ballot):
-                set_election_status(ballot.group, status, request.user)
-            if (
-                ballot.group
-                and ballot.group.group
-                and not has_approved_parents(ballot)
-            ):
-                set_election_status(ballot.group.group, status, request.user)
+        # approving a ballot also approves any parent (and grandparent)
+        # election objects which aren't approved yet, because it doesn't
+        # make sense for an approved ballot to have unapproved parents
+        ModerationHistory.bulk_moderate(
+            [ballot], status, user=request.user, notes="moderation queue"
+        )
+        ballot.refresh_from_db()
 
         # if we've messed something up here, check_constraints()
         # will throw an (unhandled) ViolatedConstraint exception
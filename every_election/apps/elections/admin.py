@@ -15,6 +15,7 @@ from .models import (
     MetaData,
     ModerationHistory,
     ModerationStatuses,
+    SyncDeadLetter,
 )
 
 
@@ -111,14 +112,13 @@ def soft_delete(modeladmin, request, queryset):
     deleted status:
     https://github.com/DemocracyClub/EveryElection/wiki/Cancelled-Elections-and-Soft-Deletes
     """
-    for election in queryset:
-        mh = ModerationHistory(
-            status_id=ModerationStatuses.deleted.value,
-            election=election,
-            user=request.user,
-            notes="Bulk deleted via admin action",
-        )
-        mh.save(push_event=False)
+    ModerationHistory.bulk_moderate(
+        queryset,
+        ModerationStatuses.deleted.value,
+        user=request.user,
+        notes="Bulk deleted via admin action",
+        push_event=False,
+    )
     send_event(
         detail={"description": "Admin soft delete"},
         detail_type="elections_set_changed",
@@ -128,6 +128,30 @@ def soft_delete(modeladmin, request, queryset):
 soft_delete.short_description = "Soft delete"
 
 
+def approve(modeladmin, request, queryset):
+    ModerationHistory.bulk_moderate(
+        queryset,
+        ModerationStatuses.approved.value,
+        user=request.user,
+        notes="Bulk approved via admin action",
+    )
+
+
+approve.short_description = "Approve (and any parent groups)"
+
+
+def reject(modeladmin, request, queryset):
+    ModerationHistory.bulk_moderate(
+        queryset,
+        ModerationStatuses.rejected.value,
+        user=request.user,
+        notes="Bulk rejected via admin action",
+    )
+
+
+reject.short_description = "Reject"
+
+
 class ElectionAdmin(admin.ModelAdmin):
     search_fields = ("election_id",)
 
@@ -230,7 +254,14 @@ class ElectionAdmin(admin.ModelAdmin):
         "current",
         "current_status_display",
     ]
-    actions = [mark_current, mark_not_current, unset_current, soft_delete]
+    actions = [
+        mark_current,
+        mark_not_current,
+        unset_current,
+        approve,
+        reject,
+        soft_delete,
+    ]
     date_hierarchy = "poll_open_date"
 
     def friendly_group_type(self, obj):
@@ -373,6 +404,15 @@ class ModerationHistoryAdmin(admin.ModelAdmin):
         return False
 
 
+class SyncDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ("election_id", "error", "created")
+    search_fields = ("election_id",)
+    readonly_fields = ["election_id", "result", "error", "created", "modified"]
+
+    def has_add_permission(self, request):
+        return False
+
+
 class ElectionStatusProblemManager(Manager):
     def get_queryset(self):
         qs = super().get_queryset()
@@ -406,3 +446,4 @@ admin.site.register(Explanation, ExplanationAdmin)
 admin.site.register(MetaData, MetaDataAdmin)
 admin.site.register(ModerationHistory, ModerationHistoryAdmin)
 admin.site.register(ElectionStatusProblem, ElectionStatusProblemAdmin)
+admin.site.register(SyncDeadLetter, SyncDeadLetterAdmin)
@@ -1,15 +1,160 @@
+import atexit
 import json
 import logging
 import os
+import queue
+import threading
+import time
+from functools import cache
 from typing import Dict, Optional
 
 import boto3
+from botocore.config import Config
 from django.conf import settings
+from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
 
+@cache
+def get_events_client():
+    """
+    One EventBridge client per process, reused for every event. The client
+    retries throttling and transient errors itself.
+    """
+    if settings.EVENTS_CLIENT == "local":
+        return LocalEventsClient()
+    session = boto3.Session(
+        region_name=os.environ.get("AWS_REGION", "eu-west-2")
+    )
+    return session.client(
+        "events", config=Config(retries={"max_attempts": 5, "mode": "standard"})
+    )
+
+
+class LocalEventsClient:
+    """
+    Stands in for the EventBridge client when `EVENTS_CLIENT = "local"`,
+    keeping the entries it's given in `sent` instead of sending them
+    """
+
+    def __init__(self):
+        self.sent = []
+        self.calls = 0
+
+    def put_events(self, Entries):
+        self.calls += 1
+        self.sent.extend(Entries)
+        return {"FailedEntryCount": 0, "Entries": [{} for _ in Entries]}
+
+
+class EventPublisher:
+    """
+    A queue of events waiting to go to EventBridge, sent by a background
+    thread in batches of up to BATCH_SIZE (the PutEvents maximum) so that
+    nothing waits on AWS.
+
+    Delivery is best effort: events are only held in memory, and are
+    logged and dropped if EventBridge still won't take them after
+    MAX_ATTEMPTS, or if they haven't gone SHUTDOWN_TIMEOUT seconds after
+    the process starts to exit.
+    """
+
+    BATCH_SIZE = 10
+    # How many times to try entries that EventBridge reports as failed
+    MAX_ATTEMPTS = 3
+    RETRY_BACKOFF = 0.5
+    # How long to hold up the process exiting while events are sent
+    SHUTDOWN_TIMEOUT = 10
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def publish(self, entry: Dict):
+        self.queue.put(entry)
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.run, daemon=True)
+                self.worker.start()
+
+    def join(self, timeout=None):
+        """
+        Wait up to `timeout` seconds (forever if None) for everything
+        published so far to be sent. Returns whether it was.
+        """
+        waiter = threading.Thread(target=self.queue.join, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        return not waiter.is_alive()
+
+    def join_at_exit(self):
+        if not self.join(timeout=self.SHUTDOWN_TIMEOUT):
+            logger.error(
+                f"Dropped {self.queue.qsize()} events that weren't sent "
+                f"within {self.SHUTDOWN_TIMEOUT}s of exiting"
+            )
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.put_events(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def put_events(self, entries):
+        events_client = get_events_client()
+        try:
+            for attempt in range(self.MAX_ATTEMPTS):
+                if attempt:
+                    time.sleep(self.RETRY_BACKOFF * 2**attempt)
+                response = events_client.put_events(Entries=entries)
+                if not response["FailedEntryCount"]:
+                    return
+                entries = [
+                    entry
+                    for entry, result in zip(entries, response["Entries"])
+                    if result.get("ErrorCode")
+                ]
+            logger.error(
+                f"Dropped events EventBridge didn't accept: {entries}",
+                extra={"response": response},
+            )
+        except Exception as put_events_exception:
+            # We don't want to break whatever operation we were trying to
+            # do when sending the message, and the client has already
+            # retried. But we do want to tell sentry what was dropped.
+            logger.error(
+                f"Failed to send event: {str(put_events_exception)}. "
+                f"Dropped events: {entries}",
+                exc_info=True,
+                stack_info=True,
+            )
+
+
+event_publisher = EventPublisher()
+atexit.register(event_publisher.join_at_exit)
+
+
 def send_event(detail: Dict, detail_type: str, source: Optional[str] = None):
+    """
+    Queue an event for EventBridge. It's sent in the background once the
+    current transaction commits, and not at all if it rolls back.
+
+    This is fire and forget: nothing is persisted, and an event can be
+    lost if EventBridge is unavailable or the process exits (see
+    EventPublisher). Use events to prompt consumers to look for changes,
+    not to carry the only record of them. For elections, that's the
+    ElectionChange log behind /api/elections/changes/.
+    """
     if not settings.SEND_EVENTS:
         logger.info(f"Skipping {detail_type} because SEND_EVENTS is disabled.")
         # don't attempt to push anything in local dev/under test
@@ -18,38 +163,10 @@ def send_event(detail: Dict, detail_type: str, source: Optional[str] = None):
     if source is None:
         source = f"everyelection-{settings.DC_ENVIRONMENT}-{settings.EC2_IP}"
 
-    session = boto3.Session(
-        region_name=os.environ.get("AWS_REGION", "eu-west-2")
-    )
-    events_client = session.client("events")
-
-    event_bus_arn = settings.DC_EVENTBUS_ARN
-
-    try:
-        entries = [
-            {
-                "Source": source,
-                "DetailType": detail_type,
-                "Detail": json.dumps(detail),
-                "EventBusName": event_bus_arn,
-            }
-        ]
-        response = events_client.put_events(
-            Entries=entries,
-        )
-        if response["FailedEntryCount"] > 0:
-            logger.error(
-                f"send_event failed with {entries}",
-                extra={"response": response},
-            )
-    except (
-        # Only exception listed in the boto3 put_events docs.
-        events_client.exceptions.InternalException,
-    ) as put_events_exception:
-        # We don't want to break whatever operation we were trying to do when sending the message.
-        # But we do want to tell sentry about it.
-        logger.error(
-            f"Failed to send event: {str(put_events_exception)}",
-            exc_info=True,
-            stack_info=True,
-        )
+    entry = {
+        "Source": source,
+        "DetailType": detail_type,
+        "Detail": json.dumps(detail),
+        "EventBusName": settings.DC_EVENTBUS_ARN,
+    }
+    transaction.on_commit(lambda: event_publisher.publish(entry))
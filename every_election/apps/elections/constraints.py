@@ -1,4 +1,11 @@
-from elections.models import Election, ModerationStatuses
+from django.db.models import Exists, OuterRef, Q
+from elections.models import Election, ModerationHistory, ModerationStatuses
+
+NO_RELATED_STATUS = "Election {} has no related status objects"
+UNAPPROVED_PARENTS = (
+    "Election {} is approved but one or more parents are not approved"
+)
+NO_APPROVED_CHILD = "Election {} is approved but has no approved children"
 
 
 class ViolatedConstraint(Exception):
@@ -30,11 +37,7 @@ def has_related_status(election: Election):
 
 def check_constraints(election):
     if not has_related_status(election):
-        raise ViolatedConstraint(
-            "Election {} has no related status objects".format(
-                election.election_id
-            )
-        )
+        raise ViolatedConstraint(NO_RELATED_STATUS.format(election.election_id))
 
     if (
         election.group
@@ -42,9 +45,7 @@ def check_constraints(election):
         and not has_approved_parents(election)
     ):
         raise ViolatedConstraint(
-            "Election {} is approved but one or more parents are not approved".format(
-                election.election_id
-            )
+            UNAPPROVED_PARENTS.format(election.election_id)
         )
 
     if (
@@ -52,8 +53,58 @@ def check_constraints(election):
         and election.election_type.election_type not in ["mayor", "pcc"]
         and not has_approved_child(election)
     ):
-        raise ViolatedConstraint(
-            "Election {} is approved but has no approved children".format(
-                election.election_id
-            )
+        raise ViolatedConstraint(NO_APPROVED_CHILD.format(election.election_id))
+
+
+# The same constraints as check_constraints(), but as one query each over a
+# whole queryset of elections rather than a few queries per election
+
+
+def without_related_status(queryset):
+    return queryset.filter(
+        ~Exists(ModerationHistory.objects.filter(election=OuterRef("pk")))
+    )
+
+
+def without_approved_parents(queryset):
+    approved = ModerationStatuses.approved.value
+    return queryset.filter(group__isnull=False, current_status=approved).filter(
+        ~Q(group__current_status=approved)
+        | (
+            Q(group__group__isnull=False)
+            & ~Q(group__group__current_status=approved)
         )
+    )
+
+
+def without_approved_child(queryset):
+    return (
+        queryset.exclude(group_type=None)
+        .exclude(group_type="")
+        .exclude(election_type__election_type__in=["mayor", "pcc"])
+        .filter(~Exists(Election.public_objects.filter(group=OuterRef("pk"))))
+    )
+
+
+def find_violations(queryset=None):
+    """
+    Return a ViolatedConstraint for each election in `queryset` (all
+    elections by default) that check_constraints() would raise for, in
+    election_id order
+    """
+    if queryset is None:
+        queryset = Election.private_objects.all()
+
+    violations = {}
+    # In the same order as check_constraints(), so that we report the
+    # same violation for an election that breaks more than one
+    for find, message in (
+        (without_related_status, NO_RELATED_STATUS),
+        (without_approved_parents, UNAPPROVED_PARENTS),
+        (without_approved_child, NO_APPROVED_CHILD),
+    ):
+        for election_id in find(queryset).values_list("election_id", flat=True):
+            violations.setdefault(
+                election_id, ViolatedConstraint(message.format(election_id))
+            )
+    return [violations[election_id] for election_id in sorted(violations)]
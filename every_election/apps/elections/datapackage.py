@@ -0,0 +1,39 @@
+"""
+Read-only copies of the uk_election_ids datapackage, built once at import.
+
+The dicts in `uk_election_ids.datapackage` are shared by every thread in
+the process, so code that wants to add a key to one (e.g. its slug) should
+use these instead of mutating the originals.
+"""
+
+from types import MappingProxyType
+
+from uk_election_ids.datapackage import ELECTION_TYPES, VOTING_SYSTEMS
+
+
+def freeze(value):
+    """
+    Return a read-only copy of `value`, with dicts turned into
+    MappingProxyType and lists into tuples
+    """
+    if isinstance(value, dict):
+        return MappingProxyType(
+            {key: freeze(item) for key, item in value.items()}
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# The `voting_system` representation used by the API, keyed on slug
+VOTING_SYSTEM_PAYLOADS = freeze(
+    {slug: dict(system, slug=slug) for slug, system in VOTING_SYSTEMS.items()}
+)
+
+# ELECTION_TYPES with each type's slug added, keyed on slug
+ELECTION_TYPE_PAYLOADS = freeze(
+    {
+        slug: dict(election_type, slug=slug)
+        for slug, election_type in ELECTION_TYPES.items()
+    }
+)
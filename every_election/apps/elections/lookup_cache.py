@@ -0,0 +1,176 @@
+"""
+A cache of point lookups (postcode or lat/lng) to the PKs of the elections
+that cover that point.
+
+Almost all API traffic is a postcode search, and each one needs an ONSPD
+lookup plus a point-in-polygon query against the subdivided geography
+tables. The answer only changes when an Election or one of the geography
+tables changes, so we keep a bounded LRU cache per worker and, optionally,
+a shared Django cache backend so that workers can share answers and
+invalidations.
+
+Configure with the `ELECTION_LOOKUP_CACHE` setting:
+
+    ELECTION_LOOKUP_CACHE = {
+        "ENABLED": True,
+        "MAX_SIZE": 10000,
+        "TIMEOUT": 600,
+        "SHARED_CACHE_ALIAS": None,
+        "COORDS_PRECISION": 5,
+    }
+
+Invalidation is done by `clear()`, which is called by signal receivers in
+`elections.models` whenever an Election, DivisionGeography or
+OrganisationGeography is saved or deleted. Without a shared backend, only
+the local cache in the process making the change is cleared, so other
+workers rely on `TIMEOUT` to pick up changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_SETTINGS = {
+    "ENABLED": True,
+    "MAX_SIZE": 10000,
+    "TIMEOUT": 60 * 10,
+    "SHARED_CACHE_ALIAS": None,
+    "COORDS_PRECISION": 5,
+}
+
+GENERATION_KEY = "election_lookup:generation"
+
+
+class ElectionLookupCache:
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return {
+            **DEFAULT_SETTINGS,
+            **getattr(settings, "ELECTION_LOOKUP_CACHE", {}),
+        }
+
+    @property
+    def enabled(self):
+        return self.config["ENABLED"]
+
+    @property
+    def shared_cache(self):
+        alias = self.config["SHARED_CACHE_ALIAS"]
+        if not alias:
+            return None
+        return caches[alias]
+
+    def postcode_key(self, postcode):
+        return "postcode:{}".format(postcode.replace(" ", "").upper())
+
+    def round_coords(self, lat, lng):
+        precision = self.config["COORDS_PRECISION"]
+        return round(lat, precision), round(lng, precision)
+
+    def coords_key(self, lat, lng):
+        return "coords:{},{}".format(lat, lng)
+
+    def _generation(self):
+        shared_cache = self.shared_cache
+        if not shared_cache:
+            return 0
+        return shared_cache.get_or_set(GENERATION_KEY, 0, timeout=None)
+
+    def _get_local(self, key):
+        with self._lock:
+            try:
+                expires, value = self._entries[key]
+            except KeyError:
+                return None
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        config = self.config
+        with self._lock:
+            self._entries[key] = (time.monotonic() + config["TIMEOUT"], value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > config["MAX_SIZE"]:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key, get_election_ids):
+        """
+        Return the cached tuple of election PKs for `key`, calling
+        `get_election_ids` to populate the cache on a miss.
+        """
+        key = "election_lookup:{}:{}".format(self._generation(), key)
+        election_ids = self._get_local(key)
+        if election_ids is not None:
+            return election_ids
+
+        shared_cache = self.shared_cache
+        if shared_cache:
+            election_ids = shared_cache.get(key)
+
+        if election_ids is None:
+            election_ids = tuple(get_election_ids())
+            if shared_cache:
+                shared_cache.set(key, election_ids, self.config["TIMEOUT"])
+
+        self._set_local(key, election_ids)
+        return election_ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+        shared_cache = self.shared_cache
+        if shared_cache:
+            # Bumping the generation orphans every existing key, so other
+            # workers stop using their local copies on their next lookup
+            try:
+                shared_cache.incr(GENERATION_KEY)
+            except ValueError:
+                shared_cache.set(GENERATION_KEY, 1, timeout=None)
+
+    def for_postcode(self, queryset, postcode):
+        """
+        Filter an ElectionQuerySet to elections covering `postcode`.
+
+        Raises PostcodeError on a miss if the postcode can't be found.
+        """
+        if not self.enabled:
+            return queryset.for_postcode(postcode)
+        election_ids = self.get_or_set(
+            self.postcode_key(postcode),
+            lambda: queryset.model.private_objects.for_postcode(
+                postcode
+            ).values_list("pk", flat=True),
+        )
+        return queryset.filter(pk__in=election_ids)
+
+    def for_lat_lng(self, queryset, lat, lng):
+        """
+        Filter an ElectionQuerySet to elections covering (lat, lng).
+
+        Co-ordinates are rounded to `COORDS_PRECISION` decimal places
+        (~1m at the default of 5) so that nearby lookups share an entry.
+        """
+        if not self.enabled:
+            return queryset.for_lat_lng(lat=lat, lng=lng)
+        lat, lng = self.round_coords(lat, lng)
+        election_ids = self.get_or_set(
+            self.coords_key(lat, lng),
+            lambda: queryset.model.private_objects.for_lat_lng(
+                lat=lat, lng=lng
+            ).values_list("pk", flat=True),
+        )
+        return queryset.filter(pk__in=election_ids)
+
+
+election_lookup_cache = ElectionLookupCache()
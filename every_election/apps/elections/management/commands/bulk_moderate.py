@@ -0,0 +1,63 @@
+from django.core.management import BaseCommand
+from elections.models import Election, ModerationHistory, ModerationStatuses
+
+
+class Command(BaseCommand):
+    help = """
+    Set the moderation status of one or more elections in one go.
+
+    Example usage:
+    python manage.py bulk_moderate Approved local.essex.2025-05-01 --descendants
+    python manage.py bulk_moderate Deleted local.essex.abbey.2025-05-01 --notes "Uncontested"
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "status",
+            choices=[status.value for status in ModerationStatuses],
+            help="Moderation status to set",
+        )
+        parser.add_argument(
+            "elections",
+            nargs="+",
+            help="IDs of the elections to moderate",
+        )
+        parser.add_argument(
+            "--descendants",
+            action="store_true",
+            help="Also moderate all the child ballots of any groups given",
+        )
+        parser.add_argument(
+            "--notes",
+            action="store",
+            default="Bulk moderated via management command",
+            help="Notes to add to the moderation history",
+        )
+
+    def handle(self, *args, **options):
+        elections = Election.private_objects.filter(
+            election_id__in=options["elections"]
+        )
+        missing = set(options["elections"]) - set(
+            elections.values_list("election_id", flat=True)
+        )
+        if missing:
+            self.stderr.write(f"Couldn't find {', '.join(sorted(missing))}")
+            return
+
+        if options["descendants"]:
+            pks = set()
+            for election in elections:
+                pks.update(
+                    election.get_descendents(
+                        "private_objects", inclusive=True
+                    ).values_list("pk", flat=True)
+                )
+            elections = Election.private_objects.filter(pk__in=pks)
+
+        moderated = ModerationHistory.bulk_moderate(
+            elections, options["status"], notes=options["notes"]
+        )
+        self.stdout.write(
+            f"Set {len(moderated)} elections to {options['status']}"
+        )
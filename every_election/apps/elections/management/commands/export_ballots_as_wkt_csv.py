@@ -1,19 +1,69 @@
 import csv
 import datetime
 import io
+import json
+import tempfile
+import zlib
 
 import boto3
+import pyarrow as pa
+import pyarrow.parquet as pq
+from boto3.s3.transfer import TransferConfig
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import connection
 
+# Rows to fetch from the server-side cursor at a time
+CHUNK_SIZE = 1000
 
-def export_sql(date: str):
+# Size of each part of the multipart upload
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+
+# Rows per Parquet row group. Bigger groups compress and scan better, at
+# the cost of holding more geometries in memory while they're written.
+PARQUET_ROW_GROUP_SIZE = 10000
+
+PARQUET_SCHEMA = pa.schema(
+    [
+        ("election_id", pa.string()),
+        ("geography_id", pa.int64()),
+        ("geography", pa.binary()),
+        ("source_table", pa.string()),
+    ],
+    metadata={
+        # https://geoparquet.org/releases/v1.1.0/
+        "geo": json.dumps(
+            {
+                "version": "1.1.0",
+                "primary_column": "geography",
+                "columns": {
+                    # No CRS means OGC:CRS84, the lng/lat of our
+                    # SRID 4326 geographies. Subdivided geographies can
+                    # be Polygons or MultiPolygons.
+                    "geography": {
+                        "encoding": "WKB",
+                        "geometry_types": ["Polygon", "MultiPolygon"],
+                    }
+                },
+            }
+        )
+    },
+)
+
+
+def export_sql(date: str, geometry_function: str = "st_astext"):
+    """
+    `geometry_function` turns each geography into text for the CSV
+    (st_astext, WKT) or bytes for Parquet (st_asbinary, WKB)
+    """
+    geography_column = (
+        "geography_text" if geometry_function == "st_astext" else "geography"
+    )
     return f"""
     SELECT
         ee.election_id,
         COALESCE(odd.id, ogd.id) AS geography_id,
-        COALESCE(st_astext(odd.geography), st_astext(ogd.geography)) AS geography_text,
+        COALESCE({geometry_function}(odd.geography), {geometry_function}(ogd.geography)) AS {geography_column},
         CASE
            WHEN ogd.id IS NOT NULL THEN 'Organisation'
            WHEN odd.id IS NOT NULL THEN 'Division'
@@ -33,8 +83,42 @@ def export_sql(date: str):
     """
 
 
+class IterStream(io.RawIOBase):
+    """
+    A read-only file object over an iterable of bytes, so that boto3 can
+    upload data as it's produced rather than from one big buffer
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.leftover = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.leftover:
+            try:
+                self.leftover = next(self.chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self.leftover))
+        buffer[:size] = self.leftover[:size]
+        self.leftover = self.leftover[size:]
+        return size
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
 class Command(BaseCommand):
-    help = "Export a csv of current ballots to s3 along with geoms as wkt. Mostly for doign queries with in Athena"
+    help = "Export a csv (or GeoParquet) of current ballots to s3 along with geoms as wkt (or wkb). Mostly for doign queries with in Athena"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -66,34 +150,137 @@ class Command(BaseCommand):
             .date()
             .strftime("%Y-%m-%d"),
         )
+        parser.add_argument(
+            "--format",
+            help=(
+                "csv, with WKT geoms, or parquet: GeoParquet with WKB geoms. "
+                "A .csv filename is given a .parquet extension instead."
+            ),
+            choices=["csv", "parquet"],
+            default="csv",
+        )
+        parser.add_argument(
+            "--gzip",
+            help="gzip the csv as it's uploaded",
+            action="store_true",
+        )
 
     def handle(self, *args, **options):
-        ballots_query = export_sql(options["from_when"])
+        bucket = options["bucket"]
+        key = f"{options['prefix']}/{options['filename']}"
+        self.s3_client = boto3.client("s3")
+        self.transfer_config = TransferConfig(
+            multipart_chunksize=MULTIPART_CHUNKSIZE
+        )
 
-        with connection.cursor() as cursor:
-            self.stdout.write("Executing query to fetch ballots and wkt geoms")
-            cursor.execute(ballots_query)
-            fieldnames = [column[0] for column in cursor.description]
-            rows = cursor.fetchall()
+        if options["format"] == "parquet":
+            if options["gzip"]:
+                raise CommandError(
+                    "--gzip is only for csv, parquet is compressed already"
+                )
+            if key.endswith(".csv"):
+                key = f"{key[: -len('.csv')]}.parquet"
+            self.export_parquet(options["from_when"], bucket, key)
+        else:
+            if options["gzip"] and not key.endswith(".gz"):
+                key = f"{key}.gz"
+            self.export_csv(options["from_when"], bucket, key, options["gzip"])
 
-            self.stdout.write("Writing ballots and wkt csv to buffer")
-            csv_file = io.StringIO()
-            csv_writer = csv.writer(csv_file)
+    def iter_rows(self, sql):
+        """
+        Yield the column names and then chunks of rows, using a
+        server-side cursor so the whole result is never held in memory
+        """
+        with connection.chunked_cursor() as cursor:
+            self.stdout.write("Executing query to fetch ballots and geoms")
+            cursor.execute(sql)
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            yield [column[0] for column in cursor.description]
+            while rows:
+                yield rows
+                rows = cursor.fetchmany(CHUNK_SIZE)
 
-            csv_writer.writerow(fieldnames)
+    def csv_chunks(self, sql):
+        buffer = io.StringIO()
+        csv_writer = csv.writer(buffer)
+        chunks = self.iter_rows(sql)
+        csv_writer.writerow(next(chunks))
+        for rows in chunks:
             csv_writer.writerows(rows)
-            csv_file.seek(0)
-            csv_string = csv_file.getvalue()
-            csv_file.close()
-            csv_bytes = csv_string.encode("utf-8")
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
 
-            s3_client = boto3.client("s3")
-            bucket = options["bucket"]
-            key = f"{options['prefix']}/{options['filename']}"
+    def export_csv(self, from_when, bucket, key, gzip):
+        chunks = self.csv_chunks(export_sql(from_when))
+        if gzip:
+            chunks = gzip_chunks(chunks)
+
+        self.stdout.write(
+            f"Uploading ballots and wkt csv to s3://{bucket}/{key}"
+        )
+        self.s3_client.upload_fileobj(
+            io.BufferedReader(IterStream(chunks), MULTIPART_CHUNKSIZE),
+            bucket,
+            key,
+            Config=self.transfer_config,
+        )
+        self.stdout.write("Uploaded CSV to S3")
+
+    def record_batches(self, sql):
+        """
+        Yield the rows as Arrow record batches, each a whole number of
+        cursor chunks and, bar the last, at least PARQUET_ROW_GROUP_SIZE
+        rows
+        """
+        chunks = self.iter_rows(sql)
+        next(chunks)
+        batch = []
+        for rows in chunks:
+            batch.extend(rows)
+            if len(batch) >= PARQUET_ROW_GROUP_SIZE:
+                yield self.record_batch(batch)
+                batch = []
+        if batch:
+            yield self.record_batch(batch)
+
+    def record_batch(self, rows):
+        election_ids, geography_ids, geographies, source_tables = zip(*rows)
+        return pa.RecordBatch.from_arrays(
+            [
+                pa.array(election_ids, type=pa.string()),
+                pa.array(geography_ids, type=pa.int64()),
+                # psycopg gives us memoryviews
+                pa.array(
+                    [
+                        bytes(geom) if geom is not None else None
+                        for geom in geographies
+                    ],
+                    type=pa.binary(),
+                ),
+                pa.array(source_tables, type=pa.string()),
+            ],
+            schema=PARQUET_SCHEMA,
+        )
+
+    def export_parquet(self, from_when, bucket, key):
+        # Parquet's footer is written last, so unlike the CSV this can't be
+        # streamed to S3. Only one row group is held in memory at a time.
+        with tempfile.NamedTemporaryFile(suffix=".parquet") as parquet_file:
+            self.stdout.write("Writing ballots and wkb geoms to parquet")
+            with pq.ParquetWriter(
+                parquet_file.name, PARQUET_SCHEMA, compression="zstd"
+            ) as writer:
+                for batch in self.record_batches(
+                    export_sql(from_when, "st_asbinary")
+                ):
+                    writer.write_batch(batch)
 
             self.stdout.write(
-                f"Uploading ballots and wkt csv to s3://{bucket}/{key}"
+                f"Uploading ballots and wkb parquet to s3://{bucket}/{key}"
             )
-            s3_client.upload_fileobj(io.BytesIO(csv_bytes), bucket, key)
-
-            self.stdout.write("Uploaded CSV to S3")
+            self.s3_client.upload_file(
+                parquet_file.name, bucket, key, Config=self.transfer_config
+            )
+            self.stdout.write("Uploaded Parquet to S3")
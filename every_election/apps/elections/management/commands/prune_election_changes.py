@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+from elections.models import ElectionChange
+
+
+class Command(BaseCommand):
+    help = """
+    Delete entries from the election change log that are older than a given
+    number of days. Mirrors that have fallen further behind than this need
+    to catch up with `sync_elections --since` instead.
+
+    Example usage:
+    python manage.py prune_election_changes --days 90
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=90,
+            help="Keep changes from this many days ago onwards",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = ElectionChange.objects.filter(created__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} election changes")
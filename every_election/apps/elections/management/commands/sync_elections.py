@@ -2,7 +2,6 @@ import io
 
 from dateutil.parser import parse
 from django.core.management.base import BaseCommand, OutputWrapper
-from django.db import transaction
 from elections.sync_helper import ElectionSyncer
 
 
@@ -23,15 +22,22 @@ class Command(BaseCommand):
             action="store_true",
             help="Raises exception for import errors, for later logging",
         )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Carry on from the checkpoint left by an interrupted sync",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         stderr = self.stderr
         if options["raise_errors"]:
             # Add a String IO that can capture all the errors
             stderr = OutputWrapper(io.StringIO())
         syncer = ElectionSyncer(
-            since=options["since"], stdout=self.stdout, stderr=stderr
+            since=options["since"],
+            stdout=self.stdout,
+            stderr=stderr,
+            resume=options["resume"],
         )
         syncer.run_import()
 
@@ -1,16 +1,38 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.contrib.gis.db.models.functions import PointOnSurface
 from django.contrib.gis.geos import GEOSGeometry, Point
-from django.db import models
-from django.db.models import Case, When
+from django.db import connection, models
+from django.db.models import Case, Q, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from elections.query_helpers import get_point_from_postcode
 from organisations.models import (
+    DivisionGeographyPostcode,
     DivisionGeographySubdivided,
+    OrganisationGeographyPostcode,
     OrganisationGeographySubdivided,
 )
+from uk_geo_utils.helpers import Postcode
+
+POINTS_TO_GEOGRAPHIES_SQL = """
+    WITH points (key, geom) AS (
+        SELECT key, ST_SetSRID(ST_MakePoint(lng, lat), 4326)
+        FROM unnest(%s::text[], %s::float8[], %s::float8[]) AS p (key, lng, lat)
+    )
+    SELECT points.key, dgs.division_geography_id, NULL::integer
+    FROM points
+        JOIN organisations_divisiongeographysubdivided dgs
+            ON ST_Contains(dgs.geography, points.geom)
+    UNION
+    SELECT points.key, NULL::integer, ogs.organisation_geography_id
+    FROM points
+        JOIN organisations_organisationgeographysubdivided ogs
+            ON ST_Contains(ogs.geography, points.geom)
+"""
 
 
 class ElectionQuerySet(models.QuerySet):
@@ -26,13 +48,76 @@ class ElectionQuerySet(models.QuerySet):
             | models.Q(organisation_geography_id__in=org_ids)
         )
 
+    def group_by_point(self, points):
+        """
+        Resolve many points at once.
+
+        `points` is a dict of {key: Point}. Returns a dict of
+        {key: [Election, ...]} with an entry for every key, using one
+        spatial join for all of the points and one query for the elections.
+
+        Note that this evaluates the QuerySet.
+        """
+        keys = list(points)
+        results = {key: [] for key in keys}
+        if not keys:
+            return results
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                POINTS_TO_GEOGRAPHIES_SQL,
+                [
+                    keys,
+                    [points[key].x for key in keys],
+                    [points[key].y for key in keys],
+                ],
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            return results
+
+        keys_by_div = defaultdict(set)
+        keys_by_org = defaultdict(set)
+        for key, div_id, org_id in rows:
+            if div_id:
+                keys_by_div[div_id].add(key)
+            else:
+                keys_by_org[org_id].add(key)
+
+        elections = self.filter(
+            models.Q(division_geography_id__in=list(keys_by_div))
+            | models.Q(organisation_geography_id__in=list(keys_by_org))
+        )
+        for election in elections:
+            election_keys = keys_by_div.get(
+                election.division_geography_id, set()
+            ) | keys_by_org.get(election.organisation_geography_id, set())
+            for key in election_keys:
+                results[key].append(election)
+        return results
+
     def for_lat_lng(self, lat, lng):
         point = Point(lng, lat)
         return self.for_point(point)
 
     def for_postcode(self, postcode):
         point = get_point_from_postcode(postcode)
-        return self.for_point(point)
+        if not settings.USE_POSTCODE_LOOKUP_TABLE:
+            return self.for_point(point)
+
+        # We still look the postcode up in ONSPD above, so that unknown
+        # postcodes raise PostcodeError, but that's a primary key lookup.
+        postcode = Postcode(postcode).with_space
+        div_ids = DivisionGeographyPostcode.objects.filter(
+            postcode=postcode
+        ).values("division_geography_id")
+        org_ids = OrganisationGeographyPostcode.objects.filter(
+            postcode=postcode
+        ).values("organisation_geography_id")
+        return self.filter(
+            models.Q(division_geography_id__in=div_ids)
+            | models.Q(organisation_geography_id__in=org_ids)
+        )
 
     def ballots_with_point_in_area(self, area: GEOSGeometry):
         """
@@ -69,6 +154,27 @@ class ElectionQuerySet(models.QuerySet):
     def future(self):
         return self.filter(poll_open_date__gte=datetime.today())
 
+    def descendents_of(self, election, inclusive=False):
+        """
+        Elections below `election` in the tree, however deep, using one
+        indexed prefix match on tree_path.
+        inclusive=True also includes `election` itself.
+        """
+        queryset = self.filter(tree_path__startswith=election.get_tree_path())
+        if not inclusive:
+            queryset = queryset.exclude(pk=election.pk)
+        return queryset
+
+    def ancestors_of(self, election, inclusive=False):
+        """
+        The groups `election` belongs to, however far up the tree.
+        inclusive=True also includes `election` itself.
+        """
+        pks = election.get_tree_path().split("/")[:-1]
+        if not inclusive:
+            pks = pks[:-1]
+        return self.filter(pk__in=pks)
+
     def filter_by_status(self, status):
         if isinstance(status, list):
             query = models.Q(current_status__in=status)
@@ -90,6 +196,26 @@ class ElectionQuerySet(models.QuerySet):
             kwargs["modified"] = kwargs.get("modified", timezone.now())
         return super().update(**kwargs)
 
+    def annotate_last_modified(self):
+        """
+        Annotate each election with `last_modified`: the latest `modified`
+        of the election, its children and its replacement, which all
+        appear in its API representation
+        """
+        related = (
+            self.model.private_objects.filter(
+                models.Q(group=models.OuterRef("pk"))
+                | models.Q(replaces=models.OuterRef("pk"))
+            )
+            .order_by("-modified")
+            .values("modified")[:1]
+        )
+        # GREATEST ignores NULLs, so elections with no children or
+        # replacement get their own modified
+        return self.annotate(
+            last_modified=Greatest("modified", models.Subquery(related))
+        )
+
     def order_by_group_type(self):
         order = Case(
             When(group_type="election", then=0),
@@ -124,3 +250,30 @@ class PrivateElectionsManager(models.Manager.from_queryset(ElectionQuerySet)):
     use_in_migrations = True
 
     use_in_migrations = True
+
+
+class ElectionChangeQuerySet(models.QuerySet):
+    def committed(self):
+        """
+        Changes made by transactions older than the oldest one still in
+        progress. The set of these can't grow behind a reader's position,
+        unlike the changes with a lower id, because ids are taken when a
+        row is inserted rather than when its transaction commits.
+        """
+        return self.filter(
+            xact_id__lt=RawSQL(
+                "pg_snapshot_xmin(pg_current_snapshot())::text::bigint", []
+            )
+        )
+
+    def after(self, position):
+        """
+        Changes after `position`, an `(xact_id, id)` pair
+        """
+        xact_id, change_id = position
+        return self.filter(
+            Q(xact_id__gt=xact_id) | Q(xact_id=xact_id, id__gt=change_id)
+        )
+
+    def in_order(self):
+        return self.order_by("xact_id", "id")
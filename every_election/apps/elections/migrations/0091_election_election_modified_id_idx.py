@@ -0,0 +1,18 @@
+# Generated by Django 5.2.15 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("elections", "0090_backfill_new_timetable_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="election",
+            index=models.Index(
+                fields=["modified", "id"], name="election_modified_id_idx"
+            ),
+        ),
+    ]
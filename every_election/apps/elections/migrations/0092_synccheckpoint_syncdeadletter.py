@@ -0,0 +1,71 @@
+# Generated by Django 5.2.15 on 2026-10-18 15:20
+
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("elections", "0091_election_election_modified_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=255, unique=True)),
+                ("last_modified", models.DateTimeField(null=True)),
+                (
+                    "last_election_id",
+                    models.CharField(blank=True, max_length=250),
+                ),
+                ("next_url", models.TextField(blank=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SyncDeadLetter",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    django_extensions.db.fields.CreationDateTimeField(
+                        auto_now_add=True, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    django_extensions.db.fields.ModificationDateTimeField(
+                        auto_now=True, verbose_name="modified"
+                    ),
+                ),
+                (
+                    "election_id",
+                    models.CharField(db_index=True, max_length=250),
+                ),
+                ("result", models.JSONField()),
+                ("error", models.TextField()),
+            ],
+            options={
+                "ordering": ("-modified",),
+                "get_latest_by": "modified",
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.15 on 2026-10-18 16:05
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+RECORD_CHANGES_SQL = """
+CREATE FUNCTION elections_record_election_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO elections_electionchange (election_id)
+    SELECT id FROM changed_elections ORDER BY id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER elections_election_insert_change
+    AFTER INSERT ON elections_election
+    REFERENCING NEW TABLE AS changed_elections
+    FOR EACH STATEMENT EXECUTE FUNCTION elections_record_election_change();
+
+CREATE TRIGGER elections_election_update_change
+    AFTER UPDATE ON elections_election
+    REFERENCING NEW TABLE AS changed_elections
+    FOR EACH STATEMENT EXECUTE FUNCTION elections_record_election_change();
+"""
+
+DROP_RECORD_CHANGES_SQL = """
+DROP TRIGGER IF EXISTS elections_election_update_change ON elections_election;
+DROP TRIGGER IF EXISTS elections_election_insert_change ON elections_election;
+DROP FUNCTION IF EXISTS elections_record_election_change();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("elections", "0092_synccheckpoint_syncdeadletter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ElectionChange",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "created",
+                    models.DateTimeField(
+                        db_default=django.db.models.functions.datetime.Now()
+                    ),
+                ),
+                (
+                    "election",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="changes",
+                        to="elections.election",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("id",),
+            },
+        ),
+        migrations.RunSQL(RECORD_CHANGES_SQL, DROP_RECORD_CHANGES_SQL),
+    ]
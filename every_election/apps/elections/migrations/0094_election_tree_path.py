@@ -0,0 +1,78 @@
+# Generated by Django 5.2.15 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+# Fill in tree_path for existing elections, without recording every
+# election in the change log
+BACKFILL_TREE_PATH_SQL = """
+ALTER TABLE elections_election DISABLE TRIGGER elections_election_update_change;
+
+WITH RECURSIVE tree(id, path) AS (
+    SELECT id, id || '/' FROM elections_election WHERE group_id IS NULL
+    UNION ALL
+    SELECT election.id, tree.path || election.id || '/'
+    FROM elections_election election
+    JOIN tree ON election.group_id = tree.id
+)
+UPDATE elections_election
+SET tree_path = tree.path
+FROM tree
+WHERE elections_election.id = tree.id;
+
+ALTER TABLE elections_election ENABLE TRIGGER elections_election_update_change;
+"""
+
+MAINTAIN_TREE_PATH_SQL = """
+CREATE FUNCTION elections_set_tree_path() RETURNS trigger AS $$
+BEGIN
+    NEW.tree_path := COALESCE(
+        (SELECT tree_path FROM elections_election WHERE id = NEW.group_id),
+        ''
+    ) || NEW.id || '/';
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER elections_election_set_tree_path
+    BEFORE INSERT OR UPDATE OF group_id ON elections_election
+    FOR EACH ROW EXECUTE FUNCTION elections_set_tree_path();
+
+CREATE FUNCTION elections_move_subtree() RETURNS trigger AS $$
+BEGIN
+    UPDATE elections_election
+    SET tree_path = NEW.tree_path || substr(tree_path, length(OLD.tree_path) + 1)
+    WHERE tree_path LIKE OLD.tree_path || '%' AND id <> NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER elections_election_move_subtree
+    AFTER UPDATE OF group_id ON elections_election
+    FOR EACH ROW WHEN (OLD.tree_path IS DISTINCT FROM NEW.tree_path)
+    EXECUTE FUNCTION elections_move_subtree();
+"""
+
+DROP_MAINTAIN_TREE_PATH_SQL = """
+DROP TRIGGER IF EXISTS elections_election_move_subtree ON elections_election;
+DROP TRIGGER IF EXISTS elections_election_set_tree_path ON elections_election;
+DROP FUNCTION IF EXISTS elections_move_subtree();
+DROP FUNCTION IF EXISTS elections_set_tree_path();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("elections", "0093_electionchange"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="election",
+            name="tree_path",
+            field=models.CharField(
+                db_default="", db_index=True, editable=False, max_length=255
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_TREE_PATH_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(MAINTAIN_TREE_PATH_SQL, DROP_MAINTAIN_TREE_PATH_SQL),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.15 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+# Keep the status and election_id of each change (and record deletes), and
+# the transaction that made it so the feed can be ordered by commit
+RECORD_CHANGES_SQL = """
+CREATE OR REPLACE FUNCTION elections_record_election_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO elections_electionchange
+        (election_id, election_identifier, current_status, deleted, xact_id)
+    SELECT
+        id,
+        election_id,
+        current_status,
+        TG_OP = 'DELETE',
+        pg_current_xact_id()::text::bigint
+    FROM changed_elections ORDER BY id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER elections_election_delete_change
+    AFTER DELETE ON elections_election
+    REFERENCING OLD TABLE AS changed_elections
+    FOR EACH STATEMENT EXECUTE FUNCTION elections_record_election_change();
+"""
+
+DROP_RECORD_CHANGES_SQL = """
+DROP TRIGGER IF EXISTS elections_election_delete_change ON elections_election;
+
+CREATE OR REPLACE FUNCTION elections_record_election_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO elections_electionchange (election_id)
+    SELECT id FROM changed_elections ORDER BY id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Changes logged before this migration all have an xact_id of 0, so they
+# stay in id order ahead of everything after it
+BACKFILL_CHANGES_SQL = """
+UPDATE elections_electionchange change
+SET election_identifier = election.election_id,
+    current_status = election.current_status
+FROM elections_election election
+WHERE change.election_id = election.id;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("elections", "0094_election_tree_path"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="electionchange",
+            options={"ordering": ("xact_id", "id")},
+        ),
+        migrations.AddField(
+            model_name="electionchange",
+            name="current_status",
+            field=models.CharField(db_default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="electionchange",
+            name="deleted",
+            field=models.BooleanField(db_default=False),
+        ),
+        migrations.AddField(
+            model_name="electionchange",
+            name="election_identifier",
+            field=models.CharField(db_default="", max_length=250),
+        ),
+        migrations.AddField(
+            model_name="electionchange",
+            name="xact_id",
+            field=models.BigIntegerField(db_default=0),
+        ),
+        migrations.AddIndex(
+            model_name="electionchange",
+            index=models.Index(
+                fields=["xact_id", "id"], name="election_change_position_idx"
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_CHANGES_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(RECORD_CHANGES_SQL, DROP_RECORD_CHANGES_SQL),
+    ]
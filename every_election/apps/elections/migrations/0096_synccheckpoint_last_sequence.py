@@ -0,0 +1,17 @@
+# Generated by Django 5.2.15 on 2026-10-18 21:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("elections", "0095_electionchange_position"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="synccheckpoint",
+            name="last_sequence",
+            field=models.CharField(blank=True, max_length=50),
+        ),
+    ]
@@ -1,5 +1,7 @@
 import tempfile
+import threading
 import urllib.request
+import weakref
 from datetime import date, timedelta
 from enum import Enum, unique
 
@@ -9,13 +11,15 @@ from django.contrib.gis.db.models.functions import Distance
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.files import File
 from django.db import models, transaction
-from django.db.models import JSONField, Q
+from django.db.models import Exists, JSONField, OuterRef, Q
 from django.db.models.fields.related_descriptors import (
     create_reverse_many_to_one_manager,
 )
-from django.db.models.signals import post_save
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.urls import reverse
+from django.utils import timezone
 from django_extensions.db.models import TimeStampedModel
 from storages.backends.s3boto3 import S3Boto3Storage
 from uk_election_ids.datapackage import ID_REQUIREMENTS, VOTING_SYSTEMS
@@ -26,7 +30,13 @@ from uk_election_timetables.election_ids import (
 from uk_geo_utils.models import Onspd
 
 from .baker import send_event
-from .managers import PrivateElectionsManager, PublicElectionsManager
+from .lookup_cache import election_lookup_cache
+from .managers import (
+    ElectionChangeQuerySet,
+    PrivateElectionsManager,
+    PublicElectionsManager,
+)
+from .propagation import modified_propagation
 
 
 class ElectionCancellationReason(models.TextChoices):
@@ -252,6 +262,13 @@ class Election(TimeStampedModel):
         on_delete=models.CASCADE,
         verbose_name="Parent",
     )
+    # The pks of this election's groups and then this election, each
+    # followed by "/". Maintained by database triggers whenever an election
+    # is inserted or its group changes, so that a whole subtree can be
+    # found with one indexed prefix match (see ElectionQuerySet).
+    tree_path = models.CharField(
+        max_length=255, db_default="", db_index=True, editable=False
+    )
     requires_voter_id = models.CharField(
         max_length=100,
         null=True,
@@ -300,20 +317,32 @@ class Election(TimeStampedModel):
         the root node in the QuerySet.
         """
         manager = self._get_manager_obj(manager)
+        return manager.descendents_of(self, inclusive=inclusive)
 
-        queryset = (
-            manager.all() if inclusive else manager.filter(~Q(pk=self.pk))
-        )
-
-        id_parts = self.election_id.split(".")
-        head = id_parts[:-1]
-        date_ = id_parts.pop(-1)
-
-        prefix = f"{'.'.join(head)}."
+    def get_tree_path(self):
+        """
+        Return tree_path, fetching it if this instance hasn't been
+        loaded from the database
+        """
+        if not isinstance(self.tree_path, str) or not self.tree_path:
+            self.tree_path = (
+                Election.private_objects.filter(pk=self.pk)
+                .values_list("tree_path", flat=True)
+                .get()
+            )
+        return self.tree_path
 
-        return queryset.filter(
-            Q(election_id__startswith=prefix) & Q(poll_open_date=date_)
-        )
+    def tree_path_matches_group(self):
+        """
+        Whether tree_path on this instance still puts it under `group`.
+        It won't once the group has changed and been saved, because the
+        triggers only update tree_path in the database.
+        """
+        if not isinstance(self.tree_path, str) or not self.tree_path:
+            return False
+        path = self.tree_path.split("/")[:-1]
+        parent = path[-2] if len(path) > 1 else None
+        return parent == (str(self.group_id) if self.group_id else None)
 
     group_type = models.CharField(
         blank=True, max_length=100, null=True, db_index=True
@@ -425,10 +454,11 @@ class Election(TimeStampedModel):
 
     @property
     def replaced_by(self):
-        if len(self._replaced_by.all()) == 0:
+        replacements = list(self._replaced_by.all())
+        if len(replacements) == 0:
             return None
-        if len(self._replaced_by.all()) == 1:
-            return self._replaced_by.all()[0]
+        if len(replacements) == 1:
+            return replacements[0]
         raise AttributeError("Election should only have one replacement")
 
     """
@@ -457,6 +487,12 @@ class Election(TimeStampedModel):
     class Meta:
         ordering = ("election_id",)
         get_latest_by = "modified"
+        indexes = [
+            # Used for keyset pagination of the API change feed
+            models.Index(
+                fields=["modified", "id"], name="election_modified_id_idx"
+            ),
+        ]
 
     def get_absolute_url(self):
         return reverse("single_election_view", args=(self.election_id,))
@@ -476,14 +512,18 @@ class Election(TimeStampedModel):
         If self doesn't have a group_type (i.e. is a 'ballot') it returns itself.
         """
         if self.group_type:
-            group, date = self.election_id.rsplit(".", 1)
-            return Election.public_objects.filter(
-                election_id__startswith=group + ".",
-                election_id__endswith=date,
-                group_type=None,
-            )
+            return Election.public_objects.filter(**self.get_ballot_lookups())
         return None
 
+    def get_ballot_lookups(self):
+        """
+        Lookups for the ballots descended from self, if self is a group
+        """
+        return {
+            "tree_path__startswith": self.get_tree_path(),
+            "group_type": None,
+        }
+
     @property
     def group_seats_contested(self):
         """
@@ -795,6 +835,11 @@ class Election(TimeStampedModel):
         # used later to determine if we should look for ballots
         created = not self.pk
         super().save(**kwargs)
+        if not self.tree_path_matches_group():
+            # The triggers have moved this election and its descendants
+            self.refresh_from_db(fields=["tree_path"])
+        if push_event:
+            ElectionChange.announce()
 
         if (
             status
@@ -817,12 +862,15 @@ class Election(TimeStampedModel):
         if created:
             return
 
-        # otherwise check if we have related ballots
-        ballots = self.get_ballots()
-        if ballots:
-            # if so update the modified date on them so that we import
-            # the changes made on the parent election
-            ballots.update(modified=self.modified)
+        # otherwise update the modified date on any related ballots so
+        # that we import the changes made on the parent election
+        if self.group_type:
+            modified_propagation.propagate(
+                self.modified,
+                announce=push_event,
+                current_status=ModerationStatuses.approved.value,
+                **self.get_ballot_lookups(),
+            )
 
 
 @receiver(post_save, sender=Election, dispatch_uid="init_status_history")
@@ -832,6 +880,62 @@ def init_status_history(sender, instance, **kwargs):
         event.save(push_event=False, initial_status=True)
 
 
+@receiver(
+    [post_save, post_delete],
+    sender=Election,
+    dispatch_uid="clear_election_lookup_cache",
+)
+@receiver(
+    [post_save, post_delete],
+    sender="organisations.DivisionGeography",
+    dispatch_uid="clear_election_lookup_cache",
+)
+@receiver(
+    [post_save, post_delete],
+    sender="organisations.OrganisationGeography",
+    dispatch_uid="clear_election_lookup_cache",
+)
+def clear_election_lookup_cache(sender, **kwargs):
+    """
+    Any change to an election or the geographies we search on can change
+    which elections a postcode or point is in.
+    """
+    election_lookup_cache.clear()
+
+
+# The objects shown in an election's API representation that don't have
+# their own `modified`, and the lookup for the elections showing each one
+ELECTION_RELATED_LOOKUPS = {
+    "elections.ElectionType": "election_type_id",
+    "elections.ElectionSubType": "election_subtype_id",
+    "elections.ElectedRole": "elected_role_id",
+    "elections.Explanation": "explanation_id",
+    "elections.MetaData": "metadata_id",
+    "organisations.OrganisationDivisionSet": "division__divisionset_id",
+}
+
+
+def propagate_related_modified(sender, instance, created, raw=False, **kwargs):
+    """
+    Editing something an election's representation includes changes the
+    election, so move its `modified` forward for importers and ETags.
+    """
+    if created or raw:
+        return
+    modified_propagation.propagate(
+        timezone.now(),
+        **{ELECTION_RELATED_LOOKUPS[sender._meta.label]: instance.pk},
+    )
+
+
+for label in ELECTION_RELATED_LOOKUPS:
+    post_save.connect(
+        propagate_related_modified,
+        sender=label,
+        dispatch_uid="propagate_related_modified",
+    )
+
+
 class ModerationHistory(TimeStampedModel):
     election = models.ForeignKey(Election, on_delete=models.CASCADE)
     status = models.ForeignKey(ModerationStatus, on_delete=models.CASCADE)
@@ -843,6 +947,8 @@ class ModerationHistory(TimeStampedModel):
     @transaction.atomic()
     def save(self, *, push_event=True, initial_status=False, **kwargs):
         obj = super().save(**kwargs)
+        if push_event:
+            ElectionChange.announce()
 
         # If this is the initial status no need to update the related election
         # This is because the default status is identical on
@@ -855,7 +961,7 @@ class ModerationHistory(TimeStampedModel):
             # save the related election to update the modified timestamp so that it
             # is found by the importer looking for recent changes
             self.election.current_status = self.status.short_label
-            self.election.save()
+            self.election.save(push_event=push_event)
 
         if (
             push_event
@@ -872,6 +978,126 @@ class ModerationHistory(TimeStampedModel):
 
         return obj
 
+    @classmethod
+    @transaction.atomic
+    def bulk_moderate(
+        cls,
+        elections,
+        status,
+        *,
+        user=None,
+        notes="",
+        push_event=True,
+        cascade=False,
+    ):
+        """
+        Move `elections` (a queryset or an iterable of elections) to
+        `status` using one history row per election, one UPDATE per level
+        of the election tree and at most one event.
+
+        Approving an election also approves its groups, as an approved
+        ballot can't have unapproved parents. With `cascade`, moving an
+        election away from approved does the same to its approved
+        descendants and to any approved group it leaves without an
+        approved child, so that the rules in `elections.constraints` still
+        hold. Otherwise only `elections` themselves are moved.
+        Elections already in `status` are left alone.
+
+        Returns the pks of the elections that were moderated.
+        """
+        status = ModerationStatuses(status).value
+        approved = ModerationStatuses.approved.value
+        notes = notes[:255]
+        if isinstance(elections, models.QuerySet):
+            pks = set(elections.values_list("pk", flat=True))
+        else:
+            pks = {election.pk for election in elections}
+
+        if status == approved:
+            related = Election.private_objects.filter(pk__in=pks).values_list(
+                "group_id", "group__group_id"
+            )
+        elif cascade:
+            related = Election.private_objects.filter(
+                Q(group_id__in=pks) | Q(group__group_id__in=pks),
+                current_status=approved,
+            ).values_list("pk")
+        else:
+            related = []
+        for row in related:
+            pks.update(pk for pk in row if pk)
+
+        moderated = []
+        has_ballots = False
+        while pks:
+            rows = list(
+                Election.private_objects.filter(pk__in=pks)
+                .exclude(current_status=status)
+                .values_list("pk", "group_id", "group_type", "tree_path")
+            )
+            if not rows:
+                break
+            changed = [pk for pk, _, _, _ in rows]
+            cls.objects.bulk_create(
+                cls(election_id=pk, status_id=status, user=user, notes=notes)
+                for pk in changed
+            )
+            # Bump modified like ModerationHistory.save does, so that
+            # importers looking for recent changes find these elections,
+            # and their ballots if they're groups
+            modified = timezone.now()
+            Election.private_objects.filter(pk__in=changed).update(
+                current_status=status, modified=modified
+            )
+            for _, _, group_type, tree_path in rows:
+                if group_type:
+                    modified_propagation.propagate(
+                        modified,
+                        announce=push_event,
+                        current_status=approved,
+                        tree_path__startswith=tree_path,
+                        group_type=None,
+                    )
+            moderated += changed
+            has_ballots = has_ballots or any(
+                not group_type for _, _, group_type, _ in rows
+            )
+            if status == approved or not cascade:
+                break
+            # Groups that have just lost their last approved child
+            pks = set(
+                Election.private_objects.filter(
+                    pk__in={group_id for _, group_id, _, _ in rows},
+                    current_status=approved,
+                )
+                .exclude(election_type__election_type__in=["mayor", "pcc"])
+                .exclude(
+                    Exists(
+                        Election.private_objects.filter(
+                            group=OuterRef("pk"), current_status=approved
+                        )
+                    )
+                )
+                .values_list("pk", flat=True)
+            )
+
+        if not moderated:
+            return moderated
+
+        if push_event:
+            ElectionChange.announce()
+        election_lookup_cache.clear()
+        if (
+            push_event
+            and has_ballots
+            and status in (approved, ModerationStatuses.deleted.value)
+        ):
+            send_event(
+                detail={"description": "Bulk moderation"},
+                detail_type="elections_set_changed",
+            )
+        return moderated
+
     class Meta:
         verbose_name_plural = "Moderation History"
         get_latest_by = "modified"
@@ -921,3 +1147,148 @@ class Document(models.Model):
                 "%s/%s" % (election_id, filename), File(tmp)
             )
         return self.uploaded_file
+
+
+class SyncCheckpoint(models.Model):
+    """
+    How far `sync_elections` has got through an upstream change feed,
+    saved in the same transaction as each page so an interrupted sync can
+    be picked up with `--resume`, or the next one can carry on following
+    the upstream change log
+    """
+
+    source = models.CharField(max_length=255, unique=True)
+    last_modified = models.DateTimeField(null=True)
+    last_election_id = models.CharField(blank=True, max_length=250)
+    next_url = models.TextField(blank=True)
+    # Position in the upstream change log, see ElectionChange
+    last_sequence = models.CharField(blank=True, max_length=50)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.last_modified})"
+
+
+class SyncDeadLetter(TimeStampedModel):
+    """
+    An upstream result that `sync_elections` couldn't import, kept so the
+    rest of the sync can carry on
+    """
+
+    election_id = models.CharField(max_length=250, db_index=True)
+    result = JSONField()
+    error = models.TextField()
+
+    class Meta:
+        get_latest_by = "modified"
+        ordering = ("-modified",)
+
+    def __str__(self):
+        return self.election_id
+
+
+class ElectionChange(models.Model):
+    """
+    An append-only log of changes to elections, written by triggers on
+    elections_election (see migrations 0093 and 0095) so that every write
+    is recorded, including bulk_create, queryset.update() and deletes.
+
+    Mirrors remember the position (see `get_position`) of the last change
+    they've seen and ask for everything after it, rather than polling on
+    `modified` with an overlap window. Changes are ordered by the
+    transaction that made them, and only served once every older
+    transaction has finished (see ElectionChangeQuerySet.committed), so
+    one that commits late can't land behind a position that's already
+    been handed out.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    # Not a constraint, so deleting an election doesn't have to look
+    # through its changes
+    election = models.ForeignKey(
+        Election,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="changes",
+    )
+    # Copied from the election, so that the log still makes sense once an
+    # election has been deleted or has moved to another status
+    election_identifier = models.CharField(max_length=250, db_default="")
+    current_status = models.CharField(max_length=32, db_default="")
+    deleted = models.BooleanField(db_default=False)
+    # pg_current_xact_id() of the transaction that made the change
+    xact_id = models.BigIntegerField(db_default=0)
+    created = models.DateTimeField(db_default=Now())
+
+    objects = ElectionChangeQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("xact_id", "id")
+        indexes = [
+            models.Index(
+                fields=["xact_id", "id"], name="election_change_position_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_position()}: {self.election_identifier}"
+
+    def get_position(self):
+        return self.format_position(self.xact_id, self.pk)
+
+    @staticmethod
+    def format_position(xact_id, change_id):
+        return f"{xact_id}.{change_id}"
+
+    @staticmethod
+    def parse_position(value):
+        """
+        Turn a position from `format_position` back into an
+        `(xact_id, id)` pair. A bare number is taken to be an id from
+        before changes were ordered by transaction.
+        """
+        xact_id, _, change_id = value.rpartition(".")
+        position = (int(xact_id or 0), int(change_id))
+        if min(position) < 0:
+            raise ValueError(value)
+        return position
+
+    @staticmethod
+    def send_announcement():
+        send_event(
+            detail={"description": "Election changes recorded"},
+            detail_type="election_changes_recorded",
+        )
+
+    @classmethod
+    def announce(cls):
+        """
+        Tell mirrors there are new changes to fetch once the current
+        transaction commits. Only one event is sent per transaction, however
+        many elections it touches.
+        """
+        pending = getattr(pending_announcement, "ref", None)
+        if pending is not None and pending() is not None:
+            return
+        announcement = Announcement()
+        pending_announcement.ref = weakref.ref(announcement)
+        transaction.on_commit(announcement)
+
+
+class Announcement:
+    """
+    An `election_changes_recorded` event waiting for the current
+    transaction to commit. Registered with `on_commit`, so Django drops
+    it on rollback.
+    """
+
+    __slots__ = ("__weakref__",)
+
+    def __call__(self):
+        pending_announcement.ref = None
+        ElectionChange.send_announcement()
+
+
+# A weak reference to this thread's pending Announcement, so that once
+# Django has dropped it on rollback the next change announces again
+pending_announcement = threading.local()
@@ -0,0 +1,143 @@
+"""
+Deferred propagation of `modified` to elections.
+
+When an Organisation or OrganisationDivision is saved its elections take
+its `modified`, and when a group Election is saved so do its ballots, so
+that importers looking for recent changes to elections pick them up.
+Editing the other objects an election's representation includes, like
+its Explanation or ElectionType, moves its `modified` forward too.
+
+Rather than one UPDATE per save, the elections to touch are collected for
+the current transaction and updated in one go when it commits. Each
+update is registered with `on_commit`, so that Django throws it away
+along with anything else in a savepoint that's rolled back. Outside a
+transaction elections are updated straight away.
+
+`modified` only ever moves forward, so an election changed after its
+parent keeps its own timestamp.
+"""
+
+import operator
+import threading
+import weakref
+from collections import defaultdict
+from functools import reduce
+
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+
+
+def get_filter(keys):
+    """
+    OR together the lookups in `keys`, using one __in lookup for all
+    the single field lookups on the same field
+    """
+    values_by_field = defaultdict(list)
+    filters = []
+    for key in keys:
+        if len(key) == 1:
+            field, value = key[0]
+            values_by_field[field].append(value)
+        else:
+            filters.append(Q(**dict(key)))
+    for field, values in values_by_field.items():
+        filters.append(Q(**{f"{field}__in": values}))
+    return reduce(operator.or_, filters)
+
+
+def update_modified(pending):
+    """
+    Move `modified` forward on the elections matching each of the lookups
+    in `pending`, a dict of {lookups: modified}, in one UPDATE. Returns the
+    number of elections updated.
+    """
+    if not pending:
+        return 0
+    # Import here to avoid a circular import with elections.models
+    from elections.models import Election
+
+    keys_by_modified = defaultdict(list)
+    for key, modified in pending.items():
+        keys_by_modified[modified].append(key)
+    # Latest first, so an election matching more than one lookup takes
+    # the latest `modified` it's been given
+    conditions = [
+        (get_filter(keys) & Q(modified__lt=modified), modified)
+        for modified, keys in sorted(keys_by_modified.items(), reverse=True)
+    ]
+    return Election.private_objects.filter(
+        reduce(operator.or_, (condition for condition, _ in conditions))
+    ).update(
+        modified=Case(
+            *(
+                When(condition, then=Value(modified))
+                for condition, modified in conditions
+            ),
+            output_field=models.DateTimeField(),
+        )
+    )
+
+
+class PendingUpdate:
+    """
+    One propagate() call waiting for its transaction to commit.
+    Registered with `on_commit`, so Django drops it if its savepoint is
+    rolled back.
+    """
+
+    __slots__ = ("key", "modified", "announce", "__weakref__")
+
+    def __init__(self, key, modified, announce):
+        self.key = key
+        self.modified = modified
+        self.announce = announce
+
+    def __call__(self):
+        modified_propagation.flush()
+
+
+class ModifiedPropagation(threading.local):
+    def __init__(self):
+        # The PendingUpdates that Django still holds. Those from rolled
+        # back savepoints drop out as soon as Django lets go of them.
+        self.updates = weakref.WeakSet()
+
+    def propagate(self, modified, *, announce=True, **lookups):
+        """
+        Set `modified` on the elections matching `lookups` when the
+        current transaction commits, if it's later than theirs. With
+        `announce`, mirrors are told about it if any elections changed.
+        """
+        key = tuple(sorted(lookups.items()))
+        if not transaction.get_connection().in_atomic_block:
+            self.apply({key: modified}, announce)
+            return
+        update = PendingUpdate(key, modified, announce)
+        self.updates.add(update)
+        transaction.on_commit(update)
+
+    def flush(self):
+        """
+        Apply every update still pending in one UPDATE. Run by the first
+        PendingUpdate Django calls on commit, which leaves nothing for the
+        rest to do.
+        """
+        pending = {}
+        announce = False
+        for update in list(self.updates):
+            pending[update.key] = max(
+                update.modified, pending.get(update.key, update.modified)
+            )
+            announce = announce or update.announce
+        self.updates.clear()
+        self.apply(pending, announce)
+
+    def apply(self, pending, announce):
+        # Import here to avoid a circular import with elections.models
+        from elections.models import ElectionChange
+
+        if update_modified(pending) and announce:
+            ElectionChange.announce()
+
+
+modified_propagation = ModifiedPropagation()
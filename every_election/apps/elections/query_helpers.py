@@ -5,6 +5,7 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.forms import ValidationError
 from localflavor.gb.forms import GBPostcodeField
 from uk_geo_utils.geocoders import OnspdGeocoder
+from uk_geo_utils.models import Onspd
 
 logger = logging.getLogger(__name__)
 
@@ -52,3 +53,31 @@ def get_point_from_postcode(postcode):
         except PostcodeError:
             continue
     raise PostcodeError
+
+
+def get_points_from_postcodes(postcodes):
+    """
+    Batch version of `get_point_from_postcode`.
+
+    Returns a dict of {postcode: Point} using a single ONSPD query.
+    Postcodes that are invalid or can't be found are left out. Like
+    `get_point_from_postcode`, terminated postcodes are still found.
+    """
+    validator = GBPostcodeField()
+    cleaned = {}
+    for postcode in postcodes:
+        try:
+            cleaned[postcode] = validator.clean(postcode)
+        except ValidationError:
+            continue
+
+    locations = dict(
+        Onspd.objects.filter(pcds__in=set(cleaned.values())).values_list(
+            "pcds", "location"
+        )
+    )
+    return {
+        postcode: locations[clean_postcode]
+        for postcode, clean_postcode in cleaned.items()
+        if locations.get(clean_postcode)
+    }
@@ -1,26 +1,47 @@
+import contextlib
 import datetime
 import hashlib
+import operator
+import queue
 import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import reduce
 from typing import Optional
-from urllib.parse import urljoin
+from urllib.parse import urlencode, urljoin
 
 import requests
 from dateutil.parser import parse
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from elections.lookup_cache import election_lookup_cache
 from elections.models import (
+    DEFAULT_STATUS,
     ElectedRole,
     Election,
     ElectionSubType,
     ElectionType,
     Explanation,
     MetaData,
+    ModerationHistory,
+    ModerationStatuses,
+    SyncCheckpoint,
+    SyncDeadLetter,
 )
+from elections.propagation import modified_propagation
 from organisations.models import (
+    DivisionGeography,
     Organisation,
     OrganisationDivision,
     OrganisationDivisionSet,
+    OrganisationGeography,
 )
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 class ParentDoesNotExist(ValueError): ...
@@ -29,14 +50,547 @@ class ParentDoesNotExist(ValueError): ...
 class ReplacementDoesNotExist(ValueError): ...
 
 
+def get_explanation_description(explanation):
+    """
+    Because we don't expose the explanation description in the API we
+    make one up for imported explanations. It's the hash of the value to
+    ensure we link imported explanations to unique values.
+    """
+    explanation_hash = int(
+        hashlib.sha1(explanation.encode("utf-8")).hexdigest(), 16
+    ) % (10**8)
+    return f"Imported explanation {explanation_hash}"
+
+
+def parse_date(value):
+    if not value:
+        return None
+    if isinstance(value, datetime.date):
+        return value
+    return parse(value).date()
+
+
+def organisation_key(organisation: dict):
+    """
+    Identity map key for an organisation from the API (or an
+    Organisation's __dict__)
+    """
+    return (
+        organisation["official_identifier"],
+        str(organisation["start_date"]),
+    )
+
+
+def division_key(organisation: Organisation, division: dict):
+    """
+    Identity map key for a division from the API, within `organisation`
+    """
+    return (
+        organisation.pk,
+        str(division["divisionset"]["start_date"]),
+        division["official_identifier"],
+    )
+
+
+class ElectionBatch:
+    """
+    Adds or updates a page of API results in a fixed number of queries.
+
+    Everything the results refer to (organisations, divisions, parents,
+    replacements, explanations and metadata) is fetched up front in set
+    queries. Elections are then upserted with bulk_create one level of
+    the election ID hierarchy at a time, so that groups exist before the
+    elections that belong to them.
+
+    Results that can't be resolved in bulk (e.g. a parent that's in
+    neither this page nor the DB) are returned by `save` so they can go
+    through `ElectionSyncer.process_result` one at a time.
+    """
+
+    UPDATE_FIELDS = (
+        "tmp_election_id",
+        "election_title",
+        "election_type",
+        "election_subtype",
+        "poll_open_date",
+        *Election.TIMETABLE_FIELDS,
+        "organisation",
+        "elected_role",
+        "division",
+        "division_geography",
+        "organisation_geography",
+        "seats_contested",
+        "group",
+        "group_type",
+        "requires_voter_id",
+        "voting_system",
+        "explanation",
+        "metadata",
+        "current",
+        "current_status",
+        "cancelled",
+        "cancellation_reason",
+        "by_election_reason",
+        "replaces",
+        "tags",
+        "created",
+        "modified",
+    )
+
+    def __init__(self, syncer, results: list[dict]):
+        self.syncer = syncer
+        self.results = results
+
+    def fetch_organisations(self):
+        organisation_dicts = [
+            result["organisation"]
+            for result in self.results
+            if result.get("organisation")
+        ]
+        self.syncer.fetch_organisations(organisation_dicts)
+        self.organisations = {}
+        for organisation_dict in organisation_dicts:
+            key = organisation_key(organisation_dict)
+            if organisation := self.syncer.ORGANISATION_CACHE.get(key):
+                self.syncer.set_end_date(
+                    organisation, organisation_dict["end_date"]
+                )
+                self.organisations[key] = organisation
+
+    def fetch_divisions(self):
+        lookups = []
+        for result in self.results:
+            if not result.get("division") or not result.get("organisation"):
+                continue
+            organisation = self.organisations.get(
+                organisation_key(result["organisation"])
+            )
+            if organisation is not None:
+                lookups.append((organisation, result["division"]))
+        self.syncer.fetch_divisions(lookups)
+
+        self.divisions = {}
+        for organisation, division_dict in lookups:
+            key = division_key(organisation, division_dict)
+            if division := self.syncer.DIVISION_CACHE.get(key):
+                self.syncer.set_end_date(
+                    division.divisionset,
+                    division_dict["divisionset"]["end_date"],
+                )
+                self.divisions[key] = division
+
+        self.division_geographies = {}
+        if self.divisions:
+            self.division_geographies = dict(
+                DivisionGeography.objects.filter(
+                    division__in=self.divisions.values()
+                ).values_list("division_id", "id")
+            )
+
+    def fetch_organisation_geographies(self):
+        self.organisation_geographies = defaultdict(list)
+        geographies = (
+            OrganisationGeography.objects.filter(
+                organisation__in=self.organisations.values()
+            )
+            .order_by("pk")
+            .values("id", "organisation_id", "start_date", "end_date")
+        )
+        for geography in geographies:
+            self.organisation_geographies[geography["organisation_id"]].append(
+                geography
+            )
+
+    def fetch_explanations(self):
+        values = {
+            result["explanation"]
+            for result in self.results
+            if result.get("explanation")
+        }
+        self.explanations = {}
+        for explanation in Explanation.objects.filter(explanation__in=values):
+            self.explanations.setdefault(explanation.explanation, explanation)
+        missing = [
+            Explanation(
+                explanation=value,
+                description=get_explanation_description(value),
+            )
+            for value in values
+            if value not in self.explanations
+        ]
+        for explanation in Explanation.objects.bulk_create(missing):
+            self.explanations[explanation.explanation] = explanation
+
+    def fetch_metadata(self):
+        values = [
+            result["metadata"]
+            for result in self.results
+            if result.get("metadata")
+        ]
+        descriptions = {
+            value[list(value.keys())[0]]["title"] for value in values
+        }
+        self.metadata = list(
+            MetaData.objects.filter(description__in=descriptions)
+        )
+        missing = []
+        for value in values:
+            if self.get_metadata(value) is None:
+                metadata = MetaData(
+                    description=value[list(value.keys())[0]]["title"],
+                    data=value,
+                )
+                missing.append(metadata)
+                self.metadata.append(metadata)
+        MetaData.objects.bulk_create(missing)
+
+    def get_metadata(self, value):
+        description = value[list(value.keys())[0]]["title"]
+        for metadata in self.metadata:
+            if metadata.description == description and metadata.data == value:
+                return metadata
+        return None
+
+    def fetch_elections(self):
+        election_ids = {result["election_id"] for result in self.results}
+        for result in self.results:
+            election_ids.update(
+                result[key] for key in ("group", "replaces") if result.get(key)
+            )
+        self.existing = {
+            election["election_id"]: election
+            for election in Election.private_objects.filter(
+                election_id__in=election_ids
+            ).values(
+                "pk",
+                "election_id",
+                "current_status",
+                "division_geography_id",
+                "organisation_geography_id",
+                *Election.TIMETABLE_FIELDS,
+            )
+        }
+
+    def get_organisation_geography_id(self, election: Election):
+        if election.division_id or not election.organisation:
+            return None
+        if election.identifier_type not in ("ballot", "organisation"):
+            return None
+        geographies = self.organisation_geographies[election.organisation.pk]
+        if len(geographies) == 1:
+            return geographies[0]["id"]
+        for geography in geographies:
+            if (
+                geography["start_date"] is None
+                or geography["start_date"] <= election.poll_open_date
+            ) and (
+                geography["end_date"] is None
+                or geography["end_date"] >= election.poll_open_date
+            ):
+                return geography["id"]
+        return None
+
+    def build_election(self, result: dict) -> Election:
+        """
+        Make an (unsaved) Election from an API result, the same way
+        `ElectionSyncer.add_single_election` would
+        """
+        election = Election(election_id=result["election_id"])
+        # Keep the modified timestamp from the API
+        election.update_modified = False
+
+        if result.get("group_type") != "election" and result.get(
+            "organisation"
+        ):
+            key = organisation_key(result["organisation"])
+            if key not in self.organisations:
+                raise Organisation.DoesNotExist()
+            election.organisation = self.organisations[key]
+
+        if result.get("division"):
+            key = division_key(election.organisation, result["division"])
+            if key not in self.divisions:
+                raise OrganisationDivision.DoesNotExist()
+            election.division = self.divisions[key]
+
+        election.tmp_election_id = result.get("tmp_election_id")
+        election.election_title = result.get("election_title") or ""
+        election.poll_open_date = parse_date(result["poll_open_date"])
+        election.election_type = self.syncer.get_election_type(
+            result["election_type"]["election_type"]
+        )
+        if result.get("election_subtype"):
+            election.election_subtype = self.syncer.get_election_subtype(
+                election.election_type,
+                result["election_subtype"]["election_subtype"],
+            )
+        if result.get("identifier_type") == "ballot":
+            election.group_type = None
+        else:
+            election.group_type = result.get("group_type")
+        if result.get("elected_role"):
+            election.elected_role = self.syncer.get_elected_role(
+                result["elected_role"]
+            )
+        election.seats_contested = result.get("seats_contested")
+        if result.get("voting_system"):
+            election.voting_system = result["voting_system"]["slug"]
+        election.requires_voter_id = result.get("requires_voter_id") or None
+        election.current = result.get("current")
+        if result.get("explanation"):
+            election.explanation = self.explanations[result["explanation"]]
+        if result.get("metadata"):
+            election.metadata = self.get_metadata(result["metadata"])
+        election.cancelled = result.get("cancelled", False)
+        election.cancellation_reason = result.get("cancellation_reason")
+        election.by_election_reason = result.get("by_election_reason") or ""
+        election.tags = result.get("tags") or {}
+        election.created = result["created"]
+        election.modified = result["modified"]
+        election.current_status = ModerationStatuses.approved.value
+
+        if result.get("group"):
+            if result["group"] not in self.existing:
+                raise ParentDoesNotExist(f"Can't find {result['group']}")
+            election.group_id = self.existing[result["group"]]["pk"]
+        if result.get("replaces") and not result.get("group_type"):
+            if result["replaces"] not in self.existing:
+                raise ReplacementDoesNotExist(
+                    f"Can't find replacement {result['replaces']}"
+                )
+            election.replaces_id = self.existing[result["replaces"]]["pk"]
+
+        existing = self.existing.get(election.election_id)
+        if "timetable" in result:
+            for field in Election.TIMETABLE_FIELDS:
+                setattr(
+                    election, field, parse_date(result["timetable"].get(field))
+                )
+        elif existing:
+            for field in Election.TIMETABLE_FIELDS:
+                setattr(election, field, existing[field])
+        else:
+            election.set_timetable_fields()
+
+        if existing and existing["division_geography_id"]:
+            election.division_geography_id = existing["division_geography_id"]
+        elif election.identifier_type == "ballot" and election.division:
+            election.division_geography_id = self.division_geographies.get(
+                election.division.pk
+            )
+        if existing and existing["organisation_geography_id"]:
+            election.organisation_geography_id = existing[
+                "organisation_geography_id"
+            ]
+        else:
+            election.organisation_geography_id = (
+                self.get_organisation_geography_id(election)
+            )
+        return election
+
+    def upsert(self, elections: list[Election]):
+        if not elections:
+            return
+        Election.private_objects.bulk_create(
+            elections,
+            update_conflicts=True,
+            unique_fields=["election_id"],
+            update_fields=self.UPDATE_FIELDS,
+        )
+
+        history = []
+        for election in elections:
+            existing = self.existing.get(election.election_id)
+            if existing is None:
+                history.append(
+                    ModerationHistory(
+                        election=election, status_id=DEFAULT_STATUS
+                    )
+                )
+            if (
+                existing is None
+                or existing["current_status"] != election.current_status
+            ):
+                history.append(
+                    ModerationHistory(
+                        election=election, status_id=election.current_status
+                    )
+                )
+            self.existing[election.election_id] = {
+                "pk": election.pk,
+                "election_id": election.election_id,
+                "current_status": election.current_status,
+                "division_geography_id": election.division_geography_id,
+                "organisation_geography_id": election.organisation_geography_id,
+                **{
+                    field: getattr(election, field)
+                    for field in Election.TIMETABLE_FIELDS
+                },
+            }
+        ModerationHistory.objects.bulk_create(history)
+
+    def save(self) -> list[dict]:
+        with self.syncer.defer_end_dates():
+            self.fetch_organisations()
+            self.fetch_divisions()
+            self.fetch_organisation_geographies()
+            self.fetch_explanations()
+            self.fetch_metadata()
+            self.fetch_elections()
+
+            levels = defaultdict(list)
+            for result in self.results:
+                levels[result["election_id"].count(".")].append(result)
+
+            unresolved = []
+            for level in sorted(levels):
+                elections = []
+                for result in levels[level]:
+                    try:
+                        elections.append(self.build_election(result))
+                    except (
+                        Organisation.DoesNotExist,
+                        OrganisationDivision.DoesNotExist,
+                        ParentDoesNotExist,
+                        ReplacementDoesNotExist,
+                    ):
+                        unresolved.append(result)
+                self.upsert(elections)
+
+        election_lookup_cache.clear()
+        return unresolved
+
+
 class ElectionSyncer:
-    def __init__(self, since=None, stdout=None, stderr=None):
+    # How many pages to download ahead of the page being written
+    PREFETCH_PAGES = 2
+    # How many missing parents or replacements to download at once
+    FETCH_WORKERS = 4
+    # How many changed elections to ask for in each request
+    FETCH_BY_ID = 50
+    REQUEST_TIMEOUT = 60
+
+    def __init__(self, since=None, stdout=None, stderr=None, resume=False):
         self.since = since
+        self.resume = resume
         self.stdout = stdout or sys.stdout
         self.stderr = stderr or sys.stderr
+        # Pages are fetched from a prefetch thread and missing elections
+        # from a pool of workers, so each thread gets its own session
+        self.local = threading.local()
         self.ELECTION_SUBTYPE_CACHE = {}
         self.ELECTED_ROLE_CACHE = {}
         self.ELECTION_TYPE_CACHE = {}
+        # Identity maps for the run, see fetch_organisations and
+        # fetch_divisions
+        self.ORGANISATION_CACHE = {}
+        self.DIVISION_CACHE = {}
+        self.DIVISIONSET_CACHE = {}
+        # End date changes waiting for save_end_dates, by model and pk
+        self.changed_end_dates = defaultdict(dict)
+        self.defer_depth = 0
+        # (obj, previous end date) for each end date change made inside
+        # `atomic` blocks, so they can be undone on rollback
+        self.end_date_changes = []
+        self.atomic_depth = 0
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        The current thread's session, as requests.Session isn't thread safe
+        """
+        if not hasattr(self.local, "session"):
+            self.local.session = self.get_session()
+        return self.local.session
+
+    def get_session(self) -> requests.Session:
+        """
+        A keep-alive session that retries failed GETs with backoff
+        """
+        session = requests.Session()
+        retries = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(max_retries=retries)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_json(self, url: str) -> dict:
+        req = self.session.get(url, timeout=self.REQUEST_TIMEOUT)
+        req.raise_for_status()
+        return req.json()
+
+    def iter_pages(self, url: str):
+        """
+        Yield `(url, page)` for each page of the API response starting at
+        `url`, following `next`.
+
+        Pages are downloaded in a background thread, up to PREFETCH_PAGES
+        ahead of the caller, so the next page is on its way while the
+        current one is written to the DB.
+        """
+        pages = queue.Queue(maxsize=self.PREFETCH_PAGES)
+        stop = threading.Event()
+
+        def fetch_pages():
+            next_url = url
+            try:
+                while next_url and not stop.is_set():
+                    page = self.get_json(next_url)
+                    pages.put((next_url, page))
+                    next_url = page.get("next")
+            except Exception as e:
+                # Hand the error to the consumer to raise
+                pages.put((next_url, e))
+            finally:
+                pages.put(None)
+
+        fetcher = threading.Thread(target=fetch_pages, daemon=True)
+        fetcher.start()
+        try:
+            while (item := pages.get()) is not None:
+                page_url, page = item
+                if isinstance(page, Exception):
+                    raise page
+                yield page_url, page
+        finally:
+            stop.set()
+            # Unblock the fetcher if it's waiting on a full queue
+            while fetcher.is_alive():
+                with contextlib.suppress(queue.Empty):
+                    pages.get(timeout=0.1)
+
+    def fetch_missing_elections(self, results: list[dict]) -> list[dict]:
+        """
+        Download the parents and replacements that `results` refer to but
+        that we don't have yet, concurrently with a session per worker
+        """
+        election_ids = set()
+        for result in results:
+            if result.get("group"):
+                election_ids.add(result["group"])
+            if result.get("replaces") and not result.get("group_type"):
+                election_ids.add(result["replaces"])
+        election_ids -= set(
+            Election.private_objects.filter(
+                election_id__in=election_ids
+            ).values_list("election_id", flat=True)
+        )
+        if not election_ids:
+            return []
+        self.stderr.write(
+            f"Missing parents or replacements ({', '.join(sorted(election_ids))}), importing directly before continuing"
+        )
+        urls = [
+            urljoin(self.url, election_id)
+            for election_id in sorted(election_ids)
+        ]
+        with ThreadPoolExecutor(max_workers=self.FETCH_WORKERS) as executor:
+            return list(executor.map(self.get_json, urls))
 
     def add_single_election(self, result: dict):
         try:
@@ -66,63 +620,21 @@ class ElectionSyncer:
                 continue
             if key == "division" and value:
                 try:
-                    divisionset = OrganisationDivisionSet.objects.get(
+                    election_model.division = self.get_division(
+                        election_model.organisation, value
+                    )
+                except OrganisationDivision.DoesNotExist:
+                    if OrganisationDivisionSet.objects.filter(
                         organisation=election_model.organisation,
                         start_date=value["divisionset"]["start_date"],
-                    )
-                except OrganisationDivisionSet.DoesNotExist:
-                    # In some case we might have changed the start date
-                    # for an existing divisionset. This is rare, but one
-                    # high profile example is the unknown divisionset start date
-                    # of the 2024/2025 general election.
-                    # We can manage this by looking for the short_title
-                    try:
-                        divisionset = OrganisationDivisionSet.objects.filter(
-                            organisation=election_model.organisation,
-                            short_title=value["divisionset"]["short_title"],
-                        ).get()
-                    except OrganisationDivisionSet.DoesNotExist:
+                    ).exists():
                         raise
-                    # We have a new divisionset with a new start_date, so we
-                    # need to set the end date of the old divisionset
-                    # before updating this ones start_date
-                    previous_divisionset = (
-                        OrganisationDivisionSet.objects.filter(
-                            organisation=election_model.organisation
-                        )
-                        .filter_by_date(election_model.poll_open_date)
-                        .get()
+                    self.update_divisionset_start_date(
+                        election_model, value["divisionset"]
+                    )
+                    election_model.division = self.get_division(
+                        election_model.organisation, value
                     )
-                    previous_divisionset.end_date = parse(
-                        value["divisionset"]["start_date"]
-                    ) - timedelta(days=1)
-                    previous_divisionset.save()
-                    divisionset.start_date = value["divisionset"]["start_date"]
-                    divisionset.save()
-
-                election_model.division = OrganisationDivision.objects.get(
-                    official_identifier=value["official_identifier"],
-                    divisionset__start_date=value["divisionset"]["start_date"],
-                    divisionset__organisation=election_model.organisation,
-                )
-
-                if (
-                    not divisionset.end_date
-                    and value["divisionset"]["end_date"]
-                ) or (
-                    divisionset.end_date
-                    and divisionset.end_date.isoformat()
-                    != value["divisionset"]["end_date"]
-                ):
-                    # Two Special cases:
-                    # 1: Where there is no end date on the DivisionSet and so we set it,
-                    # 2: Where there is an end date, but it's changed (likely due to an upcoming boundary change)
-                    # in this case, update the DivisionSet's end date
-                    election_model.division.divisionset.end_date = value[
-                        "divisionset"
-                    ]["end_date"]
-                    election_model.division.divisionset.save()
-
                 continue
             if key == "identifier_type":
                 key = "group_type"
@@ -171,12 +683,9 @@ class ElectionSyncer:
                         explanation=value
                     ).first()
                 except Explanation.DoesNotExist:
-                    explanation_hash = int(
-                        hashlib.sha1(value.encode("utf-8")).hexdigest(), 16
-                    ) % (10**8)
                     explanation = Explanation.objects.create(
                         explanation=value,
-                        description=f"Imported explanation {explanation_hash}",
+                        description=get_explanation_description(value),
                     )
                 election_model.explanation = explanation
                 continue
@@ -200,6 +709,38 @@ class ElectionSyncer:
             push_event=False, update_modified=False, status="Approved"
         )
 
+    def update_divisionset_start_date(
+        self, election_model: Election, divisionset_dict: dict
+    ):
+        """
+        In some case we might have changed the start date for an existing
+        divisionset. This is rare, but one high profile example is the
+        unknown divisionset start date of the 2024/2025 general election.
+        We can manage this by looking for the short_title.
+        """
+        divisionset = OrganisationDivisionSet.objects.filter(
+            organisation=election_model.organisation,
+            short_title=divisionset_dict["short_title"],
+        ).get()
+        # We have a new divisionset with a new start_date, so we
+        # need to set the end date of the old divisionset
+        # before updating this ones start_date
+        previous_divisionset = (
+            OrganisationDivisionSet.objects.filter(
+                organisation=election_model.organisation
+            )
+            .filter_by_date(election_model.poll_open_date)
+            .get()
+        )
+        previous_divisionset.end_date = parse(
+            divisionset_dict["start_date"]
+        ) - timedelta(days=1)
+        previous_divisionset.save()
+        divisionset.start_date = divisionset_dict["start_date"]
+        divisionset.save()
+        # The identity map is keyed on start date
+        self.clear_division_cache()
+
     def get_election_type(self, election_type: str):
         if not self.ELECTION_TYPE_CACHE:
             # Populate the entire cache if it's empty
@@ -220,17 +761,175 @@ class ElectionSyncer:
                 )
         return self.ELECTED_ROLE_CACHE[elected_role]
 
-    def get_organisation(self, organisation_dict: dict):
-        organisation = Organisation.objects.get(
-            official_identifier=organisation_dict["official_identifier"],
-            start_date=organisation_dict["start_date"],
+    def fetch_organisations(self, organisation_dicts: list[dict]):
+        """
+        Add the organisations in `organisation_dicts` that aren't in the
+        identity map yet to it, in one query
+        """
+        keys = {
+            organisation_key(organisation_dict)
+            for organisation_dict in organisation_dicts
+        } - self.ORGANISATION_CACHE.keys()
+        if not keys:
+            return
+        organisations = Organisation.objects.filter(
+            reduce(
+                operator.or_,
+                (
+                    Q(official_identifier=identifier, start_date=start_date)
+                    for identifier, start_date in keys
+                ),
+            )
         )
-        if organisation.end_date != organisation_dict["end_date"]:
-            # update the end date when we see that it's changed
-            organisation.end_date = organisation_dict["end_date"]
-            organisation.save()
+        for organisation in organisations:
+            self.ORGANISATION_CACHE[organisation_key(organisation.__dict__)] = (
+                organisation
+            )
+
+    def fetch_divisions(self, lookups: list[tuple]):
+        """
+        Add the `(organisation, division_dict)` pairs in `lookups` that
+        aren't in the identity map yet to it, in one query. Divisions in
+        the same divisionset share a divisionset instance, so end date
+        changes are only made once.
+        """
+        missing = {}
+        for organisation, division_dict in lookups:
+            key = division_key(organisation, division_dict)
+            if key not in self.DIVISION_CACHE:
+                missing[key] = organisation
+        if not missing:
+            return
+        divisions = OrganisationDivision.objects.filter(
+            reduce(
+                operator.or_,
+                (
+                    Q(
+                        divisionset__organisation=organisation_id,
+                        divisionset__start_date=start_date,
+                        official_identifier=identifier,
+                    )
+                    for organisation_id, start_date, identifier in missing
+                ),
+            )
+        ).select_related("divisionset")
+        for division in divisions:
+            divisionset = self.DIVISIONSET_CACHE.setdefault(
+                division.divisionset.pk, division.divisionset
+            )
+            division.divisionset = divisionset
+            key = (
+                divisionset.organisation_id,
+                divisionset.start_date.isoformat(),
+                division.official_identifier,
+            )
+            divisionset.organisation = missing[key]
+            self.DIVISION_CACHE[key] = division
+
+    def clear_division_cache(self):
+        self.DIVISION_CACHE.clear()
+        self.DIVISIONSET_CACHE.clear()
+
+    def set_end_date(self, obj, end_date):
+        """
+        Update the end date on an Organisation or OrganisationDivisionSet
+        when we see that it's changed. The change is saved by
+        save_end_dates when the outermost defer_end_dates block exits.
+        """
+        end_date = parse_date(end_date)
+        if obj.end_date == end_date:
+            return
+        if self.atomic_depth:
+            self.end_date_changes.append((obj, obj.end_date))
+        obj.end_date = end_date
+        if isinstance(obj, OrganisationDivisionSet):
+            obj.check_end_date()
+        with self.defer_end_dates():
+            self.changed_end_dates[type(obj)][obj.pk] = obj
+
+    @contextlib.contextmanager
+    def defer_end_dates(self):
+        """
+        Collect the end date changes made inside this block (and any nested
+        ones) and save them in one update per model when it exits
+        """
+        self.defer_depth += 1
+        try:
+            yield
+        finally:
+            self.defer_depth -= 1
+        if not self.defer_depth:
+            self.save_end_dates()
+
+    def save_end_dates(self):
+        """
+        Save the collected end date changes. Organisations also get a new
+        `modified`, which is passed on to their elections, as if they'd
+        been saved.
+        """
+        now = timezone.now()
+        for model, objs in self.changed_end_dates.items():
+            fields = ["end_date"]
+            if model is Organisation:
+                fields.append("modified")
+                for obj in objs.values():
+                    obj.modified = now
+                    modified_propagation.propagate(
+                        now, announce=False, organisation_id=obj.pk
+                    )
+            model.objects.bulk_update(objs.values(), fields)
+        self.changed_end_dates.clear()
+
+    @contextlib.contextmanager
+    def atomic(self):
+        """
+        transaction.atomic(), that also undoes the end date changes made
+        to objects in the identity maps if the block is rolled back, so
+        that they still match the DB and are made again on a retry
+        """
+        changed_end_dates = {
+            model: dict(objs) for model, objs in self.changed_end_dates.items()
+        }
+        start = len(self.end_date_changes)
+        self.atomic_depth += 1
+        try:
+            with transaction.atomic():
+                yield
+        except BaseException:
+            for obj, end_date in reversed(self.end_date_changes[start:]):
+                obj.end_date = end_date
+            del self.end_date_changes[start:]
+            self.changed_end_dates = defaultdict(dict, changed_end_dates)
+            raise
+        finally:
+            self.atomic_depth -= 1
+            if not self.atomic_depth:
+                self.end_date_changes.clear()
+
+    def get_organisation(self, organisation_dict: dict):
+        self.fetch_organisations([organisation_dict])
+        try:
+            organisation = self.ORGANISATION_CACHE[
+                organisation_key(organisation_dict)
+            ]
+        except KeyError:
+            raise Organisation.DoesNotExist()
+        self.set_end_date(organisation, organisation_dict["end_date"])
         return organisation
 
+    def get_division(self, organisation: Organisation, division_dict: dict):
+        self.fetch_divisions([(organisation, division_dict)])
+        try:
+            division = self.DIVISION_CACHE[
+                division_key(organisation, division_dict)
+            ]
+        except KeyError:
+            raise OrganisationDivision.DoesNotExist()
+        self.set_end_date(
+            division.divisionset, division_dict["divisionset"]["end_date"]
+        )
+        return division
+
     def get_election_subtype(self, election_type: str, election_subtype: str):
         if not self.ELECTION_SUBTYPE_CACHE:
             # Populate the entire cache if it's empty
@@ -267,19 +966,85 @@ class ElectionSyncer:
                 f"Missing parent ({e}), importing directly before continuing"
             )
             url = urljoin(self.url, result["group"])
-            parent_req = requests.get(url)
-            self.process_result(parent_req.json())
+            self.process_result(self.get_json(url))
             self.process_result(result)
         except ReplacementDoesNotExist as e:
             self.stderr.write(
                 f"Missing replacement election for ({e}), importing directly before continuing"
             )
-            replacement_req = requests.get(
-                urljoin(self.url, result["replaces"])
+            self.process_result(
+                self.get_json(urljoin(self.url, result["replaces"]))
             )
-            self.process_result(replacement_req.json())
             self.process_result(result)
 
+    def add_elections(self, results: list[dict]):
+        """
+        Add or update a page of results in bulk. See ElectionBatch.
+
+        Missing parents and replacements are downloaded and added first,
+        then anything that still can't be added in bulk goes through
+        `process_result` one at a time.
+        """
+        unresolved = ElectionBatch(self, results).save()
+        if unresolved and (missing := self.fetch_missing_elections(unresolved)):
+            self.add_elections(missing)
+            unresolved = ElectionBatch(self, unresolved).save()
+        for result in unresolved:
+            self.process_result(result)
+
+    def import_page(self, results: list[dict]):
+        """
+        Add a page of results. If anything in the page fails, add the
+        results one at a time instead, so that one bad result goes to the
+        dead letter table rather than holding up the rest of the page.
+        """
+        try:
+            with self.atomic():
+                self.add_elections(results)
+        except Exception:
+            for result in results:
+                try:
+                    with self.atomic():
+                        self.add_elections([result])
+                except Exception as e:
+                    self.add_dead_letter(result, e)
+
+    def add_dead_letter(self, result: dict, error: Exception):
+        self.stderr.write(f"Can't add {result['election_id']}: {error!r}")
+        SyncDeadLetter.objects.create(
+            election_id=result["election_id"], result=result, error=repr(error)
+        )
+
+    def save_checkpoint(self, page: dict):
+        defaults = {"next_url": page.get("next") or ""}
+        if page["results"]:
+            defaults["last_modified"] = page["results"][-1]["modified"]
+            defaults["last_election_id"] = page["results"][-1]["election_id"]
+        SyncCheckpoint.objects.update_or_create(
+            source=settings.UPSTREAM_SYNC_URL, defaults=defaults
+        )
+
+    def get_start_url(self) -> str:
+        """
+        Where to start reading the change feed: the next page recorded in
+        the checkpoint if we're resuming an interrupted sync, otherwise
+        everything modified since `get_last_modified`
+        """
+        if self.resume:
+            checkpoint = SyncCheckpoint.objects.filter(
+                source=settings.UPSTREAM_SYNC_URL
+            ).first()
+            if checkpoint and checkpoint.next_url:
+                self.stdout.write(
+                    f"Resuming after {checkpoint.last_election_id} ({checkpoint.last_modified})"
+                )
+                return checkpoint.next_url
+        last_modified = self.get_last_modified(self.since)
+        # `cursor` asks for the keyset paginated change feed, ordered by
+        # modified, so pages don't get slower and rows modified mid-sync
+        # aren't skipped
+        return f"{settings.UPSTREAM_SYNC_URL}?modified={last_modified}&cursor=&limit=1000"
+
     def get_last_modified(
         self, since: Optional[datetime.datetime] = None
     ) -> datetime.datetime:
@@ -295,20 +1060,132 @@ class ElectionSyncer:
 
         return last_modified.replace(tzinfo=None)
 
-    def run_import(self):
+    def get_changes_url(self, since: str) -> str:
+        return f"{urljoin(settings.UPSTREAM_SYNC_URL, 'changes/')}?since={since}&limit=1000"
+
+    def get_latest_sequence(self) -> str:
+        """
+        Where the upstream change log is now, so that once we've caught up
+        by `modified` we can follow the log from here. Blank if upstream
+        doesn't have a change log.
+        """
+        try:
+            return self.get_json(self.get_changes_url("latest"))[
+                "last_sequence"
+            ]
+        except requests.HTTPError:
+            return ""
+
+    def fetch_elections(self, election_ids: list[str]) -> list[dict]:
+        """
+        Download the elections in `election_ids` that are approved
+        upstream, FETCH_BY_ID at a time, concurrently over the session
+        """
+        urls = [
+            f"{settings.UPSTREAM_SYNC_URL}?"
+            + urlencode(
+                {
+                    "election_id": ",".join(
+                        election_ids[i : i + self.FETCH_BY_ID]
+                    ),
+                    "limit": self.FETCH_BY_ID,
+                }
+            )
+            for i in range(0, len(election_ids), self.FETCH_BY_ID)
+        ]
+        with ThreadPoolExecutor(max_workers=self.FETCH_WORKERS) as executor:
+            return [
+                result
+                for page in executor.map(self.get_json, urls)
+                for result in page["results"]
+            ]
+
+    def import_changes_page(self, changes: list[dict]):
+        """
+        Apply a page of the upstream change log. Elections that are
+        approved upstream are added or updated as usual. The rest have
+        been rejected, deleted or moved back to suggested upstream, so we
+        do the same to our copies.
+        """
+        statuses = {}
+        for change in changes:
+            statuses[change["election_id"]] = (
+                ModerationStatuses.deleted.value
+                if change["deleted"]
+                else change["current_status"]
+            )
+        results = self.fetch_elections(sorted(statuses))
+        self.import_page(results)
+
+        for result in results:
+            statuses.pop(result["election_id"], None)
+        withdrawn = defaultdict(list)
+        for election_id, status in statuses.items():
+            # An election that was approved when it changed but isn't now
+            # has changed again, later in the log
+            if status and status != ModerationStatuses.approved.value:
+                withdrawn[status].append(election_id)
+        for status, election_ids in withdrawn.items():
+            ModerationHistory.bulk_moderate(
+                Election.private_objects.filter(election_id__in=election_ids),
+                status,
+                push_event=False,
+            )
+
+    def import_changes(self, since: str):
+        """
+        Follow the upstream change log from `since` a page at a time. Each
+        page is committed along with the position it reached.
+        """
         self.url = settings.UPSTREAM_SYNC_URL
-        last_modified = self.get_last_modified(self.since)
-        self.url = f"{self.url}?modified={last_modified}"
-        self.stdout.write(self.url)
-        while self.url:
-            self.stdout.write(f"Starting import for {last_modified}")
-            req = requests.get(self.url)
-            req.raise_for_status()
-            resp_json = req.json()
-            unordered_results = resp_json["results"]
-            results = sorted(
-                unordered_results, key=lambda d: d["election_id"].count(".")
+        url = self.get_changes_url(since)
+        self.stdout.write(url)
+        for page_url, page in self.iter_pages(url):
+            self.stdout.write(f"Starting import for {page_url}")
+            with self.atomic(), self.defer_end_dates():
+                self.import_changes_page(page["results"])
+                SyncCheckpoint.objects.update_or_create(
+                    source=settings.UPSTREAM_SYNC_URL,
+                    defaults={"last_sequence": page["last_sequence"]},
+                )
+
+    def import_modified(self):
+        """
+        Import the elections modified since `get_last_modified` a page at
+        a time. Each page is committed along with the checkpoint, so a
+        failure part way through only loses the page in progress. Once
+        it's finished, the next sync follows the change log from where it
+        was when this one started.
+        """
+        latest_sequence = self.get_latest_sequence()
+        url = self.get_start_url()
+        self.stdout.write(url)
+        for self.url, page in self.iter_pages(url):
+            self.stdout.write(f"Starting import for {self.url}")
+            with self.atomic(), self.defer_end_dates():
+                self.import_page(page["results"])
+                self.save_checkpoint(page)
+        if latest_sequence:
+            SyncCheckpoint.objects.update_or_create(
+                source=settings.UPSTREAM_SYNC_URL,
+                defaults={"last_sequence": latest_sequence},
             )
-            for result in results:
-                self.process_result(result)
-            self.url = resp_json.get("next", None)
+
+    def run_import(self):
+        """
+        Follow the upstream change log from the last position we saw, or
+        import by `modified` if we haven't got one, were given `since`, or
+        are resuming an interrupted import by `modified`
+        """
+        checkpoint = SyncCheckpoint.objects.filter(
+            source=settings.UPSTREAM_SYNC_URL
+        ).first()
+        if (
+            checkpoint
+            and checkpoint.last_sequence
+            and not self.since
+            and not (self.resume and checkpoint.next_url)
+        ):
+            self.import_changes(checkpoint.last_sequence)
+        else:
+            self.import_modified()
@@ -3,7 +3,7 @@ from unittest.mock import MagicMock, patch
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from elections import admin
-from elections.models import ModerationHistory, ModerationStatuses
+from elections.models import Election, ModerationHistory, ModerationStatuses
 from elections.tests.factories import ElectionFactory
 
 
@@ -57,3 +57,26 @@ class TestAdminActions(TestCase):
 
         assert admin_send_event_mock.call_count == 1
         assert model_send_event_mock.call_count == 0
+
+    def test_approve(self):
+        ballot = ElectionFactory()
+        user = get_user_model().objects.create(is_superuser=True)
+        request = MagicMock(user=user)
+
+        with patch("elections.models.send_event") as model_send_event_mock:
+            admin.approve(
+                modeladmin=MagicMock(),
+                queryset=Election.private_objects.filter(pk=ballot.pk),
+                request=request,
+            )
+
+        ballot.refresh_from_db()
+        assert ballot.current_status == ModerationStatuses.approved.value
+        assert ballot.group.current_status == ModerationStatuses.approved.value
+        assert (
+            ModerationHistory.objects.filter(
+                user=user, status_id=ModerationStatuses.approved.value
+            ).count()
+            == 2
+        )
+        assert model_send_event_mock.call_count == 1
@@ -1,9 +1,13 @@
 from django.test import TestCase
 from elections.constraints import (
+    ViolatedConstraint,
+    check_constraints,
+    find_violations,
     has_approved_child,
     has_approved_parents,
     has_related_status,
 )
+from elections.models import Election
 from elections.tests.factories import (
     ElectionFactory,
     ElectionWithStatusFactory,
@@ -74,3 +78,40 @@ class TestElectionModel(TestCase):
             status=ModerationStatusFactory(short_label="Approved"),
         )
         self.assertTrue(has_approved_child(org_group))
+
+
+class TestFindViolations(TestCase):
+    def test_matches_check_constraints(self):
+        # no status at all
+        ElectionFactory(group=None)
+        # approved ballot with a suggested parent
+        suggested_group = ElectionWithStatusFactory(
+            group=None,
+            group_type="election",
+            moderation_status=related_status("Suggested"),
+        )
+        ElectionWithStatusFactory(group=suggested_group)
+        # approved ballot with an approved parent and a suggested grandparent
+        org_group = ElectionWithStatusFactory(
+            group=suggested_group, group_type="organisation"
+        )
+        ElectionWithStatusFactory(group=org_group)
+        # group with no approved children
+        empty_group = ElectionWithStatusFactory(
+            group=None, group_type="election"
+        )
+        ElectionWithStatusFactory(
+            group=empty_group, moderation_status=related_status("Rejected")
+        )
+
+        expected = []
+        for election in Election.private_objects.all().order_by("election_id"):
+            try:
+                check_constraints(election)
+            except ViolatedConstraint as e:
+                expected.append(str(e))
+
+        self.assertEqual(5, len(expected))
+        with self.assertNumQueries(3):
+            violations = find_violations()
+        self.assertEqual(expected, [str(e) for e in violations])
@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta
 
 from django.contrib.gis.geos import Point
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from elections.models import Election
+from elections.query_helpers import PostcodeError, get_points_from_postcodes
 from elections.tests.factories import (
     ElectionFactory,
     ElectionWithStatusFactory,
@@ -10,6 +11,7 @@ from elections.tests.factories import (
     ModerationStatusFactory,
     related_status,
 )
+from uk_geo_utils.models import Onspd
 
 
 class TestElectionGeoQueries(TestCase):
@@ -34,6 +36,41 @@ class TestElectionGeoQueries(TestCase):
         qs = Election.public_objects.for_postcode("SW1A 1AA")
         assert qs.count() == 1
 
+    @override_settings(USE_POSTCODE_LOOKUP_TABLE=True)
+    def test_election_for_postcode_lookup_table(self):
+        election = ElectionWithStatusFactory(group=None)
+        ElectionWithStatusFactory(group=None, division_geography=None)
+        qs = Election.public_objects.for_postcode("sw1a1aa")
+        assert list(qs) == [election]
+        assert "subdivided" not in str(qs.query)
+
+    @override_settings(USE_POSTCODE_LOOKUP_TABLE=True)
+    def test_election_for_postcode_lookup_table_unknown_postcode(self):
+        with self.assertRaises(PostcodeError):
+            Election.public_objects.for_postcode("not-a-postcode")
+
+    def test_terminated_postcode(self):
+        # The single and batch lookups and the lookup table all treat a
+        # terminated postcode the same way as a live one
+        Onspd.objects.create(
+            pcds="SW1A 0ZZ",
+            location=Point(self.lon, self.lat),
+            doterm="202001",
+        )
+        election = ElectionWithStatusFactory(group=None)
+
+        self.assertEqual(
+            [election], list(Election.public_objects.for_postcode("SW1A0ZZ"))
+        )
+        with override_settings(USE_POSTCODE_LOOKUP_TABLE=True):
+            self.assertEqual(
+                [election],
+                list(Election.public_objects.for_postcode("SW1A0ZZ")),
+            )
+        self.assertEqual(
+            ["SW1A0ZZ"], list(get_points_from_postcodes(["SW1A0ZZ"]))
+        )
+
     def test_current_elections(self):
         # This is implicetly current
         ElectionWithStatusFactory(group=None, poll_open_date=datetime.today())
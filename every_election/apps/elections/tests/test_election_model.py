@@ -4,17 +4,25 @@ from datetime import timezone as dt_timezone
 from unittest.mock import PropertyMock, patch
 
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.test import TestCase
 from django.utils import timezone as dj_timezone
+from elections.constraints import check_constraints
 from elections.models import (
     DEFAULT_STATUS,
     ByElectionReason,
     Election,
     ElectionCancellationReason,
+    ElectionChange,
     ModerationHistory,
     ModerationStatuses,
 )
-from elections.tests.factories import ElectionFactory, ElectionTypeFactory
+from elections.tests.factories import (
+    ElectionFactory,
+    ElectionTypeFactory,
+    ElectionWithStatusFactory,
+    related_status,
+)
 from elections.utils import ElectionBuilder
 from freezegun import freeze_time
 from organisations.tests.factories import (
@@ -149,6 +157,16 @@ class TestElectionModel(BaseElectionCreatorMixIn, TestCase):
         )
         self.assertEqual(len(self.election_group.get_ballots()), 2)
 
+    def test_save_group_updates_ballots_modified(self):
+        for election in [self.election_group, self.org_group, self.ballot]:
+            election.save(status=ModerationStatuses.approved.value)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.org_group.save()
+            self.election_group.save()
+        self.ballot.refresh_from_db()
+        self.assertEqual(self.election_group.modified, self.ballot.modified)
+
     def test_seat_counts(self):
         for election in [
             self.election_group,
@@ -280,6 +298,81 @@ class TestElectionModel(BaseElectionCreatorMixIn, TestCase):
                 4,
             )
 
+    def test_tree_path(self):
+        for election in [
+            self.election_group,
+            self.testshire_org_group,
+            self.testshire_ballot,
+            self.org_group,
+            self.ballot,
+        ]:
+            election.save(status=ModerationStatuses.approved.value)
+
+        self.assertEqual(
+            f"{self.election_group.pk}/{self.org_group.pk}/{self.ballot.pk}/",
+            Election.private_objects.get(pk=self.ballot.pk).tree_path,
+        )
+        self.assertEqual(
+            [self.election_group, self.org_group],
+            list(
+                Election.private_objects.ancestors_of(self.ballot).order_by(
+                    "pk"
+                )
+            ),
+        )
+        self.assertEqual(
+            [self.org_group, self.ballot],
+            list(
+                Election.private_objects.descendents_of(
+                    self.org_group, inclusive=True
+                ).order_by("pk")
+            ),
+        )
+
+    def test_tree_path_moves_with_group(self):
+        for election in [
+            self.election_group,
+            self.testshire_org_group,
+            self.testshire_ballot,
+        ]:
+            election.save(status=ModerationStatuses.approved.value)
+        other_group = ElectionBuilder(
+            "local", "2017-06-15"
+        ).build_election_group()
+        other_group.save()
+
+        self.testshire_org_group.group = other_group
+        with self.captureOnCommitCallbacks(execute=True):
+            self.testshire_org_group.save()
+
+        # The instance knows where it's moved to, so its ballots are still
+        # found and take its modified
+        self.assertEqual(
+            f"{other_group.pk}/{self.testshire_org_group.pk}/",
+            self.testshire_org_group.tree_path,
+        )
+        self.assertEqual(
+            [self.testshire_ballot],
+            list(self.testshire_org_group.get_ballots()),
+        )
+        self.testshire_ballot.refresh_from_db()
+        self.assertEqual(
+            self.testshire_org_group.modified, self.testshire_ballot.modified
+        )
+        self.assertEqual(
+            [self.testshire_ballot],
+            list(
+                Election.private_objects.descendents_of(other_group).filter(
+                    group_type=None
+                )
+            ),
+        )
+        self.assertFalse(
+            Election.private_objects.descendents_of(self.election_group)
+            .filter(group_type=None)
+            .exists()
+        )
+
     def test_requires_voter_id_empty(self):
         self.ballot.requires_voter_id = ""
         self.ballot.save()
@@ -314,6 +407,147 @@ class TestElectionModel(BaseElectionCreatorMixIn, TestCase):
                 assert send_event_mock.call_count == 0
 
 
+class TestBulkModerate(TestCase):
+    def setUp(self):
+        self.election_group = ElectionWithStatusFactory(
+            group=None,
+            group_type="election",
+            moderation_status=related_status("Suggested"),
+        )
+        self.org_group = ElectionWithStatusFactory(
+            group=self.election_group,
+            group_type="organisation",
+            moderation_status=related_status("Suggested"),
+        )
+        self.ballots = [
+            ElectionWithStatusFactory(
+                group=self.org_group,
+                moderation_status=related_status("Suggested"),
+            )
+            for _ in range(3)
+        ]
+
+    def statuses(self):
+        return dict(
+            Election.private_objects.values_list(
+                "election_id", "current_status"
+            )
+        )
+
+    def test_approve_approves_parents(self):
+        with patch("elections.models.send_event") as send_event_mock:
+            moderated = ModerationHistory.bulk_moderate(
+                Election.private_objects.filter(group=self.org_group),
+                "Approved",
+                notes="test",
+            )
+
+        self.assertEqual(5, len(moderated))
+        self.assertEqual({"Approved"}, set(self.statuses().values()))
+        self.assertEqual(
+            5,
+            ModerationHistory.objects.filter(
+                status_id="Approved", notes="test"
+            ).count(),
+        )
+        for election in Election.private_objects.all():
+            check_constraints(election)
+        send_event_mock.assert_called_once()
+
+    def test_modified_moves_forward(self):
+        past = dj_timezone.now() - timedelta(days=1)
+        Election.private_objects.update(modified=past)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ModerationHistory.bulk_moderate([self.ballots[0]], "Approved")
+
+        modified = dict(
+            Election.private_objects.values_list("election_id", "modified")
+        )
+        for election in [self.ballots[0], self.org_group, self.election_group]:
+            self.assertGreater(modified[election.election_id], past)
+        # Not moderated
+        self.assertEqual(past, modified[self.ballots[1].election_id])
+
+    def test_already_in_status(self):
+        ModerationHistory.bulk_moderate(self.ballots, "Approved")
+        with patch("elections.models.send_event") as send_event_mock:
+            moderated = ModerationHistory.bulk_moderate(
+                self.ballots, "Approved"
+            )
+        self.assertEqual([], moderated)
+        send_event_mock.assert_not_called()
+
+    def test_delete_group_only_deletes_group(self):
+        ModerationHistory.bulk_moderate(self.ballots[:2], "Approved")
+        ModerationHistory.bulk_moderate([self.org_group], "Deleted")
+
+        statuses = self.statuses()
+        self.assertEqual("Deleted", statuses[self.org_group.election_id])
+        self.assertEqual("Approved", statuses[self.ballots[0].election_id])
+        self.assertEqual("Approved", statuses[self.ballots[1].election_id])
+        self.assertEqual("Approved", statuses[self.election_group.election_id])
+
+    def test_delete_group_deletes_approved_children(self):
+        ModerationHistory.bulk_moderate(self.ballots[:2], "Approved")
+        ModerationHistory.bulk_moderate(
+            [self.org_group], "Deleted", cascade=True
+        )
+
+        statuses = self.statuses()
+        self.assertEqual("Deleted", statuses[self.org_group.election_id])
+        self.assertEqual("Deleted", statuses[self.ballots[0].election_id])
+        self.assertEqual("Deleted", statuses[self.ballots[1].election_id])
+        # wasn't approved, so doesn't need to change
+        self.assertEqual("Suggested", statuses[self.ballots[2].election_id])
+        # left without an approved child
+        self.assertEqual("Deleted", statuses[self.election_group.election_id])
+
+    def test_reject_last_approved_child(self):
+        ModerationHistory.bulk_moderate(self.ballots[:2], "Approved")
+
+        ModerationHistory.bulk_moderate(
+            [self.ballots[0]], "Rejected", cascade=True
+        )
+        statuses = self.statuses()
+        self.assertEqual("Approved", statuses[self.org_group.election_id])
+        self.assertEqual("Approved", statuses[self.election_group.election_id])
+
+        ModerationHistory.bulk_moderate(
+            [self.ballots[1]], "Rejected", cascade=True
+        )
+        statuses = self.statuses()
+        self.assertEqual("Rejected", statuses[self.org_group.election_id])
+        self.assertEqual("Rejected", statuses[self.election_group.election_id])
+
+
+class TestElectionChangeAnnounce(TestCase):
+    def test_once_per_transaction(self):
+        for _ in range(2):
+            with (
+                patch("elections.models.send_event") as send_event_mock,
+                self.captureOnCommitCallbacks(execute=True),
+            ):
+                ElectionChange.announce()
+                ElectionChange.announce()
+            send_event_mock.assert_called_once_with(
+                detail={"description": "Election changes recorded"},
+                detail_type="election_changes_recorded",
+            )
+
+    def test_rolled_back(self):
+        with (
+            patch("elections.models.send_event") as send_event_mock,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            with contextlib.suppress(ValueError), transaction.atomic():
+                ElectionChange.announce()
+                raise ValueError("Nope")
+            send_event_mock.assert_not_called()
+            ElectionChange.announce()
+        send_event_mock.assert_called_once()
+
+
 class TestModified(TestCase):
     def test_update_changes_modified(self):
         election = ElectionFactory()
@@ -327,6 +561,30 @@ class TestModified(TestCase):
             election.refresh_from_db()
             self.assertEqual(election.modified, future)
 
+    def test_related_objects_change_modified(self):
+        election = ElectionWithStatusFactory(group=None)
+        other = ElectionWithStatusFactory(
+            group=None,
+            election_type=ElectionTypeFactory(election_type="parl"),
+        )
+        modified = election.modified
+
+        with (
+            freeze_time("2040-5-5 12:00:00"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            election.election_type.name = "Renamed"
+            election.election_type.save()
+            election.division.divisionset.save()
+        election.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            election.modified,
+            dj_timezone.datetime(2040, 5, 5, 12, tzinfo=dt_timezone.utc),
+        )
+        self.assertGreater(election.modified, modified)
+        self.assertNotEqual(election.modified, other.modified)
+
 
 class TestTimetableFields(TestCase):
     POLL_DATE = "2024-05-02"
@@ -0,0 +1,144 @@
+import csv
+import gzip
+import io
+import json
+from unittest import mock
+
+import pyarrow.parquet as pq
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from elections.management.commands.export_ballots_as_wkt_csv import (
+    IterStream,
+    export_sql,
+    gzip_chunks,
+)
+
+from .factories import ElectionWithStatusFactory
+
+COMMAND_PATH = "elections.management.commands.export_ballots_as_wkt_csv"
+
+
+class TestIterStream(TestCase):
+    def test_read(self):
+        chunks = [b"abc", b"", b"defgh", b"i"]
+        stream = io.BufferedReader(IterStream(chunks), 2)
+        self.assertEqual(b"abcdefghi", stream.read())
+
+    def test_readinto_small_buffer(self):
+        stream = IterStream([b"abcde"])
+        buffer = bytearray(2)
+        read = []
+        while size := stream.readinto(buffer):
+            read.append(bytes(buffer[:size]))
+        self.assertEqual([b"ab", b"cd", b"e"], read)
+
+
+class TestGzipChunks(TestCase):
+    def test_round_trip(self):
+        chunks = [b"election_id\n", b"", b"local.x.2024-05-02\n" * 1000]
+        self.assertEqual(
+            b"".join(chunks), gzip.decompress(b"".join(gzip_chunks(chunks)))
+        )
+
+
+class TestExportBallotsAsWktCsv(TestCase):
+    def setUp(self):
+        ElectionWithStatusFactory.create_batch(5, group=None)
+        self.uploaded = {}
+
+    def upload_fileobj(self, fileobj, bucket, key, Config):
+        self.uploaded[key] = fileobj.read()
+
+    def upload_file(self, filename, bucket, key, Config):
+        with open(filename, "rb") as f:
+            self.uploaded[key] = f.read()
+
+    def get_expected_csv(self):
+        """
+        The CSV as the command made it before it streamed the upload
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(export_sql("2000-01-01"))
+            fieldnames = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        csv_file = io.StringIO()
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(fieldnames)
+        csv_writer.writerows(rows)
+        return csv_file.getvalue().encode("utf-8")
+
+    def export(self, *args):
+        with (
+            mock.patch(f"{COMMAND_PATH}.boto3") as boto3,
+            mock.patch(f"{COMMAND_PATH}.CHUNK_SIZE", 2),
+        ):
+            boto3.client.return_value.upload_fileobj = self.upload_fileobj
+            boto3.client.return_value.upload_file = self.upload_file
+            call_command(
+                "export_ballots_as_wkt_csv",
+                "--bucket=bucket",
+                "--prefix=ballots",
+                "--from-when=2000-01-01",
+                *args,
+                stdout=io.StringIO(),
+            )
+
+    def test_csv(self):
+        self.export()
+        expected = self.get_expected_csv()
+        # A header and at least a row per ballot, over several chunks
+        self.assertGreaterEqual(len(expected.splitlines()), 6)
+        self.assertEqual(
+            {"ballots/current_elections.csv": expected}, self.uploaded
+        )
+
+    def test_gzip(self):
+        self.export("--gzip")
+        self.assertEqual(
+            ["ballots/current_elections.csv.gz"], list(self.uploaded)
+        )
+        self.assertEqual(
+            self.get_expected_csv(),
+            gzip.decompress(self.uploaded["ballots/current_elections.csv.gz"]),
+        )
+
+    def test_parquet(self):
+        with mock.patch(f"{COMMAND_PATH}.PARQUET_ROW_GROUP_SIZE", 3):
+            self.export("--format=parquet")
+        parquet_file = pq.ParquetFile(
+            io.BytesIO(self.uploaded["ballots/current_elections.parquet"])
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(export_sql("2000-01-01", "st_asbinary"))
+            expected = [
+                (
+                    election_id,
+                    geography_id,
+                    bytes(geom) if geom is not None else None,
+                    source_table,
+                )
+                for election_id, geography_id, geom, source_table in (
+                    cursor.fetchall()
+                )
+            ]
+        table = parquet_file.read()
+        self.assertEqual(
+            ["election_id", "geography_id", "geography", "source_table"],
+            table.column_names,
+        )
+        self.assertEqual(
+            sorted(expected), sorted(zip(*table.to_pydict().values()))
+        )
+        # Batched into row groups across cursor chunks
+        self.assertEqual(2, parquet_file.num_row_groups)
+
+        geo = json.loads(parquet_file.schema_arrow.metadata[b"geo"])
+        self.assertEqual("geography", geo["primary_column"])
+        self.assertEqual("WKB", geo["columns"]["geography"]["encoding"])
+
+    def test_parquet_gzip(self):
+        with self.assertRaisesMessage(CommandError, "--gzip is only for csv"):
+            self.export("--format=parquet", "--gzip")
+        self.assertEqual({}, self.uploaded)
@@ -1,15 +1,28 @@
 import json
 import os
+import threading
 from unittest.mock import MagicMock, patch
 
 import boto3
 import pytest
 from botocore.exceptions import ClientError
 from django.test import override_settings
-from elections.baker import send_event
+from elections.baker import (
+    EventPublisher,
+    event_publisher,
+    get_events_client,
+    send_event,
+)
 from moto import mock_aws
 
 
+@pytest.fixture(autouse=True)
+def clear_events_client():
+    get_events_client.cache_clear()
+    yield
+    get_events_client.cache_clear()
+
+
 @pytest.fixture()
 def boto_session():
     with mock_aws():
@@ -98,14 +111,23 @@ def event_bus_arn(events_client):
     DC_ENVIRONMENT="development",
     EC2_IP="127.0.0.1",
 )
-def test_send_event_happy_path(sqs_client, sqs_queue_details, event_bus_arn):
+def test_send_event_happy_path(
+    sqs_client,
+    sqs_queue_details,
+    event_bus_arn,
+    django_capture_on_commit_callbacks,
+):
     with override_settings(DC_EVENTBUS_ARN=event_bus_arn):
         queue_url, _ = sqs_queue_details
         detail = {"message": "Test event"}
         detail_type = "elections_set_changed"
 
-        with patch("elections.baker.logger") as mock_logger:
+        with (
+            patch("elections.baker.logger") as mock_logger,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
             send_event(detail, detail_type)
+        event_publisher.join()
 
         sqs_response = sqs_client.receive_message(
             QueueUrl=queue_url, WaitTimeSeconds=5
@@ -171,7 +193,9 @@ def test_send_event_disabled(sqs_client, sqs_queue_details, event_bus_arn):
     DC_ENVIRONMENT="development",
     EC2_IP="127.0.0.1",
 )
-def test_send_event_internal_exception(event_bus_arn):
+def test_send_event_internal_exception(
+    event_bus_arn, django_capture_on_commit_callbacks
+):
     """Test that the InternalException in send_event is properly caught and logged."""
     with override_settings(DC_EVENTBUS_ARN=event_bus_arn):
         detail = {"message": "Test event with client exception"}
@@ -206,7 +230,9 @@ def test_send_event_internal_exception(event_bus_arn):
             # Patch the logger to verify it gets called
             with patch("elections.baker.logger") as mock_logger:
                 # Test the function - it should handle the exception internally
-                send_event(detail, detail_type)
+                with django_capture_on_commit_callbacks(execute=True):
+                    send_event(detail, detail_type)
+                event_publisher.join()
 
                 # Verify the logger.error was called as expected
                 mock_logger.error.assert_called_once()
@@ -223,3 +249,83 @@ def test_send_event_internal_exception(event_bus_arn):
                 call_kwargs = mock_logger.error.call_args[1]
                 assert call_kwargs["exc_info"] is True
                 assert call_kwargs["stack_info"] is True
+
+
+@pytest.mark.django_db
+@override_settings(
+    SEND_EVENTS=True,
+    EVENTS_CLIENT="local",
+    DC_ENVIRONMENT="development",
+    EC2_IP="127.0.0.1",
+    DC_EVENTBUS_ARN="arn:aws:events:eu-west-2:000000000000:event-bus/test",
+)
+def test_send_event_waits_for_commit(django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        send_event({"message": "Test event"}, "elections_set_changed")
+    event_publisher.join()
+    assert get_events_client().sent == []
+
+    for callback in callbacks:
+        callback()
+    event_publisher.join()
+    assert [entry["DetailType"] for entry in get_events_client().sent] == [
+        "elections_set_changed"
+    ]
+
+
+@override_settings(EVENTS_CLIENT="local")
+def test_events_sent_in_batches():
+    publisher = EventPublisher()
+    # Queue these before there's a worker to pick them up
+    for i in range(25):
+        publisher.queue.put({"Detail": json.dumps({"i": i})})
+    publisher.publish({"Detail": json.dumps({"i": 25})})
+    publisher.join()
+
+    client = get_events_client()
+    assert [json.loads(entry["Detail"])["i"] for entry in client.sent] == list(
+        range(26)
+    )
+    assert client.calls == 3
+
+
+@override_settings(EVENTS_CLIENT="local")
+def test_failed_entries_retried():
+    client = get_events_client()
+    responses = [
+        {
+            "FailedEntryCount": 1,
+            "Entries": [{"EventId": "1"}, {"ErrorCode": "InternalFailure"}],
+        },
+        {"FailedEntryCount": 0, "Entries": [{"EventId": "2"}]},
+    ]
+    publisher = EventPublisher()
+    publisher.RETRY_BACKOFF = 0
+    with patch.object(
+        client, "put_events", side_effect=responses
+    ) as put_events:
+        publisher.put_events([{"Detail": "1"}, {"Detail": "2"}])
+    assert put_events.call_args_list[1].kwargs == {"Entries": [{"Detail": "2"}]}
+
+
+@override_settings(EVENTS_CLIENT="local")
+def test_join_times_out():
+    client = get_events_client()
+    release = threading.Event()
+    publisher = EventPublisher()
+    with (
+        patch.object(
+            client, "put_events", side_effect=lambda Entries: release.wait()
+        ),
+        patch("elections.baker.logger") as mock_logger,
+    ):
+        publisher.publish({"Detail": "1"})
+        publisher.publish({"Detail": "2"})
+        assert publisher.join(timeout=0.1) is False
+
+        publisher.SHUTDOWN_TIMEOUT = 0.1
+        publisher.join_at_exit()
+        mock_logger.error.assert_called_once()
+
+        release.set()
+        assert publisher.join(timeout=5) is True
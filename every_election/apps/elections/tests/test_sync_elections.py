@@ -1,9 +1,27 @@
+import contextlib
+import copy
 import datetime
-
-from django.test import TestCase
-from elections.models import Election, ElectionCancellationReason
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from elections.models import (
+    Election,
+    ElectionCancellationReason,
+    ModerationHistory,
+    SyncCheckpoint,
+    SyncDeadLetter,
+)
 from elections.sync_helper import ElectionSyncer
-from elections.tests.factories import ElectedRoleFactory, ElectionFactory
+from elections.tests.factories import (
+    ElectedRoleFactory,
+    ElectionFactory,
+    ElectionWithStatusFactory,
+)
 from elections.tests.test_election_sync_fixtures import get_local_ballot
 from organisations.models import Organisation, OrganisationDivisionSet
 from organisations.tests.factories import (
@@ -270,3 +288,382 @@ class TestElectionSyncerCreatesElection(TestCase):
         # ...and the end date is updated
         div_set.refresh_from_db()
         self.assertEqual(div_set.end_date, datetime.date(2024, 5, 2))
+
+
+class TestElectionSyncerAddElections(TestCase):
+    def setUp(self):
+        self.helper = ElectionSyncer()
+        self.ballot = get_local_ballot()
+
+    def make_ballots(self, count):
+        ballots = []
+        for year in range(2023, 2023 + count):
+            ballot = copy.deepcopy(self.ballot)
+            ballot["election_id"] = (
+                f"local.reigate-and-banstead.banstead-village.{year}-05-04"
+            )
+            ballot["poll_open_date"] = f"{year}-05-04"
+            ballots.append(ballot)
+        return ballots
+
+    def test_elections_created(self):
+        self.helper.add_elections([self.ballot])
+
+        election = Election.public_objects.get(
+            election_id=self.ballot["election_id"]
+        )
+        self.assertEqual(
+            "local.reigate-and-banstead.2022-05-05", election.group.election_id
+        )
+        self.assertEqual("banstead-village", election.division.slug)
+        self.assertEqual("FPTP", election.voting_system)
+        self.assertIsNone(election.group_type)
+        self.assertEqual(
+            datetime.datetime(
+                2023, 3, 15, 14, 5, 49, 642005, tzinfo=datetime.timezone.utc
+            ),
+            election.modified,
+        )
+        self.assertEqual(
+            ["Approved", "Suggested"],
+            list(
+                ModerationHistory.objects.filter(election=election)
+                .order_by("status_id")
+                .values_list("status_id", flat=True)
+            ),
+        )
+
+    def test_elections_updated(self):
+        self.helper.add_elections([self.ballot])
+        election = Election.public_objects.get()
+
+        self.ballot["cancelled"] = True
+        self.ballot["cancellation_reason"] = (
+            ElectionCancellationReason.CANDIDATE_DEATH
+        )
+        self.ballot["modified"] = "2023-03-16T14:05:49.642005Z"
+        self.helper.add_elections([self.ballot])
+
+        election.refresh_from_db()
+        self.assertTrue(election.cancelled)
+        self.assertEqual("CANDIDATE_DEATH", election.cancellation_reason)
+        self.assertEqual(datetime.date(2023, 3, 16), election.modified.date())
+        self.assertEqual(
+            2, ModerationHistory.objects.filter(election=election).count()
+        )
+
+    def test_same_result_as_add_single_election(self):
+        self.helper.add_single_election(self.ballot)
+        expected = Election.private_objects.values().get()
+        Election.private_objects.all().delete()
+
+        self.helper.add_elections([self.ballot])
+        actual = Election.private_objects.values().get()
+        for row in (expected, actual):
+            row.pop("id")
+        self.assertEqual(expected, actual)
+
+    def test_divisionset_end_date_updated(self):
+        self.ballot["division"]["divisionset"]["end_date"] = "2022-05-02"
+        self.helper.add_elections([self.ballot])
+        div_set = OrganisationDivisionSet.objects.get()
+        self.assertEqual(datetime.date(2022, 5, 2), div_set.end_date)
+
+    def test_queries_do_not_scale_with_page_size(self):
+        with CaptureQueriesContext(connection) as one:
+            self.helper.add_elections(self.make_ballots(1))
+        Election.private_objects.filter(
+            election_id__startswith="local.reigate-and-banstead.banstead"
+        ).delete()
+        with CaptureQueriesContext(connection) as many:
+            self.helper.add_elections(self.make_ballots(5))
+        self.assertEqual(len(one), len(many))
+        self.assertEqual(
+            5,
+            Election.public_objects.filter(
+                election_id__startswith="local.reigate-and-banstead.banstead"
+            ).count(),
+        )
+
+
+class TestElectionSyncerPipeline(TestCase):
+    def setUp(self):
+        self.helper = ElectionSyncer()
+        self.helper.url = "https://example.com/api/elections/"
+
+    def test_iter_pages(self):
+        pages = {
+            "https://example.com/1": {"next": "https://example.com/2"},
+            "https://example.com/2": {"next": "https://example.com/3"},
+            "https://example.com/3": {"next": None},
+        }
+        with mock.patch.object(
+            self.helper, "get_json", side_effect=pages.__getitem__
+        ):
+            self.assertEqual(
+                list(pages.items()),
+                list(self.helper.iter_pages("https://example.com/1")),
+            )
+
+    def test_session_per_thread(self):
+        session = self.helper.session
+        self.assertIs(session, self.helper.session)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            other_sessions = list(
+                executor.map(lambda _: self.helper.session, range(2))
+            )
+        self.assertNotIn(session, other_sessions)
+
+    def test_iter_pages_raises_fetch_errors(self):
+        pages = self.helper.iter_pages("https://example.com/1")
+        with (
+            mock.patch.object(
+                self.helper, "get_json", side_effect=ValueError("Nope")
+            ),
+            self.assertRaisesMessage(ValueError, "Nope"),
+        ):
+            list(pages)
+
+    def test_missing_parent_fetched(self):
+        ballot = get_local_ballot()
+        parent = Election.private_objects.get(election_id=ballot["group"])
+        parent_result = copy.deepcopy(ballot)
+        parent_result.update(
+            {
+                "election_id": parent.election_id,
+                "election_title": "Reigate and Banstead local election",
+                "group": None,
+                "group_type": "organisation",
+                "identifier_type": "organisation",
+                "division": None,
+                "seats_contested": None,
+            }
+        )
+        parent.delete()
+
+        with mock.patch.object(
+            self.helper, "get_json", return_value=parent_result
+        ) as get_json:
+            self.helper.add_elections([ballot])
+        get_json.assert_called_once_with(
+            "https://example.com/api/elections/local.reigate-and-banstead.2022-05-05"
+        )
+
+        election = Election.public_objects.get(
+            election_id=ballot["election_id"]
+        )
+        self.assertEqual(parent.election_id, election.group.election_id)
+        self.assertEqual("organisation", election.group.group_type)
+
+
+@override_settings(UPSTREAM_SYNC_URL="https://example.com/api/elections/")
+class TestElectionSyncerCheckpoints(TestCase):
+    def setUp(self):
+        self.ballot = get_local_ballot()
+        self.pages = {
+            "https://example.com/1": {
+                "next": "https://example.com/2",
+                "results": [self.ballot],
+            },
+            "https://example.com/2": {"next": None, "results": []},
+            "https://example.com/api/elections/changes/?since=latest&limit=1000": {
+                "last_sequence": "5.10"
+            },
+        }
+
+    def test_bad_result_goes_to_dead_letters(self):
+        bad_ballot = copy.deepcopy(self.ballot)
+        bad_ballot["election_id"] = "local.nowhere.somewhere.2022-05-05"
+        bad_ballot["organisation"]["official_identifier"] = "NOWHERE"
+
+        helper = ElectionSyncer(stderr=io.StringIO())
+        helper.import_page([bad_ballot, self.ballot])
+
+        self.assertTrue(
+            Election.public_objects.filter(
+                election_id=self.ballot["election_id"]
+            ).exists()
+        )
+        dead_letter = SyncDeadLetter.objects.get()
+        self.assertEqual(bad_ballot["election_id"], dead_letter.election_id)
+        self.assertEqual(bad_ballot, dead_letter.result)
+        self.assertIn("DoesNotExist", dead_letter.error)
+
+    def test_checkpoint_saved(self):
+        ElectionSyncer().save_checkpoint(self.pages["https://example.com/1"])
+
+        checkpoint = SyncCheckpoint.objects.get()
+        self.assertEqual(
+            "https://example.com/api/elections/", checkpoint.source
+        )
+        self.assertEqual("https://example.com/2", checkpoint.next_url)
+        self.assertEqual(
+            self.ballot["election_id"], checkpoint.last_election_id
+        )
+
+    def test_resume(self):
+        SyncCheckpoint.objects.create(
+            source="https://example.com/api/elections/",
+            next_url="https://example.com/1",
+        )
+
+        helper = ElectionSyncer(stdout=io.StringIO())
+        self.assertIn("cursor=", helper.get_start_url())
+
+        helper = ElectionSyncer(stdout=io.StringIO(), resume=True)
+        self.assertEqual("https://example.com/1", helper.get_start_url())
+        with mock.patch.object(
+            helper, "get_json", side_effect=self.pages.__getitem__
+        ):
+            helper.run_import()
+
+        self.assertTrue(
+            Election.public_objects.filter(
+                election_id=self.ballot["election_id"]
+            ).exists()
+        )
+        checkpoint = SyncCheckpoint.objects.get()
+        self.assertEqual("", checkpoint.next_url)
+        # The next sync follows the change log from where it was
+        self.assertEqual("5.10", checkpoint.last_sequence)
+
+
+@override_settings(UPSTREAM_SYNC_URL="https://example.com/api/elections/")
+class TestElectionSyncerChanges(TestCase):
+    def setUp(self):
+        self.ballot = get_local_ballot()
+        self.withdrawn = ElectionWithStatusFactory(group=None)
+        SyncCheckpoint.objects.create(
+            source="https://example.com/api/elections/", last_sequence="1.1"
+        )
+        election_ids = sorted(
+            [self.ballot["election_id"], self.withdrawn.election_id]
+        )
+        self.pages = {
+            "https://example.com/api/elections/changes/?since=1.1&limit=1000": {
+                "next": None,
+                "last_sequence": "2.5",
+                "results": [
+                    {
+                        "sequence": "2.4",
+                        "election_id": self.ballot["election_id"],
+                        "current_status": "Approved",
+                        "deleted": False,
+                    },
+                    {
+                        "sequence": "2.5",
+                        "election_id": self.withdrawn.election_id,
+                        "current_status": "Rejected",
+                        "deleted": False,
+                    },
+                ],
+            },
+            "https://example.com/api/elections/?"
+            + urlencode({"election_id": ",".join(election_ids), "limit": 50}): {
+                "next": None,
+                "results": [self.ballot],
+            },
+        }
+
+    def test_changes_followed(self):
+        helper = ElectionSyncer(stdout=io.StringIO())
+        with mock.patch.object(
+            helper, "get_json", side_effect=self.pages.__getitem__
+        ):
+            helper.run_import()
+
+        self.assertTrue(
+            Election.public_objects.filter(
+                election_id=self.ballot["election_id"]
+            ).exists()
+        )
+        self.withdrawn.refresh_from_db()
+        self.assertEqual("Rejected", self.withdrawn.current_status)
+        self.assertEqual("2.5", SyncCheckpoint.objects.get().last_sequence)
+
+    def test_since_imports_by_modified(self):
+        helper = ElectionSyncer(
+            since=datetime.datetime(2022, 1, 1), stdout=io.StringIO()
+        )
+        with mock.patch.object(helper, "import_modified") as import_modified:
+            helper.run_import()
+        import_modified.assert_called_once_with()
+
+
+class TestElectionSyncerIdentityMap(TestCase):
+    def setUp(self):
+        self.helper = ElectionSyncer()
+        self.ballot = get_local_ballot()
+
+    def test_organisation_cached(self):
+        organisation = self.helper.get_organisation(self.ballot["organisation"])
+        with self.assertNumQueries(0):
+            self.assertIs(
+                organisation,
+                self.helper.get_organisation(self.ballot["organisation"]),
+            )
+
+    def test_division_cached(self):
+        organisation = self.helper.get_organisation(self.ballot["organisation"])
+        division = self.helper.get_division(
+            organisation, self.ballot["division"]
+        )
+        with self.assertNumQueries(0):
+            self.assertIs(
+                division,
+                self.helper.get_division(organisation, self.ballot["division"]),
+            )
+
+    def test_end_dates_deferred(self):
+        organisation_dict = dict(
+            self.ballot["organisation"], end_date="2030-01-01"
+        )
+        division_dict = copy.deepcopy(self.ballot["division"])
+        division_dict["divisionset"]["end_date"] = "2026-05-06"
+
+        with self.helper.defer_end_dates():
+            organisation = self.helper.get_organisation(organisation_dict)
+            self.helper.get_organisation(organisation_dict)
+            self.helper.get_division(organisation, division_dict)
+            self.helper.get_division(organisation, division_dict)
+            self.assertIsNone(
+                Organisation.objects.get(pk=organisation.pk).end_date
+            )
+
+        organisation.refresh_from_db()
+        self.assertEqual(datetime.date(2030, 1, 1), organisation.end_date)
+        div_set = OrganisationDivisionSet.objects.get()
+        self.assertEqual(datetime.date(2026, 5, 6), div_set.end_date)
+        self.assertEqual({}, self.helper.changed_end_dates)
+
+    def test_end_date_change_bumps_modified(self):
+        organisation = self.helper.get_organisation(self.ballot["organisation"])
+        election = Election.private_objects.get(
+            election_id=self.ballot["group"]
+        )
+        old_modified = organisation.modified
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.helper.get_organisation(
+                dict(self.ballot["organisation"], end_date="2030-01-01")
+            )
+
+        organisation.refresh_from_db()
+        election.refresh_from_db()
+        self.assertGreater(organisation.modified, old_modified)
+        self.assertEqual(organisation.modified, election.modified)
+
+    def test_end_dates_undone_on_rollback(self):
+        organisation_dict = dict(
+            self.ballot["organisation"], end_date="2030-01-01"
+        )
+        with contextlib.suppress(ValueError), self.helper.atomic():
+            organisation = self.helper.get_organisation(organisation_dict)
+            raise ValueError("Nope")
+        self.assertIsNone(organisation.end_date)
+        self.assertEqual({}, self.helper.changed_end_dates)
+
+        # So trying again makes the change
+        self.helper.get_organisation(organisation_dict)
+        organisation.refresh_from_db()
+        self.assertEqual(datetime.date(2030, 1, 1), organisation.end_date)
@@ -9,9 +9,9 @@ from django.urls import reverse
 from django.utils.html import mark_safe
 from django.views import View
 from django.views.generic import DetailView, ListView, TemplateView
+from elections.datapackage import ELECTION_TYPE_PAYLOADS
 from elections.forms import NoticeOfElectionForm
 from elections.models import ByElectionReason, Document, Election, ElectionType
-from uk_election_ids.datapackage import ELECTION_TYPES
 
 
 class ElectionTypesView(ListView):
@@ -30,10 +30,10 @@ class ReferenceDefinitionView(TemplateView):
         # We need to transform ELECTION_TYPES into a data structure
         # which is more optimised for generating HTML in a template:
         election_types_table = []
-        for et_key, et_record in OrderedDict(
-            sorted(ELECTION_TYPES.items())
-        ).items():
-            et_record["slug"] = et_key
+        for et_record in OrderedDict(
+            sorted(ELECTION_TYPE_PAYLOADS.items())
+        ).values():
+            et_record = et_record.copy()
             et_record["subtype"] = None
 
             if et_record["slug"] == "senedd":
@@ -1,5 +1,4 @@
 import csv
-from collections import deque
 from typing import Iterator
 
 from django.contrib.gis.db.models.functions import Area, Intersection, Transform
@@ -82,23 +81,18 @@ class Command(BaseCommand):
         self.stdout.write(
             f"Getting all child ballots for {parent_election.election_id}..."
         )
-        ballots = []
-        queue = deque([parent_election])
-        while queue:
-            current_election = queue.popleft()
-            if current_election.group_type is None:
-                ballots.append(current_election)
-                continue
-            child_elections = list(
-                current_election.get_children(Election.public_objects).annotate(
-                    geom=Coalesce(
-                        F("division_geography__geography"),
-                        F("organisation_geography__geography"),
-                    )
+        return list(
+            Election.public_objects.descendents_of(
+                parent_election, inclusive=True
+            )
+            .filter(group_type=None)
+            .annotate(
+                geom=Coalesce(
+                    F("division_geography__geography"),
+                    F("organisation_geography__geography"),
                 )
             )
-            queue.extend(child_elections)
-        return ballots
+        )
 
     def get_parl_sidx(self):
         try:
@@ -633,3 +633,11 @@ PMTILES_FEATURE_ATTR_FIELDS = [
     "division__name",
     "division__official_identifier",
 ]
+
+# Tolerances (in degrees) at which we store simplified copies of each
+# division and organisation geography, keyed on the API's `?simplify=` value
+SIMPLIFIED_GEOGRAPHY_TOLERANCES = {
+    "low": 0.0001,
+    "medium": 0.001,
+    "high": 0.005,
+}
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from organisations.models import (
+    DivisionGeographyPostcode,
+    OrganisationGeographyPostcode,
+)
+
+
+class Command(BaseCommand):
+    help = """
+    Rebuild the postcode -> geography lookup tables from ONSPD and the
+    subdivided geography tables.
+
+    Run this after importing a new ONSPD or running
+    populate_subdivided_tables. Changes to individual geographies are
+    picked up when they are saved.
+    """
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            self.stdout.write("Orgs")
+            cursor.execute(OrganisationGeographyPostcode.POPULATE_SQL)
+            self.stdout.write("Divs")
+            cursor.execute(DivisionGeographyPostcode.POPULATE_SQL)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from organisations.constants import SIMPLIFIED_GEOGRAPHY_TOLERANCES
+from organisations.models import (
+    DivisionGeographySimplified,
+    OrganisationGeographySimplified,
+)
+
+
+class Command(BaseCommand):
+    help = """
+    Rebuild the simplified geography tables at each of
+    SIMPLIFIED_GEOGRAPHY_TOLERANCES.
+
+    Changes to individual geographies are picked up when they are saved.
+    """
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        tolerances = list(SIMPLIFIED_GEOGRAPHY_TOLERANCES.values())
+        with connection.cursor() as cursor:
+            for name, model in (
+                ("Orgs", OrganisationGeographySimplified),
+                ("Divs", DivisionGeographySimplified),
+            ):
+                self.stdout.write(name)
+                cursor.execute("TRUNCATE {}".format(model._meta.db_table))
+                cursor.execute(model.POPULATE_SQL, [tolerances])
@@ -1,12 +1,16 @@
+import multiprocessing
 import os
+import shutil
 import tempfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import django
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from elections.baker import send_event
 from organisations.models import OrganisationDivisionSet
-from organisations.pmtiles_creator import PMtilesCreator
+from organisations.pmtiles_creator import create_pmtile
 
 from every_election.apps.storage.s3wrapper import S3Wrapper
 
@@ -20,6 +24,15 @@ class Command(BaseCommand):
             action="store_true",
             help="Overwrite existing PMTiles if they exist.",
         )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help=(
+                "Number of worker processes to create PMTiles with. "
+                "Files are uploaded as each one is finished."
+            ),
+        )
         group = parser.add_mutually_exclusive_group(required=True)
         group.add_argument(
             "--all",
@@ -69,7 +82,8 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING(warning))
                 failures += len(missing_ids)
 
-        for divset in qs:
+        to_create = []
+        for divset in qs.select_related("organisation"):
             self.stdout.write(f"Processing DivisionSet: {divset.id}")
             # Check divset has division geographies
             if not divset.get_division_geographies().exists():
@@ -99,37 +113,21 @@ class Command(BaseCommand):
 
             # remove outdated pmtiles
             self.remove_pmtiles(fp_start, existing_hashes_for_divset)
-
-            pmtiles_creator = PMtilesCreator(divset)
-
-            with tempfile.TemporaryDirectory() as temp_dir:
-                try:
-                    pmtile_fp = pmtiles_creator.create_pmtile(temp_dir)
-                except Exception as e:
-                    error = f"Failed to create PMTiles for DivisionSet {divset.id}: {e}"
+            to_create.append(divset)
+
+        for divset, temp_dir, result in self.create_pmtiles(
+            to_create, options["jobs"]
+        ):
+            try:
+                if isinstance(result, Exception):
+                    error = f"Failed to create PMTiles for DivisionSet {divset.id}: {result}"
                     self.stdout.write(self.style.ERROR(error))
                     failures += 1
                     continue
-
-                if self.using_s3:
-                    s3_key = divset.pmtiles_s3_key
-                    self.s3_wrapper.upload_file_from_fp(pmtile_fp, s3_key)
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"PMTile uploaded to S3 at {s3_key}."
-                        )
-                    )
-                else:
-                    # Move the pmtiles file to the static directory
-                    os.rename(
-                        pmtile_fp, f"{static_path}/{divset.pmtiles_file_name}"
-                    )
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f"PMTile created at {static_path}/{divset.pmtiles_file_name}."
-                        )
-                    )
+                self.store_pmtile(divset, result)
                 tiles_updated = True
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
 
         if failures:
             raise CommandError(f"Failed to process {failures} DivisionSets")
@@ -142,6 +140,65 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS("Completed successfully."))
 
+    def get_executor(self, jobs):
+        # Spawn rather than fork so that each worker sets Django up from
+        # scratch and opens its own database connection
+        return ProcessPoolExecutor(
+            max_workers=jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=django.setup,
+        )
+
+    def create_pmtiles(self, divsets, jobs):
+        """
+        Create a PMTiles file for each DivisionSet, each in its own temp
+        dir, yielding (divset, temp_dir, file path or exception) as each
+        one finishes. With jobs > 1 they're created in a pool of worker
+        processes, so the caller can upload finished files while the rest
+        are being created.
+        """
+        if jobs <= 1:
+            for divset in divsets:
+                temp_dir = tempfile.mkdtemp()
+                try:
+                    yield divset, temp_dir, create_pmtile(divset, temp_dir)
+                except Exception as e:
+                    yield divset, temp_dir, e
+            return
+
+        temp_dirs = {divset.id: tempfile.mkdtemp() for divset in divsets}
+        with self.get_executor(jobs) as executor:
+            futures = {
+                executor.submit(
+                    create_pmtile, divset, temp_dirs[divset.id]
+                ): divset
+                for divset in divsets
+            }
+            for future in as_completed(futures):
+                divset = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                yield divset, temp_dirs[divset.id], result
+
+    def store_pmtile(self, divset, pmtile_fp):
+        if self.using_s3:
+            s3_key = divset.pmtiles_s3_key
+            self.s3_wrapper.upload_file_from_fp(pmtile_fp, s3_key)
+            self.stdout.write(
+                self.style.SUCCESS(f"PMTile uploaded to S3 at {s3_key}.")
+            )
+        else:
+            # Move the pmtiles file to the static directory
+            static_path = f"{settings.STATIC_ROOT}/pmtiles-store"
+            os.rename(pmtile_fp, f"{static_path}/{divset.pmtiles_file_name}")
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"PMTile created at {static_path}/{divset.pmtiles_file_name}."
+                )
+            )
+
     def create_lookup_dict(self, existing_pmtiles):
         lookup = defaultdict(list)
         for file_path in existing_pmtiles:
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.15 on 2026-10-18 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("organisations", "0074_organisationboundaryreview_public_visibility"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DivisionGeographyPostcode",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("postcode", models.CharField(db_index=True, max_length=8)),
+                (
+                    "division_geography",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="postcodes",
+                        to="organisations.divisiongeography",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="OrganisationGeographyPostcode",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("postcode", models.CharField(db_index=True, max_length=8)),
+                (
+                    "organisation_geography",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="postcodes",
+                        to="organisations.organisationgeography",
+                    ),
+                ),
+            ],
+        ),
+    ]
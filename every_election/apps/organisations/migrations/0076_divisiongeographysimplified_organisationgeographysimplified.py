@@ -0,0 +1,81 @@
+# Generated by Django 5.2.15 on 2026-10-18 14:02
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "organisations",
+            "0075_divisiongeographypostcode_organisationgeographypostcode",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DivisionGeographySimplified",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "geography",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(
+                        srid=4326
+                    ),
+                ),
+                ("tolerance", models.FloatField()),
+                (
+                    "division_geography",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="simplified",
+                        to="organisations.divisiongeography",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("division_geography", "tolerance")},
+            },
+        ),
+        migrations.CreateModel(
+            name="OrganisationGeographySimplified",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "geography",
+                    django.contrib.gis.db.models.fields.MultiPolygonField(
+                        srid=4326
+                    ),
+                ),
+                ("tolerance", models.FloatField()),
+                (
+                    "organisation_geography",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="simplified",
+                        to="organisations.organisationgeography",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("organisation_geography", "tolerance")},
+            },
+        ),
+    ]
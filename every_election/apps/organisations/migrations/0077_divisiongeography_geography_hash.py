@@ -0,0 +1,29 @@
+# Generated by Django 5.2.15 on 2026-10-18 19:05
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "organisations",
+            "0076_divisiongeographysimplified_organisationgeographysimplified",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="divisiongeography",
+            name="geography_hash",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=django.db.models.functions.text.MD5(
+                    django.db.models.functions.Cast(
+                        "geography", output_field=models.BinaryField()
+                    )
+                ),
+                output_field=models.CharField(max_length=32),
+            ),
+        ),
+    ]
@@ -5,6 +5,8 @@ from organisations.models.admin import (
 )
 from organisations.models.divisions import (
     DivisionGeography,
+    DivisionGeographyPostcode,
+    DivisionGeographySimplified,
     DivisionGeographySubdivided,
     OrganisationBoundaryReview,
     OrganisationDivision,
@@ -15,6 +17,8 @@ from organisations.models.divisions import (
 from organisations.models.organisations import (
     Organisation,
     OrganisationGeography,
+    OrganisationGeographyPostcode,
+    OrganisationGeographySimplified,
     OrganisationGeographySubdivided,
 )
 
@@ -25,10 +29,14 @@ __all__ = [
     "Organisation",
     "OrganisationGeography",
     "OrganisationGeographySubdivided",
+    "OrganisationGeographyPostcode",
+    "OrganisationGeographySimplified",
     "OrganisationDivisionSet",
     "OrganisationDivision",
     "DivisionGeography",
     "DivisionGeographySubdivided",
+    "DivisionGeographyPostcode",
+    "DivisionGeographySimplified",
     "OrganisationBoundaryReview",
     "ReviewStatus",
     "TerritoryCode",
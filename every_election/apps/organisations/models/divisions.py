@@ -12,10 +12,17 @@ from django.db.models.functions import MD5, Cast, Concat
 from django.utils.functional import cached_property
 from django_extensions.db.models import TimeStampedModel
 from elections.baker import send_event
-from organisations.constants import PMTILES_FEATURE_ATTR_FIELDS
+from organisations.constants import (
+    PMTILES_FEATURE_ATTR_FIELDS,
+    SIMPLIFIED_GEOGRAPHY_TOLERANCES,
+)
 from storage.s3wrapper import S3Wrapper
 
-from .mixins import DateConstraintMixin, DateDisplayMixin
+from .mixins import (
+    DateConstraintMixin,
+    DateDisplayMixin,
+    SimplifiedGeographyMixin,
+)
 
 
 class DivisionSetQuerySet(models.QuerySet):
@@ -106,12 +113,16 @@ class OrganisationDivisionSet(
         return DivisionGeography.objects.none()
 
     def generate_pmtiles_md5_hash(self):
-        """Generate an MD5 hash based on the given feature attributes and geographies."""
+        """
+        Generate an MD5 hash based on the given feature attributes and
+        geographies. Each geography's own hash is stored on
+        DivisionGeography, so this doesn't need to read any geometry.
+        """
         div_geogs = self.get_division_geographies()
         aggregate_dict = div_geogs.annotate(
             fields_concat=Concat(
                 *PMTILES_FEATURE_ATTR_FIELDS,
-                MD5(Cast("geography", output_field=BinaryField())),
+                "geography_hash",
                 output_field=CharField(),
             )
         ).aggregate(result_hash=MD5(StringAgg("fields_concat", delimiter="")))
@@ -235,12 +246,19 @@ class OrganisationDivision(UpdateElectionsTimestampedModel):
         return link
 
 
-class DivisionGeography(models.Model):
+class DivisionGeography(SimplifiedGeographyMixin, models.Model):
     division = models.OneToOneField(
         OrganisationDivision, related_name="geography", on_delete=models.CASCADE
     )
     geography = models.MultiPolygonField()
     source = models.CharField(blank=True, max_length=255)
+    # Kept up to date by the database whenever geography changes, so
+    # we can tell whether a geography has changed without reading it
+    geography_hash = models.GeneratedField(
+        expression=MD5(Cast("geography", output_field=BinaryField())),
+        output_field=CharField(max_length=32),
+        db_persist=True,
+    )
 
     @transaction.atomic
     def save(self, *args, **kwargs):
@@ -255,6 +273,17 @@ class DivisionGeography(models.Model):
         with connection.cursor() as cursor:
             cursor.execute(sql, [self.id])
 
+        self.postcodes.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(DivisionGeographyPostcode.REFRESH_SQL, [self.id])
+
+        self.simplified.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                DivisionGeographySimplified.REFRESH_SQL,
+                [list(SIMPLIFIED_GEOGRAPHY_TOLERANCES.values()), self.id],
+            )
+
 
 class DivisionGeographySubdivided(models.Model):
     geography = models.PolygonField(db_index=True, spatial_index=True)
@@ -286,6 +315,73 @@ class DivisionGeographySubdivided(models.Model):
     """
 
 
+class DivisionGeographyPostcode(models.Model):
+    """
+    A precomputed lookup of which ONSPD postcodes fall inside each
+    DivisionGeography.
+
+    This lets us find the divisions for a postcode with an indexed
+    equality lookup rather than a point-in-polygon query.
+    """
+
+    postcode = models.CharField(max_length=8, db_index=True)
+    division_geography = models.ForeignKey(
+        DivisionGeography,
+        on_delete=models.CASCADE,
+        related_name="postcodes",
+    )
+
+    POPULATE_SQL = """
+    TRUNCATE organisations_divisiongeographypostcode;
+    INSERT INTO organisations_divisiongeographypostcode (postcode, division_geography_id)
+        SELECT DISTINCT onspd.pcds as postcode, dgs.division_geography_id
+        FROM uk_geo_utils_onspd onspd
+            JOIN organisations_divisiongeographysubdivided dgs
+                ON ST_Contains(dgs.geography, onspd.location);
+    """
+
+    REFRESH_SQL = """
+    INSERT INTO organisations_divisiongeographypostcode (postcode, division_geography_id)
+        SELECT DISTINCT onspd.pcds as postcode, dgs.division_geography_id
+        FROM uk_geo_utils_onspd onspd
+            JOIN organisations_divisiongeographysubdivided dgs
+                ON ST_Contains(dgs.geography, onspd.location)
+        WHERE dgs.division_geography_id=%s;
+    """
+
+
+class DivisionGeographySimplified(models.Model):
+    """
+    DivisionGeography.geography simplified at each of
+    SIMPLIFIED_GEOGRAPHY_TOLERANCES, for map clients that don't need
+    full resolution boundaries.
+    """
+
+    geography = models.MultiPolygonField()
+    tolerance = models.FloatField()
+    division_geography = models.ForeignKey(
+        DivisionGeography,
+        on_delete=models.CASCADE,
+        related_name="simplified",
+    )
+
+    class Meta:
+        unique_together = ("division_geography", "tolerance")
+
+    POPULATE_SQL = """
+    INSERT INTO organisations_divisiongeographysimplified (geography, tolerance, division_geography_id)
+        SELECT ST_Multi(ST_SimplifyPreserveTopology(dg.geography, tolerance)), tolerance, dg.id
+        FROM organisations_divisiongeography dg, unnest(%s::float8[]) AS tolerance;
+    """
+
+    REFRESH_SQL = """
+    INSERT INTO organisations_divisiongeographysimplified (geography, tolerance, division_geography_id)
+        SELECT ST_Multi(ST_SimplifyPreserveTopology(dg.geography, tolerance)), tolerance, dg.id
+        FROM organisations_divisiongeography dg, unnest(%s::float8[]) AS tolerance
+        WHERE dg.id=%s;
+    """
+
+
 class OrganisationBoundaryReviewQuerySet(models.QuerySet):
     def unprocessed(self):
         """
@@ -2,6 +2,18 @@ from django.core.exceptions import ValidationError
 from django.utils.dateparse import parse_date
 
 
+class SimplifiedGeographyMixin:
+    def get_simplified_geography(self, tolerance):
+        """
+        Return the geography simplified at `tolerance`, or the full
+        geography if that hasn't been generated
+        """
+        simplified = self.simplified.filter(tolerance=tolerance).first()
+        if simplified is None:
+            return self.geography
+        return simplified.geography
+
+
 class DateDisplayMixin:
     @property
     def active_period_text(self):
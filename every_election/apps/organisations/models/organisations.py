@@ -3,8 +3,13 @@ from django.contrib.gis.db import models
 from django.db import connection, transaction
 from django.urls import reverse
 from model_utils import Choices
+from organisations.constants import SIMPLIFIED_GEOGRAPHY_TOLERANCES
 
-from .mixins import DateConstraintMixin, DateDisplayMixin
+from .mixins import (
+    DateConstraintMixin,
+    DateDisplayMixin,
+    SimplifiedGeographyMixin,
+)
 
 
 class OrganisationManager(models.QuerySet):
@@ -133,7 +138,10 @@ class Organisation(UpdateElectionsTimestampedModel, DateDisplayMixin):
 
 
 class OrganisationGeography(
-    DateConstraintMixin, DateDisplayMixin, models.Model
+    DateConstraintMixin,
+    DateDisplayMixin,
+    SimplifiedGeographyMixin,
+    models.Model,
 ):
     organisation = models.ForeignKey(
         "Organisation", related_name="geographies", on_delete=models.CASCADE
@@ -169,6 +177,17 @@ class OrganisationGeography(
         with connection.cursor() as cursor:
             cursor.execute(sql, [self.id])
 
+        self.postcodes.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(OrganisationGeographyPostcode.REFRESH_SQL, [self.id])
+
+        self.simplified.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                OrganisationGeographySimplified.REFRESH_SQL,
+                [list(SIMPLIFIED_GEOGRAPHY_TOLERANCES.values()), self.id],
+            )
+
     class Meta:
         verbose_name_plural = "Organisation Geographies"
         ordering = ("-start_date",)
@@ -214,3 +233,71 @@ class OrganisationGeographySubdivided(models.Model):
         FROM organisations_organisationgeography og
         WHERE og.id IN (SELECT id FROM missing_subdivided_geography);
     """
+
+
+class OrganisationGeographyPostcode(models.Model):
+    """
+    A precomputed lookup of which ONSPD postcodes fall inside each
+    OrganisationGeography.
+
+    This lets us find the organisations for a postcode with an indexed
+    equality lookup rather than a point-in-polygon query.
+    """
+
+    postcode = models.CharField(max_length=8, db_index=True)
+    organisation_geography = models.ForeignKey(
+        OrganisationGeography,
+        on_delete=models.CASCADE,
+        related_name="postcodes",
+    )
+
+    POPULATE_SQL = """
+    TRUNCATE organisations_organisationgeographypostcode;
+    INSERT INTO organisations_organisationgeographypostcode (postcode, organisation_geography_id)
+        SELECT DISTINCT onspd.pcds as postcode, ogs.organisation_geography_id
+        FROM uk_geo_utils_onspd onspd
+            JOIN organisations_organisationgeographysubdivided ogs
+                ON ST_Contains(ogs.geography, onspd.location);
+    """
+
+    REFRESH_SQL = """
+    INSERT INTO organisations_organisationgeographypostcode (postcode, organisation_geography_id)
+        SELECT DISTINCT onspd.pcds as postcode, ogs.organisation_geography_id
+        FROM uk_geo_utils_onspd onspd
+            JOIN organisations_organisationgeographysubdivided ogs
+                ON ST_Contains(ogs.geography, onspd.location)
+        WHERE ogs.organisation_geography_id=%s;
+    """
+
+
+class OrganisationGeographySimplified(models.Model):
+    """
+    OrganisationGeography.geography simplified at each of
+    SIMPLIFIED_GEOGRAPHY_TOLERANCES, for map clients that don't need
+    full resolution boundaries.
+    """
+
+    geography = models.MultiPolygonField()
+    tolerance = models.FloatField()
+    organisation_geography = models.ForeignKey(
+        OrganisationGeography,
+        on_delete=models.CASCADE,
+        related_name="simplified",
+    )
+
+    class Meta:
+        unique_together = ("organisation_geography", "tolerance")
+
+    POPULATE_SQL = """
+    INSERT INTO organisations_organisationgeographysimplified (geography, tolerance, organisation_geography_id)
+        SELECT ST_Multi(ST_SimplifyPreserveTopology(og.geography, tolerance)), tolerance, og.id
+        FROM organisations_organisationgeography og, unnest(%s::float8[]) AS tolerance
+        WHERE og.geography IS NOT NULL;
+    """
+
+    REFRESH_SQL = """
+    INSERT INTO organisations_organisationgeographysimplified (geography, tolerance, organisation_geography_id)
+        SELECT ST_Multi(ST_SimplifyPreserveTopology(og.geography, tolerance)), tolerance, og.id
+        FROM organisations_organisationgeography og, unnest(%s::float8[]) AS tolerance
+        WHERE og.geography IS NOT NULL AND og.id=%s;
+    """
@@ -1,9 +1,10 @@
+import contextlib
+import json
 import subprocess
 import sys
 from pathlib import Path
 
-import psycopg2
-from django.db import connection
+from django.contrib.gis.db.models.functions import AsGeoJSON
 from organisations.constants import PMTILES_FEATURE_ATTR_FIELDS
 from organisations.models import DivisionGeography
 
@@ -17,11 +18,14 @@ class PMtilesCreator:
 
     Methods:
         create_pmtile(dest_dir):
-            Generates a PMTiles file in the specified destination directory by exporting division geographies
-            as GeoJSON and combining them using tippecanoe
+            Generates a PMTiles file in the specified destination directory by streaming
+            division geographies as newline-delimited GeoJSON features into tippecanoe,
+            with one layer per division type
     """
 
     feature_fields = PMTILES_FEATURE_ATTR_FIELDS
+    # Rows to fetch from the server-side cursor at a time
+    chunk_size = 500
 
     def __init__(self, divset):
         self.divset = divset
@@ -29,71 +33,73 @@ class PMtilesCreator:
     def create_pmtile(self, dest_dir):
         pmtiles_fp = f"{dest_dir}/{self.divset.pmtiles_file_name}"
 
-        # Create a geojson file for each division subtype
-        div_types = set(
-            self.divset.divisions.values_list("division_type", flat=True)
-        )
-        geojson_files = []
-        for div_type in div_types:
-            geojson_fp = self._create_geojson(dest_dir, div_type)
-            geojson_files.append(geojson_fp)
-
         tippecanoe_path = Path(sys.prefix) / "bin" / "tippecanoe"
-        tippecanoe_command = f"{tippecanoe_path} -o {pmtiles_fp} -zg --drop-densest-as-needed --no-simplification-of-shared-nodes --no-tiny-polygon-reduction --low-detail=10  {' '.join(geojson_files)}"
-
-        subprocess.run(tippecanoe_command, shell=True, check=True)
+        tippecanoe_command = [
+            str(tippecanoe_path),
+            "-o",
+            pmtiles_fp,
+            "-zg",
+            "--drop-densest-as-needed",
+            "--no-simplification-of-shared-nodes",
+            "--no-tiny-polygon-reduction",
+            "--low-detail=10",
+        ]
+
+        # With no input files tippecanoe reads features from stdin. If it
+        # exits early, writing to it or closing its stdin as the Popen
+        # block exits raises BrokenPipeError, so that's suppressed around
+        # both and we report its exit status below. Popen waits for it to
+        # exit either way.
+        with (
+            contextlib.suppress(BrokenPipeError),
+            subprocess.Popen(
+                tippecanoe_command, stdin=subprocess.PIPE, text=True
+            ) as tippecanoe,
+        ):
+            for feature in self.iter_features():
+                tippecanoe.stdin.write(feature)
+        if tippecanoe.returncode:
+            raise subprocess.CalledProcessError(
+                tippecanoe.returncode, tippecanoe_command
+            )
 
         return pmtiles_fp
 
-    def _create_geojson(self, dest_dir, div_type):
-        geojson_fp = f"{dest_dir}/{self.divset.id}_{div_type}.geojson"
-        ogr_command = self._construct_ogr_command(geojson_fp, div_type)
-        subprocess.run(ogr_command, shell=True, check=True)
-        return geojson_fp
-
-    def _construct_ogr_command(self, geojson_fp, div_type):
-        db_settings = connection.settings_dict
-        sql_query = self._construct_sql_query_string(self.divset.id, div_type)
-
-        db_connection_string = (
-            f"dbname={db_settings['NAME']} "
-            f"user={db_settings['USER']} "
-            f"password={db_settings['PASSWORD']} "
-            f"host={db_settings['HOST'] if db_settings['HOST'] else '127.0.0.1'} "
-            f"port={db_settings['PORT'] if db_settings['PORT'] else '5432'}"
-        )
-
-        return (
-            f'ogr2ogr -f "GeoJSON" {geojson_fp} '
-            f'"PG:{db_connection_string}" '
-            f'-sql "{sql_query}"'
+    def get_layer_name(self, div_type):
+        # The name tippecanoe used to give each division type's layer when
+        # it was read from a file named after it
+        return f"{self.divset.id}_{div_type}"
+
+    def iter_features(self):
+        """
+        Yield a line of GeoJSON for each division geography in the
+        DivisionSet, telling tippecanoe which layer it belongs in
+        """
+        queryset = (
+            self._get_queryset(self.divset.id)
+            .annotate(geojson=AsGeoJSON("geography"))
+            .values(*self.feature_fields, "division__division_type", "geojson")
+            .order_by("division__division_type", "id")
         )
+        for row in queryset.iterator(chunk_size=self.chunk_size):
+            layer = self.get_layer_name(row.pop("division__division_type"))
+            geometry = row.pop("geojson")
+            yield (
+                '{"type": "Feature", '
+                f'"tippecanoe": {json.dumps({"layer": layer})}, '
+                f'"properties": {json.dumps(row)}, '
+                f'"geometry": {geometry}}}\n'
+            )
 
-    def _construct_sql_query_string(self, divisionset_id, div_type):
-        qs = self._get_queryset(divisionset_id).filter(
-            division__division_type=div_type
+    def _get_queryset(self, divisionset_id):
+        return DivisionGeography.objects.filter(
+            division__divisionset_id=divisionset_id,
         )
-        sql, params = qs.query.sql_with_params()
 
-        sql = sql.replace("::bytea", "")  # Remove bytea typecast
 
-        # Format params for SQL string substitution
-        formatted_params = tuple(
-            psycopg2.extensions.adapt(p).getquoted().decode()
-            if isinstance(p, str)
-            else p
-            for p in params
-        )
-        return sql % formatted_params  # Substitute params into the SQL query
-
-    def _get_queryset(self, divisionset_id):
-        return (
-            DivisionGeography.objects.filter(
-                division__divisionset_id=divisionset_id,
-            )
-            .select_related("division")
-            .values(
-                *self.feature_fields,
-                "geography",
-            )
-        )
+def create_pmtile(divset, dest_dir):
+    """
+    Create the PMTiles file for `divset` in `dest_dir`. A module level
+    function so that update_pmtiles can run it in worker processes.
+    """
+    return PMtilesCreator(divset).create_pmtile(dest_dir)
@@ -3,6 +3,7 @@ from unittest.mock import patch
 import pytest
 from elections.tests.factories import ElectedRoleFactory
 from elections.utils import ElectionBuilder
+from organisations.models import DivisionGeography
 from organisations.tests.factories import (
     DivisionGeographyFactory,
     OrganisationDivisionFactory,
@@ -120,3 +121,21 @@ def test_pmtiles_hash_not_regenerated_if_already_exists(db):
 
         ds.save()  # should not not generate hash
         assert mock_generate_hash.call_count == 1
+
+
+def test_geography_hash_follows_geography(db):
+    div_geog = DivisionGeographyFactory()
+    div_geog.refresh_from_db()
+    original_hash = div_geog.geography_hash
+    assert len(original_hash) == 32
+
+    div_geog.source = "new source"
+    div_geog.save()
+    div_geog.refresh_from_db()
+    assert div_geog.geography_hash == original_hash
+
+    DivisionGeography.objects.filter(pk=div_geog.pk).update(
+        geography="MULTIPOLYGON (((0 0, 0 1, 1 1, 0 0)))"
+    )
+    div_geog.refresh_from_db()
+    assert div_geog.geography_hash != original_hash
@@ -1,8 +1,13 @@
+import contextlib
 from datetime import date
+from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from elections.tests.factories import ElectionFactory
+from organisations.constants import SIMPLIFIED_GEOGRAPHY_TOLERANCES
 from organisations.models import (
     DivisionGeographySubdivided,
     Organisation,
@@ -87,6 +92,8 @@ class TestOrganisationManager(TestCase):
 
 
 class TestOrganisationGeographies(TestCase):
+    fixtures = ["onspd.json"]
+
     def test_no_geographies(self):
         org = OrganisationFactory()
         self.assertEqual(None, org.get_geography(date.today()))
@@ -168,6 +175,35 @@ class TestOrganisationGeographies(TestCase):
         # OrganisationGeographySubdivided objects
         self.assertNotEqual(orig_id, geo.subdivided.all()[0].id)
 
+    def test_postcode_lookup_refreshed_on_save(self):
+        geo = OrganisationGeographyFactory(gss="")
+        self.assertEqual(
+            ["SW1A 1AA"], list(geo.postcodes.values_list("postcode", flat=True))
+        )
+
+        # Move the geography away from SW1A 1AA
+        geo.geography = "MULTIPOLYGON (((0 0, 0 0.3, 0.3 0.3, 0.3 0, 0 0)))"
+        geo.save()
+        self.assertFalse(geo.postcodes.exists())
+
+    def test_simplified_refreshed_on_save(self):
+        geo = OrganisationGeographyFactory(gss="")
+        self.assertEqual(
+            sorted(SIMPLIFIED_GEOGRAPHY_TOLERANCES.values()),
+            sorted(geo.simplified.values_list("tolerance", flat=True)),
+        )
+
+        geo.geography = "MULTIPOLYGON (((0 0, 0 0.3, 0.3 0.3, 0.3 0, 0 0)))"
+        geo.save()
+        self.assertEqual(
+            len(SIMPLIFIED_GEOGRAPHY_TOLERANCES), geo.simplified.count()
+        )
+        self.assertTrue(
+            geo.get_simplified_geography(
+                SIMPLIFIED_GEOGRAPHY_TOLERANCES["high"]
+            ).equals(geo.geography)
+        )
+
 
 class TestOrganisationDivision(TestCase):
     def test_format_geography_invalid(self):
@@ -206,7 +242,8 @@ class TestOrganisationDivision(TestCase):
             self.division.modified,
             self.division.election_set.values_list("modified", flat=True),
         )
-        self.division.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.division.save()
         modified_dates = (
             self.division.election_set.values_list("modified", flat=True)
             .order_by()
@@ -216,6 +253,8 @@ class TestOrganisationDivision(TestCase):
 
 
 class TestOrganisationDivisionGeography(TestCase):
+    fixtures = ["onspd.json"]
+
     def test_create_subdivided(self):
         # no subdivided geographies exist before we start
         self.assertEqual(DivisionGeographySubdivided.objects.all().count(), 0)
@@ -243,6 +282,32 @@ class TestOrganisationDivisionGeography(TestCase):
         # DivisionGeographySubdivided objects
         self.assertNotEqual(orig_id, geo.subdivided.all()[0].id)
 
+    def test_postcode_lookup_refreshed_on_save(self):
+        geo = DivisionGeographyFactory()
+        self.assertEqual(
+            ["SW1A 1AA"], list(geo.postcodes.values_list("postcode", flat=True))
+        )
+
+        # Move the geography away from SW1A 1AA
+        geo.geography = "MULTIPOLYGON (((0 0, 0 0.3, 0.3 0.3, 0.3 0, 0 0)))"
+        geo.save()
+        self.assertFalse(geo.postcodes.exists())
+
+    def test_simplified_refreshed_on_save(self):
+        geo = DivisionGeographyFactory()
+        orig_ids = set(geo.simplified.values_list("id", flat=True))
+        self.assertEqual(len(SIMPLIFIED_GEOGRAPHY_TOLERANCES), len(orig_ids))
+
+        geo.save()
+        self.assertFalse(
+            orig_ids & set(geo.simplified.values_list("id", flat=True))
+        )
+
+    def test_get_simplified_geography_falls_back_to_full(self):
+        geo = DivisionGeographyFactory()
+        geo.simplified.all().delete()
+        self.assertEqual(geo.geography, geo.get_simplified_geography(0.001))
+
 
 class TestDateConstraints(TestCase):
     def setUp(self):
@@ -329,7 +394,8 @@ class TestOrganisation(TestCase):
             self.org.modified,
             self.org.election_set.values_list("modified", flat=True),
         )
-        self.org.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.org.save()
         modified_dates = (
             self.org.election_set.values_list("modified", flat=True)
             .order_by()
@@ -337,6 +403,79 @@ class TestOrganisation(TestCase):
         )
         self.assertEqual([self.org.modified], list(modified_dates))
 
+    def test_save_many_updates_once(self):
+        orgs = [self.org, *OrganisationFactory.create_batch(size=3)]
+        with (
+            CaptureQueriesContext(connection) as queries,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            for org in orgs:
+                org.save()
+                org.save()
+        updates = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith('UPDATE "elections_election"')
+        ]
+        self.assertEqual(1, len(updates))
+        self.assertEqual(
+            [self.org.modified],
+            list(
+                self.org.election_set.values_list("modified", flat=True)
+                .order_by()
+                .distinct()
+            ),
+        )
+
+    def test_save_rolled_back(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.org.save()
+            modified = self.org.modified
+            with contextlib.suppress(ValueError), transaction.atomic():
+                self.org.save()
+                raise ValueError("Nope")
+        self.assertEqual(
+            {modified},
+            set(self.org.election_set.values_list("modified", flat=True)),
+        )
+
+    def test_save_announces_changes(self):
+        with (
+            patch("elections.models.send_event") as send_event_mock,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.org.save()
+            self.org.save()
+        send_event_mock.assert_called_once_with(
+            detail={"description": "Election changes recorded"},
+            detail_type="election_changes_recorded",
+        )
+
+    def test_save_without_changes_does_not_announce(self):
+        org = OrganisationFactory()
+        with (
+            patch("elections.models.send_event") as send_event_mock,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            # No elections to update
+            org.save()
+            # Opted out
+            self.org.save(push_event=False)
+        send_event_mock.assert_not_called()
+        self.assertEqual(
+            {self.org.modified},
+            set(self.org.election_set.values_list("modified", flat=True)),
+        )
+
+    def test_save_only_moves_modified_forward(self):
+        election = self.org.election_set.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.org.save()
+            election.save()
+        election.refresh_from_db()
+        self.assertGreater(election.modified, self.org.modified)
+
 
 class TestOrganisationDivisionBoundaryReview(TestCase):
     def setUp(self):
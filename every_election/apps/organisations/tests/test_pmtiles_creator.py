@@ -1,6 +1,9 @@
 import json
 import os
+import subprocess
+from pathlib import Path
 from tempfile import TemporaryDirectory
+from unittest import mock
 
 from django.test import TransactionTestCase
 from factories import (
@@ -24,11 +27,10 @@ class TestPMtilesCreator(TransactionTestCase):
         with TemporaryDirectory() as temp_dir:
             pm_tile_fp = self.pmtile_creator.create_pmtile(temp_dir)
 
-            # There should only be one geojson file because there is only one div type
-            geojson_files = [
-                f for f in os.listdir(temp_dir) if f.endswith(".geojson")
-            ]
-            self.assertEqual(len(geojson_files), 1)
+            # Features are streamed to tippecanoe, not written to disk
+            self.assertEqual(
+                os.listdir(temp_dir), [os.path.basename(pm_tile_fp)]
+            )
             self.assertTrue(os.path.exists(pm_tile_fp))
 
     def test_create_pmtiles_file_multiple_div_types(self):
@@ -40,42 +42,55 @@ class TestPMtilesCreator(TransactionTestCase):
             )
             DivisionGeographyFactory(division=div)
 
+        # There should be two layers because there are two div types
+        layers = {
+            json.loads(line)["tippecanoe"]["layer"]
+            for line in self.pmtile_creator.iter_features()
+        }
+        self.assertEqual(len(layers), 2)
+
         with TemporaryDirectory() as temp_dir:
             pm_tile_fp = self.pmtile_creator.create_pmtile(temp_dir)
 
-            # There should be two geojson files because there are two div types
-            geojson_files = [
-                f for f in os.listdir(temp_dir) if f.endswith(".geojson")
-            ]
-            self.assertEqual(len(geojson_files), 2)
-
             self.assertTrue(os.path.exists(pm_tile_fp))
 
-    def test_create_geojson(self):
-        div_type = self.divisionset.divisions.first().division_type
-
+    def test_create_pmtiles_tippecanoe_fails(self):
         with TemporaryDirectory() as temp_dir:
-            geojson_fp = self.pmtile_creator._create_geojson(temp_dir, div_type)
+            # A tippecanoe that exits without reading its input
+            tippecanoe = Path(temp_dir) / "bin" / "tippecanoe"
+            tippecanoe.parent.mkdir()
+            tippecanoe.write_text("#!/bin/sh\nexit 1\n")
+            tippecanoe.chmod(0o755)
+
+            with (
+                mock.patch(
+                    "organisations.pmtiles_creator.sys.prefix", temp_dir
+                ),
+                self.assertRaises(subprocess.CalledProcessError) as raised,
+            ):
+                self.pmtile_creator.create_pmtile(temp_dir)
+            self.assertEqual(raised.exception.returncode, 1)
 
-            self.assertTrue(os.path.exists(geojson_fp))
-            with open(geojson_fp) as f:
-                geojson = json.load(f)
-            self.assertEqual(len(geojson.get("features", [])), 5)
+    def test_iter_features(self):
+        for _ in range(5):
+            div = OrganisationDivisionFactory(
+                divisionset=self.divisionset,
+                division_type="test_type_2",
+            )
+            DivisionGeographyFactory(division=div)
 
-    def test_construct_sql_query_string(self):
-        self.maxDiff = None
-        divset_id = self.divisionset.id
-        div_type = self.divisionset.divisions.first().division_type
+        features = [
+            json.loads(line) for line in self.pmtile_creator.iter_features()
+        ]
 
-        sql_query = self.pmtile_creator._construct_sql_query_string(
-            divset_id, div_type
-        )
+        self.assertEqual(len(features), 10)
+        # one layer per division type
+        layers = {feature["tippecanoe"]["layer"] for feature in features}
+        self.assertEqual(len(layers), 2)
+        self.assertIn(f"{self.divisionset.id}_test_type_2", layers)
 
-        expected_query = (
-            f'SELECT "organisations_divisiongeography"."id" AS "id", "organisations_divisiongeography"."source" AS "source", "organisations_divisiongeography"."division_id" AS "division_id", "organisations_organisationdivision"."name" AS "division__name", "organisations_organisationdivision"."official_identifier" AS "division__official_identifier", "organisations_divisiongeography"."geography" AS "geography" '
-            f'FROM "organisations_divisiongeography" '
-            f'INNER JOIN "organisations_organisationdivision" '
-            f'ON ("organisations_divisiongeography"."division_id" = "organisations_organisationdivision"."id") '
-            f'WHERE ("organisations_organisationdivision"."divisionset_id" = {divset_id} AND "organisations_organisationdivision"."division_type" = \'{div_type}\')'
+        feature = features[0]
+        self.assertEqual(feature["geometry"]["type"], "MultiPolygon")
+        self.assertEqual(
+            set(feature["properties"]), set(PMtilesCreator.feature_fields)
         )
-        self.assertEqual(sql_query, expected_query)
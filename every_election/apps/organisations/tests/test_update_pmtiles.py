@@ -1,6 +1,7 @@
 import os
 import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from io import StringIO
 from unittest import mock
 
@@ -25,6 +26,18 @@ def mock_create_pmtile(self, temp_dir):
     return filepath
 
 
+def create_pmtile_in_worker(divset, temp_dir):
+    """
+    Stands in for create_pmtile in real worker processes, which don't see
+    mocks patched in the test process. Has to be importable by them, and
+    can't use the database as they aren't connected to the test one.
+    """
+    filepath = os.path.join(temp_dir, divset.pmtiles_file_name)
+    with open(filepath, "w") as f:
+        f.write(f"created by process {os.getpid()}")
+    return filepath
+
+
 @mock_aws
 class TestUpdatePmtiles(TestCase):
     def setUp(self):
@@ -222,6 +235,49 @@ class TestUpdatePmtiles(TestCase):
         divset = OrganisationDivisionSet.objects.get(id=divset.id)
         assert divset.has_pmtiles_file is True
 
+    def test_jobs_argument(self):
+        # Threads rather than processes, so that the workers share the
+        # patched create_pmtile
+        with mock.patch(
+            "organisations.management.commands.update_pmtiles.Command.get_executor",
+            side_effect=lambda jobs: ThreadPoolExecutor(max_workers=jobs),
+        ) as get_executor:
+            call_command("update_pmtiles", all=True, jobs=2)
+
+        get_executor.assert_called_once_with(2)
+        assert self.mock_create_pmtile.call_count == 2
+        divsets = OrganisationDivisionSet.objects.all()
+        assert all(ds.has_pmtiles_file for ds in divsets)
+        self.mock_send_event.assert_called_once()
+
+    def test_jobs_argument_process_pool(self):
+        with mock.patch(
+            "organisations.management.commands.update_pmtiles.create_pmtile",
+            create_pmtile_in_worker,
+        ):
+            call_command("update_pmtiles", all=True, jobs=2)
+
+        for divset in OrganisationDivisionSet.objects.all():
+            assert divset.has_pmtiles_file
+            with open(f"{self.static_path}/{divset.pmtiles_file_name}") as f:
+                assert f.read() != f"created by process {os.getpid()}"
+        self.mock_send_event.assert_called_once()
+
+    def test_jobs_argument_failures(self):
+        self.mock_create_pmtile.side_effect = Exception("Tippecanoe failed")
+        stdout = StringIO()
+        with (
+            mock.patch(
+                "organisations.management.commands.update_pmtiles.Command.get_executor",
+                side_effect=lambda jobs: ThreadPoolExecutor(max_workers=jobs),
+            ),
+            self.assertRaisesMessage(
+                CommandError, "Failed to process 2 DivisionSets"
+            ),
+        ):
+            call_command("update_pmtiles", all=True, jobs=2, stdout=stdout)
+        assert stdout.getvalue().count("Tippecanoe failed") == 2
+
     def test_divset_has_no_division_geographies(self):
         divset = OrganisationDivisionSet.objects.first()
         divset.get_division_geographies().delete()
@@ -291,15 +291,50 @@ REST_FRAMEWORK = {
     ),
 }
 API_MAX_LIMIT = 100
+# Maximum page size for the ?cursor change feed on /api/elections/
+API_CHANGE_FEED_MAX_LIMIT = 1000
+# Maximum number of postcodes + coords in one /api/elections/lookup/ request
+API_MAX_BATCH_LOOKUP = 100
+# Maximum page size for /api/elections/changes/
+API_MAX_CHANGES = 10000
+# Build /api/elections/ lists from .values() rows with
+# FastElectionSerializer. Can also be enabled per request with ?fast
+API_FAST_ELECTION_SERIALIZER = str_bool_to_bool(
+    os.environ.get("API_FAST_ELECTION_SERIALIZER", False)
+)
 
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_URLS_REGEX = r"^/api/.*$"
-CORS_ALLOW_METHODS = ("GET", "OPTIONS")
+# POST is only used by the batch /api/elections/lookup/ endpoint, so that
+# browsers can call it too. Everything else under /api/ is read only.
+CORS_ALLOW_METHODS = ("GET", "OPTIONS", "POST")
+
+# Use the precomputed postcode -> geography tables for postcode searches
+# instead of a point-in-polygon query. Only enable this once the tables
+# have been built with `manage.py populate_postcode_lookup_tables`
+USE_POSTCODE_LOOKUP_TABLE = str_bool_to_bool(
+    os.environ.get("USE_POSTCODE_LOOKUP_TABLE", False)
+)
+
+# Per-worker cache of postcode/co-ordinate lookups to election PKs used by
+# the elections API. Set SHARED_CACHE_ALIAS to the name of a configured
+# Django cache to share lookups and invalidations between workers.
+# See elections/lookup_cache.py
+ELECTION_LOOKUP_CACHE = {
+    "ENABLED": True,
+    "MAX_SIZE": 10000,
+    "TIMEOUT": 60 * 10,
+    "SHARED_CACHE_ALIAS": None,
+    "COORDS_PRECISION": 5,
+}
 
 UPSTREAM_SYNC_URL = "https://elections.democracyclub.org.uk/api/elections/"
 
 # DC Eventbus.
 SEND_EVENTS = False
+# "boto3" to send events to EventBridge, or "local" to keep them in memory
+# (see elections.baker.LocalEventsClient)
+EVENTS_CLIENT = "boto3"
 if DC_ENVIRONMENT in ("development", "staging", "production"):
     # If we've set DC_ENVIRONMENT then we should raise a KeyError if eventbus ARN isn't set
     DC_EVENTBUS_ARN = os.environ["DC_EVENTBUS_ARN"]
@@ -13,6 +13,9 @@ GCS_API_KEY = ""
 SLACK_WEBHOOK_URL = ""
 AWS_STORAGE_BUCKET_NAME = "notice-of-election-dev"
 LGBCE_BUCKET = None
+# Lookups are cached across requests, which makes query counts depend on
+# test ordering. Tests that cover the cache enable it explicitly.
+ELECTION_LOOKUP_CACHE = {"ENABLED": False}
 
 
 os.environ["DJANGO_ALLOW_ASYNC_UNSAFE"] = "true"